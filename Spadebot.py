@@ -1,452 +1,667 @@
+import bisect
+import json
 import om
-import zipfile
+import os
+import presim
+import tapes
+import time
+from collections import deque
+
+# Worker processes import this module for every solve, so the batch driver's own dependencies (process pools,
+# sqlite, tarfile, argparse, tracemalloc) are imported by the functions that use them instead
 
 PRINT_DEBUG_MESSAGES = False
 
-def spadehandler(puzzle, puzzle_num):
-    global success, failure
+def jsonable(value):
+    # Atoms and bonds are written out through their slots, and anything else json can't handle through repr
+    slots = getattr(type(value), "__slots__", None)
+    if slots:
+        return {name: getattr(value, name) for name in slots}
+    return repr(value)
+
+def print_event(event):
+    print(json.dumps(event, default=jsonable))
+
+def check_puzzle(puzzle):
     all_product_atoms = set([item.type for sublist in puzzle.products for item in sublist.atoms])
     all_reagent_atoms = set([item.type for sublist in puzzle.reagents for item in sublist.atoms])
     if not all_product_atoms.issubset(all_reagent_atoms):
-        print(f"❌ - Puzzle #{puzzle_num} failed: Not all product atoms are contained within the reagent atoms")
-        return None
+        return "Not all product atoms are contained within the reagent atoms"
     for product in puzzle.products:
         for bond in product.bonds:
             if bond.type != 1:
-                print(f"❌ - Puzzle #{puzzle_num} failed: At least one of the product bonds is irregular")
-                return None
-    return spadebot(puzzle)
+                return "At least one of the product bonds is irregular"
+    return None
 
-def spadebot(puzzle):
-
-    # ----------------------------------------------------------------------------------------------------
-    # Scope Setting: Even though partlist is an array, this makes it feel cleaner lol
-    # ----------------------------------------------------------------------------------------------------
+def spadehandler(puzzle, puzzle_num):
+    reason = check_puzzle(puzzle)
+    if reason is not None:
+        print(f"❌ - Puzzle #{puzzle_num} failed: {reason}")
+        return None
+    return spadebot(puzzle)
 
-    global PRINT_DEBUG_MESSAGES
-    global count
-    global lockedcount
-    global partlist
+# A reagent runs out of rows to pull down before its grablist is placed
+class GrablistError(Exception):
+    pass
 
-    count = 0
-    lockedcount = 0
-    partlist = []
+class Spadebot:
 
     # ----------------------------------------------------------------------------------------------------
-    # Conditional Print: Sometimes reading the method explains the method
+    # Solve State: Every solve gets its own count, locked count, and part list, so solves never share state
     # ----------------------------------------------------------------------------------------------------
 
-    def ConditionalPrint(Message, end="\n"):
-        if PRINT_DEBUG_MESSAGES:
-            print(Message, end=end)
+    command_dict = {"ROTATE_CW": b'R', "ROTATE_CCW": b'r', "EXTEND": b'E', "RETRACT": b'e', "GRAB": b'G',
+                    "DROP": b'g', "TRACK_PLUS": b'A', "TRACK_MINUS": b'a', "REPEAT": b'C', "RESET": b'X'}
+
+    def __init__(self, puzzle, log=None, stats=None, parallel_lanes=False, parallel_disassembly=None, products_per_loop=1,
+                 beam_width=1, beam_time_limit=None):
+        self.puzzle = puzzle
+        self.parallel_lanes = parallel_lanes
+        self.parallel_disassembly = parallel_disassembly
+        self.products_per_loop = products_per_loop
+        self.beam_width = beam_width
+        self.beam_time_limit = beam_time_limit
+        self.log = log if log is not None else (print_event if PRINT_DEBUG_MESSAGES else None)
+        self.stats = stats
+        self.count = 0
+        self.lockedcount = 0
+        self.partlist = []
+        self.stage = None
+        self.bookings = {}
+        self.conflicts = []
+        self.schedule = []
+        self.output_cycles = []
+        self.copies_per_loop = products_per_loop
 
     # ----------------------------------------------------------------------------------------------------
-    # Translation Guide: Some of these are purely for debugging, but it made my life a lot easier
+    # Stage Stats: When a stats dict is given, every stage records its wall time, the instructions and parts
+    # it added, and its peak memory if tracemalloc is tracing
     # ----------------------------------------------------------------------------------------------------
 
-
-    element_dict = {1: "SALT", 2: "AIR", 3: "EARTH", 4: "FIRE", 5: "WATER", 6: "QUICKSILVER", 7: "GOLD", 8: "SILVER",
-                    9: "COPPER", 10: "IRON", 11: "TIN", 12: "LEAD", 13: "VITAE", 14: "MORS", 16: "QUINTESSENCE"}
-
-    command_dict = {"ROTATE_CW": b'R', "ROTATE_CCW": b'r', "EXTEND": b'E', "RETRACT": b'e', "GRAB": b'G',
-                    "DROP": b'g', "TRACK_PLUS": b'A', "TRACK_MINUS": b'a', "REPEAT": b'C', "RESET": b'X'}
+    def begin_stage(self, stage):
+        if self.stats is not None:
+            import tracemalloc
+            now = time.perf_counter()
+            instructions = sum(len(part.instructions) for part in self.partlist)
+            if self.stage is not None:
+                start, start_instructions, start_parts, start_memory = self.stage_start
+                record = {"Time": now - start, "Instructions": instructions - start_instructions, "Parts": len(self.partlist) - start_parts}
+                if tracemalloc.is_tracing():
+                    record["Peak Memory"] = tracemalloc.get_traced_memory()[1] - start_memory
+                self.stats[self.stage] = record
+            memory = 0
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+                memory = tracemalloc.get_traced_memory()[0]
+            self.stage_start = (time.perf_counter(), instructions, len(self.partlist), memory)
+        self.stage = stage
 
     # ----------------------------------------------------------------------------------------------------
     # Item Methods: Methods for placing regular items, arms, and tracks, for cleaner future code
     # ----------------------------------------------------------------------------------------------------
 
-    def addreg(name, pos, rot=0):
-        partlist.append(om.Part(name=getattr(om.Part, name),
-                                position=pos,
-                                rotation=rot))
-
-    def addarm(name, pos, rot, len, armlist):
-        partlist.append(om.Part(name=getattr(om.Part, name),
-                                position=pos,
-                                rotation=rot,
-                                length=len))
-        armlist.append(partlist[-1])
-
-    def addtrack(pos_list):
+    def addreg(self, name, pos, rot=0):
+        self.partlist.append(om.Part(name=getattr(om.Part, name),
+                                     position=pos,
+                                     rotation=rot))
+
+    def addarm(self, name, pos, rot, len, armlist):
+        self.partlist.append(om.Part(name=getattr(om.Part, name),
+                                     position=pos,
+                                     rotation=rot,
+                                     length=len,
+                                     instructions=om.InstructionList()))
+        self.bookings[id(self.partlist[-1])] = {}
+        armlist.append(self.partlist[-1])
+
+    def addtrack(self, pos_list):
         if len(pos_list):
-            partlist.append(om.Part(name=om.Part.TRACK,
-                                    track_hexes=pos_list))
+            self.partlist.append(om.Part(name=om.Part.TRACK,
+                                         track_hexes=pos_list))
 
-    def addelem(name, pos, rot, num):
+    def addelem(self, name, pos, rot, num):
 
-        partlist.append(om.Part(name=getattr(om.Part, name),
-                                position=pos,
-                                rotation=rot,
-                                which_reagent_or_product=num))
+        self.partlist.append(om.Part(name=getattr(om.Part, name),
+                                     position=pos,
+                                     rotation=rot,
+                                     which_reagent_or_product=num))
 
     # ----------------------------------------------------------------------------------------------------
     # Instruction Methods: Methods for generating instructions for an arm list with an instruction array
     # ----------------------------------------------------------------------------------------------------
 
-    def addcount(num, changelocked):
-        global count, lockedcount
-        count += num
+    def addcount(self, num, changelocked):
+        self.count += num
         if changelocked:
-            lockedcount = count
+            self.lockedcount = self.count
 
-    def setcount(value, setlock):
-        global count, lockedcount
-        count = value
+    def setcount(self, value, setlock):
+        self.count = value
         if setlock:
-            lockedcount = value
+            self.lockedcount = value
+
+    def book(self, arm, instr):
+        # Every arm keeps a map of the cycles it already has an instruction on and the stage that put it there,
+        # so an instruction landing on a taken cycle is recorded as a conflict instead of waiting for libverify
+        booked = self.bookings[id(arm)]
+        if self.count in booked:
+            self.conflicts.append({"Part Num": self.partlist.index(arm), "Cycle": self.count,
+                                   "First Stage": booked[self.count], "Second Stage": self.stage})
+        else:
+            booked[self.count] = self.stage
+        arm.instructions.add(self.count, instr)
 
-    def addinstr(loadcount, savecount, armlist, instr, num):
-        global count, lockedcount
+    def addinstr(self, loadcount, savecount, armlist, instr, num):
         if loadcount:
-            count = lockedcount
+            self.count = self.lockedcount
         for i in range(num):
             for arm in armlist:
                 if instr != "x" and isinstance(instr, str):
-                    instr = command_dict[instr]
-                arm.instructions.append(om.Instruction(count, instr))
-            count += 1
+                    instr = self.command_dict[instr]
+                self.book(arm, instr)
+            self.count += 1
         if savecount:
-            lockedcount = count
+            self.lockedcount = self.count
 
-    def addinstrlist(loadcount, savecount, armlist, instrlist):
-        global count, lockedcount
+    def addinstrlist(self, loadcount, savecount, armlist, instrlist):
         if loadcount:
-            count = lockedcount
+            self.count = self.lockedcount
         for instr in instrlist:
             for arm in armlist:
                 if instr != "x":
                     if isinstance(instr, str):
-                        instr = command_dict[instr]
-                    arm.instructions.append(om.Instruction(count, instr))
-            count += 1
+                        instr = self.command_dict[instr]
+                    self.book(arm, instr)
+            self.count += 1
         if savecount:
-            lockedcount = count
-
-    # ----------------------------------------------------------------------------------------------------
-    # Index Methods: Used for aligning coordinates from the regular grid to the unusual slant grid
-    # ----------------------------------------------------------------------------------------------------
+            self.lockedcount = self.count
 
-    def index(x, y, slant):
-        if slant == 1: return (-y, x + y)
-        if slant == 0: return (x, y)
-        if slant == 2: return (x + y, -x)
-        if slant == 3: return (y, -x - y)
-
-    def indexutility(num):
-        if num == 0: return 1
-        if num == 1: return 0
-        return num
-
-    def indexlist(start, end, slant, height, flipped):
-        if slant == 1: return [(-height, -i) for i in range(start - height, end - height)][::(2 * flipped - 1)]
-        if slant == 0: return [(-i, height) for i in range(start, end)][::(2 * flipped - 1)]
-        if slant == 2: return [(-i + height, i) for i in range(start, end)][::(2 * flipped - 1)]
-        if slant == 3: return [(height, i) for i in range(start - height, end - height)][::(2 * flipped - 1)]
-
-    def index2(x, y, offset, slant):
-        if slant == 0: return (x, y)
-        if slant == 1: return (offset - y, x + y - offset)
-        if slant == 2: return (x + y, offset - x)
-        if slant == 3: return (y + offset, offset - x - y)
-
-    def indexlist2(start, end, slant, height, flipped, offset):
-        untilted_list = indexlist(-end, -start, 0, height, flipped)
-        return [index2(x, y, offset, slant) for (x, y) in untilted_list]
-
-    def indexutility2(num):
-        if num == 2: return num + 3
-        if num == 3: return num + 1
-        return num
-
-    # ----------------------------------------------------------------------------------------------------
-    # Input Parsing: Takes in the inputs and calculates variables for the future, as well as atom sorting
-    # ----------------------------------------------------------------------------------------------------
-
-    reagent_masterlist = [{} for reagent in puzzle.reagents]
-    reagent_atom_masterlist = [[] for reagent in puzzle.reagents]
-
-    ConditionalPrint("-" * 100)
-    for reagent_num, reagent in enumerate(puzzle.reagents):
-
-        reagent_height_set = {a.position[1] for a in reagent.atoms}
-        height = max(reagent_height_set) - min(reagent_height_set) + 1
-        reagent_masterlist[reagent_num]["Height"] = height
-        reagent_masterlist[reagent_num]["Y-Offset"] = -min(reagent_height_set)
-
-        reagent_width_set = {a.position[0] for a in reagent.atoms}
-        width = max(reagent_width_set) - min(reagent_width_set) + 1
-        reagent_masterlist[reagent_num]["Width"] = width
-        reagent_masterlist[reagent_num]["X-Offset"] = max(reagent_width_set)
+    def solve(self):
+        # Extra copies per loop take more rows of each reagent, and a grablist that no longer fits in them is built one
+        # copy per loop instead
+        try:
+            return self.solve_loop(self.products_per_loop)
+        except GrablistError:
+            if self.products_per_loop == 1:
+                raise
+            return self.solve_loop(1)
+
+    def solve_loop(self, products_per_loop):
+
+        puzzle = self.puzzle
+        self.count = 0
+        self.lockedcount = 0
+        self.partlist = []
+        self.stage = None
+        self.bookings = {}
+        self.conflicts = []
+        self.schedule = []
+        self.output_cycles = []
+
+        # ----------------------------------------------------------------------------------------------------
+        # Debug Events: Each event is a dict built only when there is a log to send it to, so a solve with
+        # debugging off never formats anything
+        # ----------------------------------------------------------------------------------------------------
+
+        log = self.log
+
+        # ----------------------------------------------------------------------------------------------------
+        # Translation Guide: Some of these are purely for debugging, but it made my life a lot easier
+        # ----------------------------------------------------------------------------------------------------
+
+
+        element_dict = {1: "SALT", 2: "AIR", 3: "EARTH", 4: "FIRE", 5: "WATER", 6: "QUICKSILVER", 7: "GOLD", 8: "SILVER",
+                        9: "COPPER", 10: "IRON", 11: "TIN", 12: "LEAD", 13: "VITAE", 14: "MORS", 16: "QUINTESSENCE"}
+
+        # ----------------------------------------------------------------------------------------------------
+        # Index Methods: Used for aligning coordinates from the regular grid to the unusual slant grid
+        # ----------------------------------------------------------------------------------------------------
+
+        def index(x, y, slant):
+            if slant == 1: return (-y, x + y)
+            if slant == 0: return (x, y)
+            if slant == 2: return (x + y, -x)
+            if slant == 3: return (y, -x - y)
+
+        def indexutility(num):
+            if num == 0: return 1
+            if num == 1: return 0
+            return num
+
+        def indexlist(start, end, slant, height, flipped):
+            if slant == 1: return [(-height, -i) for i in range(start - height, end - height)][::(2 * flipped - 1)]
+            if slant == 0: return [(-i, height) for i in range(start, end)][::(2 * flipped - 1)]
+            if slant == 2: return [(-i + height, i) for i in range(start, end)][::(2 * flipped - 1)]
+            if slant == 3: return [(height, i) for i in range(start - height, end - height)][::(2 * flipped - 1)]
+
+        def index2(x, y, offset, slant):
+            if slant == 0: return (x, y)
+            if slant == 1: return (offset - y, x + y - offset)
+            if slant == 2: return (x + y, offset - x)
+            if slant == 3: return (y + offset, offset - x - y)
+
+        def indexlist2(start, end, slant, height, flipped, offset):
+            untilted_list = indexlist(-end, -start, 0, height, flipped)
+            return [index2(x, y, offset, slant) for (x, y) in untilted_list]
+
+        def indexutility2(num):
+            if num == 2: return num + 3
+            if num == 3: return num + 1
+            return num
+
+        # ----------------------------------------------------------------------------------------------------
+        # Input Parsing: Takes in the inputs and calculates variables for the future, as well as atom sorting
+        # ----------------------------------------------------------------------------------------------------
+
+        self.begin_stage("Input Parsing")
+
+        reagent_masterlist = [{} for reagent in puzzle.reagents]
+        reagent_atom_masterlist = [[] for reagent in puzzle.reagents]
+
+        for reagent_num, reagent in enumerate(puzzle.reagents):
+
+            reagent_height_set = {a.position[1] for a in reagent.atoms}
+            height = max(reagent_height_set) - min(reagent_height_set) + 1
+            reagent_masterlist[reagent_num]["Height"] = height
+            reagent_masterlist[reagent_num]["Y-Offset"] = -min(reagent_height_set)
+
+            reagent_width_set = {a.position[0] for a in reagent.atoms}
+            width = max(reagent_width_set) - min(reagent_width_set) + 1
+            reagent_masterlist[reagent_num]["Width"] = width
+            reagent_masterlist[reagent_num]["X-Offset"] = max(reagent_width_set)
+
+            reagent_masterlist[reagent_num]["Decomposition Time"] = 2 * width + 2 * width * height + 8 * height
+
+            reagent_atom_list = []
+            for atom in reagent.atoms:
+                x = -atom.position[0] + reagent_masterlist[reagent_num]["X-Offset"]
+                y = atom.position[1] + reagent_masterlist[reagent_num]["Y-Offset"]
+                reagent_width = reagent_masterlist[reagent_num]["Width"]
+                reagent_atom_list.append([2*reagent_width + 2*reagent_width*y + 8*y + 2*x + 10, atom, (x, y)])
+            reagent_atom_list = sorted(reagent_atom_list, key=lambda x: x[0])
 
-        reagent_masterlist[reagent_num]["Decomposition Time"] = 2 * width + 2 * width * height + 8 * height
+            for atom_num, atom in enumerate(reagent_atom_list):
+                atom_dictionary = {}
+                atom_dictionary["Reagent Num"] = reagent_num
+                atom_dictionary["Position"] = atom[0]
+                atom_dictionary["Object"] = atom[1]
+                atom_dictionary["Coordinates"] = atom[2]
+                atom_dictionary["Type"] = element_dict[atom[1].type]
+                atom_dictionary["Order"] = atom_num
+                reagent_atom_masterlist[reagent_num].append(atom_dictionary)
+
+        # Parallel disassembly gives the sides of the centre that no reagent uses to extra copies of the slowest
+        # tall reagents, each taking its own molecules apart row by row, so every side is its own supply of atoms
+        # from here on and only the input glyph needs to know which reagent it really is
+        side_reagent_list = list(range(len(puzzle.reagents)))
+        if self.parallel_disassembly is not None:
+            tall_reagent_list = sorted((reagent_num for reagent_num, reagent_info in enumerate(reagent_masterlist) if reagent_info["Height"] >= self.parallel_disassembly),
+                                       key=lambda reagent_num: -reagent_masterlist[reagent_num]["Decomposition Time"])
+            spare_num = 0
+            while len(side_reagent_list) < 4:
+                side_num = len(side_reagent_list)
+                # From its third row up, a molecule on the last side swings close enough to the pipeline's helicos to hit their atoms
+                fitting_list = [reagent_num for reagent_num in tall_reagent_list if side_num != 3 or reagent_masterlist[reagent_num]["Height"] < 3]
+                if not fitting_list:
+                    break
+                reagent_num = fitting_list[spare_num % len(fitting_list)]
+                spare_num += 1
+                side_reagent_list.append(reagent_num)
+                reagent_masterlist.append(dict(reagent_masterlist[reagent_num]))
+                reagent_atom_masterlist.append([dict(atom_info, **{"Reagent Num": side_num}) for atom_info in reagent_atom_masterlist[reagent_num]])
+
+        if log:
+            for reagent_num, (reagent_info, reagent_atom_info) in enumerate(zip(reagent_masterlist, reagent_atom_masterlist)):
+                log({"Stage": "Input Parsing", "Event": "Reagent", "Reagent Num": reagent_num, "Info": reagent_info, "Atoms": reagent_atom_info})
+
+        # ----------------------------------------------------------------------------------------------------
+        # Output Parsing: Takes in the outputs and calculates variables for the future, as well as atom sorting
+        # ----------------------------------------------------------------------------------------------------
+
+        self.begin_stage("Output Parsing")
+
+        product_masterlist = [{} for _ in puzzle.products]
+        product_atom_masterlist = [[] for _ in puzzle.products]
+
+        for product_num, product in enumerate(puzzle.products):
+            product_height_set = {a.position[1] for a in product.atoms}
+            product_masterlist[product_num]["Height"] = max(product_height_set) - min(product_height_set) + 1
+            product_masterlist[product_num]["Y-Offset"] = -min(product_height_set)
+
+            product_width_set = {a.position[0] for a in product.atoms}
+            product_masterlist[product_num]["Width"] = max(product_width_set) - min(product_width_set) + 1
+            product_masterlist[product_num]["X-Offset"] = max(product_width_set)
+
+            product_atom_list = [[-10 * a.position[1] - a.position[0], a] for a in product.atoms]
+            product_atom_list = sorted(product_atom_list, key=lambda x: x[0])
+            product_atom_list = [a[1] for a in product_atom_list]
+
+            for atom in product_atom_list:
+                atom_dictionary = {}
+                adjusted_x = -atom.position[0] + product_masterlist[product_num]["X-Offset"]
+                adjusted_y = atom.position[1] + product_masterlist[product_num]["Y-Offset"]
+                atom_dictionary["Coordinates"] = (adjusted_x, adjusted_y)
+                atom_dictionary["Object"] = atom
+                atom_dictionary["Type"] = element_dict[atom.type]
+                atom_dictionary["Product Num"] = product_num
+                product_atom_masterlist[product_num].append(atom_dictionary)
+
+        if log:
+            for product_num, (product_info, product_atom_info) in enumerate(zip(product_masterlist, product_atom_masterlist)):
+                log({"Stage": "Output Parsing", "Event": "Product", "Product Num": product_num, "Info": product_info, "Atoms": product_atom_info})
+
+        # ----------------------------------------------------------------------------------------------------
+        # Building: Places all the glyphs for the input phase of the solve, including track and arms
+        # ----------------------------------------------------------------------------------------------------
+
+        self.begin_stage("Building")
+
+        toparmlist_list = []
+        bottomarmlist_list = []
+        prodarmlist_list = []
+        wastearmlist_list = []
+        outputarmlist_list = []
+
+        for reagent_num in range(len(reagent_masterlist)):
 
-        reagent_atom_list = []
-        for atom in reagent.atoms:
-            x = -atom.position[0] + reagent_masterlist[reagent_num]["X-Offset"]
-            y = atom.position[1] + reagent_masterlist[reagent_num]["Y-Offset"]
             reagent_width = reagent_masterlist[reagent_num]["Width"]
-            reagent_atom_list.append([2*reagent_width + 2*reagent_width*y + 8*y + 2*x + 10, atom, (x, y)])
-        reagent_atom_list = sorted(reagent_atom_list, key=lambda x: x[0])
-
-        for atom_num, atom in enumerate(reagent_atom_list):
-            atom_dictionary = {}
-            atom_dictionary["Reagent Num"] = reagent_num
-            atom_dictionary["Position"] = atom[0]
-            atom_dictionary["Object"] = atom[1]
-            atom_dictionary["Coordinates"] = atom[2]
-            atom_dictionary["Type"] = element_dict[atom[1].type]
-            atom_dictionary["Order"] = atom_num
-            reagent_atom_masterlist[reagent_num].append(atom_dictionary)
-
-    for reagent_num, (reagent_info, reagent_atom_info) in enumerate(zip(reagent_masterlist, reagent_atom_masterlist)):
-        ConditionalPrint(f"Reagent# {reagent_num + 1}")
-        ConditionalPrint(f" - {reagent_info = }")
-        ConditionalPrint(f" - {reagent_atom_info = }")
+            reagent_xoffset = reagent_masterlist[reagent_num]["X-Offset"]
+            reagent_yoffset = reagent_masterlist[reagent_num]["Y-Offset"]
 
-    # ----------------------------------------------------------------------------------------------------
-    # Output Parsing: Takes in the outputs and calculates variables for the future, as well as atom sorting
-    # ----------------------------------------------------------------------------------------------------
+            self.addelem("INPUT", index(-2 * reagent_width - 9 - reagent_xoffset, 3 + reagent_yoffset, reagent_num), 1 - indexutility(reagent_num), side_reagent_list[reagent_num])
 
-    product_masterlist = [{} for _ in puzzle.products]
-    product_atom_masterlist = [[] for _ in puzzle.products]
-
-    ConditionalPrint("-" * 100)
-    for product_num, product in enumerate(puzzle.products):
-        product_height_set = {a.position[1] for a in product.atoms}
-        product_masterlist[product_num]["Height"] = max(product_height_set) - min(product_height_set) + 1
-        product_masterlist[product_num]["Y-Offset"] = -min(product_height_set)
-
-        product_width_set = {a.position[0] for a in product.atoms}
-        product_masterlist[product_num]["Width"] = max(product_width_set) - min(product_width_set) + 1
-        product_masterlist[product_num]["X-Offset"] = max(product_width_set)
-
-        product_atom_list = [[-10 * a.position[1] - a.position[0], a] for a in product.atoms]
-        product_atom_list = sorted(product_atom_list, key=lambda x: x[0])
-        product_atom_list = [a[1] for a in product_atom_list]
-
-        for atom in product_atom_list:
-            atom_dictionary = {}
-            adjusted_x = -atom.position[0] + product_masterlist[product_num]["X-Offset"]
-            adjusted_y = atom.position[1] + product_masterlist[product_num]["Y-Offset"]
-            atom_dictionary["Coordinates"] = (adjusted_x, adjusted_y)
-            atom_dictionary["Object"] = atom
-            atom_dictionary["Type"] = element_dict[atom.type]
-            atom_dictionary["Product Num"] = product_num
-            product_atom_masterlist[product_num].append(atom_dictionary)
-
-    for product_num, (product_info, product_atom_info) in enumerate(zip(product_masterlist, product_atom_masterlist)):
-        ConditionalPrint(f"Product# {product_num + 1}")
-        ConditionalPrint(f" - {product_info = }")
-        ConditionalPrint(f" - {product_atom_info = }")
+            self.addtrack(indexlist(8, 3 * reagent_width + 9, reagent_num, 1, 0))
+            self.addtrack(indexlist(7, 3 * reagent_width + 9, reagent_num, 0, 0))
+            self.addtrack(indexlist(reagent_width + 10, 3 * reagent_width + 8, reagent_num, -1, 1))
 
-    # ----------------------------------------------------------------------------------------------------
-    # Building: Places all the glyphs for the input phase of the solve, including track and arms
-    # ----------------------------------------------------------------------------------------------------
+            self.addreg("UNBONDER", index(-reagent_width - 9, 3, reagent_num), 2 - indexutility(reagent_num))
+            self.addreg("UNBONDER", index(-reagent_width - 7, 3, reagent_num), 4 - indexutility(reagent_num))
+            self.addreg("UNBONDER", index(-reagent_width - 6, 3, reagent_num), 3 - indexutility(reagent_num))
 
-    toparmlist_list = []
-    bottomarmlist_list = []
-    prodarmlist_list = []
-    wastearmlist_list = []
-    outputarmlist_list = []
+            self.addreg("BONDER", index(-2 * reagent_width - 9, 2, reagent_num), 1 - indexutility(reagent_num))
 
-    for reagent_num in range(len(puzzle.reagents)):
-
-        reagent_width = reagent_masterlist[reagent_num]["Width"]
-        reagent_xoffset = reagent_masterlist[reagent_num]["X-Offset"]
-        reagent_yoffset = reagent_masterlist[reagent_num]["Y-Offset"]
-
-        addelem("INPUT", index(-2 * reagent_width - 9 - reagent_xoffset, 3 + reagent_yoffset, reagent_num), 1 - indexutility(reagent_num), reagent_num)
-
-        addtrack(indexlist(8, 3 * reagent_width + 9, reagent_num, 1, 0))
-        addtrack(indexlist(7, 3 * reagent_width + 9, reagent_num, 0, 0))
-        addtrack(indexlist(reagent_width + 10, 3 * reagent_width + 8, reagent_num, -1, 1))
-
-        addreg("UNBONDER", index(-reagent_width - 9, 3, reagent_num), 2 - indexutility(reagent_num))
-        addreg("UNBONDER", index(-reagent_width - 7, 3, reagent_num), 4 - indexutility(reagent_num))
-        addreg("UNBONDER", index(-reagent_width - 6, 3, reagent_num), 3 - indexutility(reagent_num))
-
-        addreg("BONDER", index(-2 * reagent_width - 9, 2, reagent_num), 1 - indexutility(reagent_num))
-
-        toparmlist = []
-        bottomarmlist = []
-        wastearmlist = []
-        outputarmlist = []
-
-        for i in range(-3 * reagent_width - 8, -2 * reagent_width - 8):
-            addarm("PISTON", index(i, 1, reagent_num), 2 - indexutility(reagent_num), 3, toparmlist)
-        for i in range(-3 * reagent_width - 8, -2 * reagent_width - 8):
-            addarm("PISTON", index(i, 0, reagent_num), 2 - indexutility(reagent_num), 3, bottomarmlist)
-        for i in range(-2 * reagent_width - 8, -reagent_width - 9):
-            addarm("ARM1", index(i, -1, reagent_num), 2 - indexutility(reagent_num), 3, wastearmlist)
-        addarm("ARM1", index(-7, 0, reagent_num), 2 - indexutility(reagent_num), 2, outputarmlist)
-
-        prodarmlist = toparmlist + bottomarmlist
-
-        toparmlist_list.append(toparmlist)
-        bottomarmlist_list.append(bottomarmlist)
-        prodarmlist_list.append(prodarmlist)
-        wastearmlist_list.append(wastearmlist)
-        outputarmlist_list.append(outputarmlist)
-
-    # ----------------------------------------------------------------------------------------------------
-    # Bonding calculation: Calculates what atoms in the product are bonded, and stores that information
-    # ----------------------------------------------------------------------------------------------------
+            toparmlist = []
+            bottomarmlist = []
+            wastearmlist = []
+            outputarmlist = []
 
-    ConditionalPrint("-" * 100)
+            for i in range(-3 * reagent_width - 8, -2 * reagent_width - 8):
+                self.addarm("PISTON", index(i, 1, reagent_num), 2 - indexutility(reagent_num), 3, toparmlist)
+            for i in range(-3 * reagent_width - 8, -2 * reagent_width - 8):
+                self.addarm("PISTON", index(i, 0, reagent_num), 2 - indexutility(reagent_num), 3, bottomarmlist)
+            for i in range(-2 * reagent_width - 8, -reagent_width - 9):
+                self.addarm("ARM1", index(i, -1, reagent_num), 2 - indexutility(reagent_num), 3, wastearmlist)
+            self.addarm("ARM1", index(-7, 0, reagent_num), 2 - indexutility(reagent_num), 2, outputarmlist)
 
-    for product_num, product in enumerate(puzzle.products):
+            prodarmlist = toparmlist + bottomarmlist
 
-        bond_list = []
-        for bond in product.bonds:
-            bond = bond.positions
+            toparmlist_list.append(toparmlist)
+            bottomarmlist_list.append(bottomarmlist)
+            prodarmlist_list.append(prodarmlist)
+            wastearmlist_list.append(wastearmlist)
+            outputarmlist_list.append(outputarmlist)
 
-            xoffset = product_masterlist[product_num]["X-Offset"]
-            yoffset = product_masterlist[product_num]["Y-Offset"]
+        # ----------------------------------------------------------------------------------------------------
+        # Bonding calculation: Calculates what atoms in the product are bonded, and stores that information
+        # ----------------------------------------------------------------------------------------------------
 
-            pos1, pos2 = bond
-            pos1_x, pos1_y = pos1
-            pos2_x, pos2_y = pos2
+        self.begin_stage("Bonding")
 
-            pos1_x = -pos1_x
-            pos2_x = -pos2_x
+        bond_direction_dict = {(1, 0): 0, (1, 1): 1, (0, 1): 2}
 
-            if pos1_y > pos2_y:
-                pos1_y, pos2_y = pos2_y, pos1_y
-                pos1_x, pos2_x = pos2_x, pos1_x
-            elif (pos1_y == pos2_y and pos1_x > pos2_x):
-                pos1_y, pos2_y = pos2_y, pos1_y
-                pos1_x, pos2_x = pos2_x, pos1_x
+        for product_num, product in enumerate(puzzle.products):
 
-            bond_list.append(((pos1_x + xoffset, pos1_y + yoffset), (pos2_x + xoffset, pos2_y + yoffset)))
+            bond_list = []
+            for bond in product.bonds:
+                bond = bond.positions
 
-        atom_info = product_atom_masterlist[product_num]
-        for atom in atom_info:
+                xoffset = product_masterlist[product_num]["X-Offset"]
+                yoffset = product_masterlist[product_num]["Y-Offset"]
 
-            bond_values = [0, 0, 0]
-            atom_loc = atom["Coordinates"]
+                pos1, pos2 = bond
+                pos1_x, pos1_y = pos1
+                pos2_x, pos2_y = pos2
 
-            for pair in bond_list:
+                pos1_x = -pos1_x
+                pos2_x = -pos2_x
 
-                if atom_loc == pair[0]:
-                    pos1_x, pos1_y = pair[0]
-                    pos2_x, pos2_y = pair[1]
+                if pos1_y > pos2_y:
+                    pos1_y, pos2_y = pos2_y, pos1_y
+                    pos1_x, pos2_x = pos2_x, pos1_x
+                elif (pos1_y == pos2_y and pos1_x > pos2_x):
+                    pos1_y, pos2_y = pos2_y, pos1_y
+                    pos1_x, pos2_x = pos2_x, pos1_x
 
-                    if (pos1_x + 1 == pos2_x and pos1_y == pos2_y):
-                        bond_values[0] = 1
-                    if (pos1_x + 1 == pos2_x and pos1_y + 1 == pos2_y):
-                        bond_values[1] = 1
-                    if (pos1_x == pos2_x and pos1_y + 1 == pos2_y):
-                        bond_values[2] = 1
-            atom["Bonds"] = bond_values
-            ConditionalPrint(f"{bond_values = }")
+                bond_list.append(((pos1_x + xoffset, pos1_y + yoffset), (pos2_x + xoffset, pos2_y + yoffset)))
 
-    # ----------------------------------------------------------------------------------------------------
-    # Theoretical Minimum Calculation: Calculates the fastest possible way each reagent atom can be sent
-    # ----------------------------------------------------------------------------------------------------
+            # Index every bond by its lower endpoint once, so each atom looks its flags up instead of scanning every bond
+            bond_values_dict = {}
+            for (pos1_x, pos1_y), (pos2_x, pos2_y) in bond_list:
+                direction = bond_direction_dict.get((pos2_x - pos1_x, pos2_y - pos1_y))
+                bond_values = bond_values_dict.setdefault((pos1_x, pos1_y), [0, 0, 0])
+                if direction is not None:
+                    bond_values[direction] = 1
 
-    ConditionalPrint("-" * 100)
-    min_cycle_gap = 6
-    for atom_list in product_atom_masterlist:
-        row_delay = 0
-        for atom_num in range(len(atom_list) - 1):
+            atom_info = product_atom_masterlist[product_num]
+            for atom in atom_info:
 
-            atom_info = atom_list[atom_num]
-            next_info = atom_list[atom_num + 1]
+                bond_values = list(bond_values_dict.get(atom["Coordinates"], (0, 0, 0)))
+                atom["Bonds"] = bond_values
+                if log:
+                    log({"Stage": "Bonding", "Event": "Atom Bonds", "Product Num": product_num, "Coordinates": atom["Coordinates"], "Bonds": bond_values})
 
-            atom_info["Row End"] = atom_info["Coordinates"][1] != next_info["Coordinates"][1]
-            row_delay += atom_info["Bonds"][1] + atom_info["Bonds"][2]
+        # ----------------------------------------------------------------------------------------------------
+        # Theoretical Minimum Calculation: Calculates the fastest possible way each reagent atom can be sent
+        # ----------------------------------------------------------------------------------------------------
 
-            if (atom_info["Coordinates"][1] != next_info["Coordinates"][1]):
-                atom_info["Row Delay"] = row_delay
-                row_delay = 0
-            else:
-                atom_info["Row Delay"] = 0
+        self.begin_stage("Theoretical Minimum")
 
-        atom_list[-1]["Row End"] = True
-        atom_list[-1]["Row Delay"] = row_delay
+        min_cycle_gap = 6
+        for atom_list in product_atom_masterlist:
+            row_delay = 0
+            for atom_num in range(len(atom_list) - 1):
 
-    shifting_value = 0
-    for product_num, atom_list in enumerate(product_atom_masterlist):
+                atom_info = atom_list[atom_num]
+                next_info = atom_list[atom_num + 1]
 
-        last_atom_reset_time = shifting_value
-        shifting_value = min_cycle_gap
+                atom_info["Row End"] = atom_info["Coordinates"][1] != next_info["Coordinates"][1]
+                row_delay += atom_info["Bonds"][1] + atom_info["Bonds"][2]
 
-        bond_total = 0
+                if (atom_info["Coordinates"][1] != next_info["Coordinates"][1]):
+                    atom_info["Row Delay"] = row_delay
+                    row_delay = 0
+                else:
+                    atom_info["Row Delay"] = 0
 
-        for atom_info in atom_list:
-            x = atom_info["Coordinates"][0]
+            atom_list[-1]["Row End"] = True
+            atom_list[-1]["Row Delay"] = row_delay
 
-            bond_total += (atom_info["Bonds"][1] + atom_info["Bonds"][2])
+        shifting_value = 0
+        for product_num, atom_list in enumerate(product_atom_masterlist):
 
-            atom_movement_time = (2 * (product_masterlist[product_num]["Width"] - atom_info["Coordinates"][0]) + 2) * (atom_info["Bonds"][0] ^ 1)
+            last_atom_reset_time = shifting_value
+            shifting_value = min_cycle_gap
 
-            if atom_info["Row End"]:
-                row_reset_time = (((4 * product_masterlist[product_num]["Width"]) + atom_movement_time // 2 + 2 * bond_total) if atom_info["Row End"] else 0)
-                bond_total = 0
-            else:
-                row_reset_time = 0
+            bond_total = 0
 
-            ConditionalPrint(f"row_reset_time = max ( {min_cycle_gap = }, {atom_movement_time = }, {row_reset_time = })  =  {max(min_cycle_gap, atom_movement_time, row_reset_time)}")
+            for atom_info in atom_list:
+                x = atom_info["Coordinates"][0]
 
-            row_reset_time = max(min_cycle_gap, atom_movement_time, row_reset_time)
-            current_atom_reset_time = row_reset_time
-            atom_info["Last Atom Reset Time"] = last_atom_reset_time
-            last_atom_reset_time = current_atom_reset_time
+                bond_total += (atom_info["Bonds"][1] + atom_info["Bonds"][2])
 
-    ConditionalPrint(("-" * 44) + " Debug Info " + ("-" * 44))
-    for product_num, (product_info, product_atom_info) in enumerate(zip(product_masterlist, product_atom_masterlist)):
-        ConditionalPrint(f"Product# {product_num + 1}")
-        ConditionalPrint(f" - {product_info = }")
-        ConditionalPrint(f" - {product_atom_info = }")
+                atom_movement_time = (2 * (product_masterlist[product_num]["Width"] - atom_info["Coordinates"][0]) + 2) * (atom_info["Bonds"][0] ^ 1)
 
-    # ----------------------------------------------------------------------------------------------------
-    # Precomputation: Given the inputs and outputs, solve for what order elements must be grabbed in
-    # ----------------------------------------------------------------------------------------------------
+                if atom_info["Row End"]:
+                    row_reset_time = (((4 * product_masterlist[product_num]["Width"]) + atom_movement_time // 2 + 2 * bond_total) if atom_info["Row End"] else 0)
+                    bond_total = 0
+                else:
+                    row_reset_time = 0
+
+                if log:
+                    log({"Stage": "Theoretical Minimum", "Event": "Reset Time", "Product Num": product_num, "Coordinates": atom_info["Coordinates"],
+                         "Minimum Gap": min_cycle_gap, "Movement Time": atom_movement_time, "Row Reset Time": row_reset_time,
+                         "Reset Time": max(min_cycle_gap, atom_movement_time, row_reset_time)})
+
+                row_reset_time = max(min_cycle_gap, atom_movement_time, row_reset_time)
+                current_atom_reset_time = row_reset_time
+                atom_info["Last Atom Reset Time"] = last_atom_reset_time
+                atom_info["Reset Time"] = current_atom_reset_time
+                last_atom_reset_time = current_atom_reset_time
+
+        if log:
+            for product_num, (product_info, product_atom_info) in enumerate(zip(product_masterlist, product_atom_masterlist)):
+                log({"Stage": "Theoretical Minimum", "Event": "Product", "Product Num": product_num, "Info": product_info, "Atoms": product_atom_info})
+
+        # ----------------------------------------------------------------------------------------------------
+        # Precomputation: Given the inputs and outputs, solve for what order elements must be grabbed in
+        # ----------------------------------------------------------------------------------------------------
+
+        self.begin_stage("Precomputation")
+
+        # Reagent atoms grouped by type, then by row; atoms arrive in pickup order, so rows and x values come out sorted
+        type_row_masterlist = [{} for _ in reagent_atom_masterlist]
+        for reagent_num, reagent_atom_list in enumerate(reagent_atom_masterlist):
+            for atom_info in reagent_atom_list:
+                atom_x, atom_y = atom_info["Coordinates"]
+                row_xs, row_atoms = type_row_masterlist[reagent_num].setdefault(atom_info["Type"], {}).setdefault(atom_y, ([], []))
+                row_xs.append(atom_x)
+                row_atoms.append(atom_info)
+
+        def find_candidates(schedule, needed_atom):
+            loops_list = schedule["Loops"]
+            position_list = schedule["Positions"]
+            past_row_delay_list = schedule["Past Row Delays"]
+            past_row_delay_total = schedule["Past Row Delay Totals"]
+            current_row_delay_dict = schedule["Current Row Delays"]
 
-    cycle = 0
-    last_reagent_num = -1
-    loops_list = [0, 0, 0, 0]
-    position_list = [(-1, -1), (-1, -1), (-1, -1), (-1, -1)]
-    past_row_delay_list = [[], [], [], []]
-    current_row_delay_dict = [{}, {}, {}, {}]
-    future_row_delay_list = [[], [], [], []]
-    current_row_list = [[], [], [], []]
-    delay_array = [[], [], [], []]
-    split_master_atom_list = [[], [], [], []]
-    whole_master_atom_list = []
-
-    for product_num, product_atom_list in enumerate(product_atom_masterlist):
-        for product_atom_info in product_atom_list:
-
-            ConditionalPrint("-" * 100)
-            needed_atom = product_atom_info["Type"]
             possible_atom_list = []
-            ConditionalPrint(f" - It is cycle {cycle} and we need {needed_atom}")
-
-            min_cycle_gap = product_atom_info["Last Atom Reset Time"]
-
-            for reagent_atom_list in reagent_atom_masterlist:
-                for atom_info in reagent_atom_list:
-                    atom_cyclevalue = atom_info["Position"]
-                    atom_x, atom_y = atom_info["Coordinates"]
-                    reagent_num = atom_info["Reagent Num"]
-
-                    if atom_info["Type"] == needed_atom:
-
-                        atom_is_upcoming = atom_y > position_list[reagent_num][1] or (atom_x > position_list[reagent_num][0] and atom_y == position_list[reagent_num][1])
+            if log:
+                log({"Stage": "Precomputation", "Event": "Needed Atom", "Cycle": schedule["Cycle"], "Type": needed_atom})
+
+            # Only the first atom of each (reagent, row, upcoming) group can win, since the rest of the group
+            # shares its delays but sits further along the row, so each row offers at most two candidates
+            for reagent_num, type_row_dict in enumerate(type_row_masterlist):
+                position_x, position_y = position_list[reagent_num]
+
+                for atom_y, (row_xs, row_atoms) in type_row_dict.get(needed_atom, {}).items():
+                    if atom_y != position_y or row_xs[0] > position_x:
+                        candidate_list = [(row_atoms[0], atom_y >= position_y)]
+                    else:
+                        candidate_list = [(row_atoms[0], False)]
+                        upcoming_num = bisect.bisect_right(row_xs, position_x)
+                        if upcoming_num < len(row_atoms):
+                            candidate_list.append((row_atoms[upcoming_num], True))
+
+                    for atom_info, atom_is_upcoming in candidate_list:
+                        atom_cyclevalue = atom_info["Position"]
+                        atom_x = atom_info["Coordinates"][0]
                         decompose_num = loops_list[reagent_num] + (1 - atom_is_upcoming)
+                        row_delay = current_row_delay_dict[reagent_num].get((reagent_num, atom_y, decompose_num), 0)
+                        past_row_delay = past_row_delay_total[reagent_num] - (past_row_delay_list[reagent_num][-1] if row_delay and past_row_delay_list[reagent_num] else 0)
 
                         value = atom_cyclevalue
-                        value += reagent_masterlist[reagent_num]["Decomposition Time"] * (loops_list[reagent_num] + (1 - atom_is_upcoming))
-
-                        value += sum((past_row_delay_list[reagent_num][:] if (not current_row_delay_dict[reagent_num].get((reagent_num, atom_y, decompose_num), 0)) else past_row_delay_list[reagent_num][:-1]))
-                        value += current_row_delay_dict[reagent_num].get((reagent_num, atom_y, decompose_num), 0)
+                        value += reagent_masterlist[reagent_num]["Decomposition Time"] * decompose_num
+                        value += past_row_delay
+                        value += row_delay
 
-                        ConditionalPrint(f"We can get {needed_atom} from {(atom_x, atom_y)} of reagent {reagent_num} on cycle {value}: (value = {atom_cyclevalue}, loops = {reagent_masterlist[reagent_num]["Decomposition Time"] * (loops_list[reagent_num] + (1 - atom_is_upcoming))}, past rows = {sum((past_row_delay_list[reagent_num][:] if (not current_row_delay_dict[reagent_num].get((reagent_num, atom_y, decompose_num), 0)) else past_row_delay_list[reagent_num][:-1]))}, current row = {current_row_delay_dict[reagent_num].get((reagent_num, atom_y, decompose_num), 0)})")
+                        if log:
+                            log({"Stage": "Precomputation", "Event": "Candidate", "Type": needed_atom, "Coordinates": (atom_x, atom_y), "Reagent Num": reagent_num,
+                                 "Cycle": value, "Position": atom_cyclevalue, "Loops": reagent_masterlist[reagent_num]["Decomposition Time"] * decompose_num,
+                                 "Past Rows": past_row_delay, "Current Row": row_delay})
 
                         possible_atom_list.append((value, atom_info, atom_is_upcoming))
 
-            chosen_atom = min(possible_atom_list, key=lambda x: x[0])
+            return possible_atom_list
+
+        # With parallel lanes, the next atom comes from whichever product can take one soonest, so an atom only
+        # waits out the reset time of the last atom of its own product, plus the central pipeline's gap
+        pipeline_cycle_gap = min_cycle_gap
+
+        # Every loop of the tapes builds products_per_loop copies of each product, so the pipeline's fill and drain
+        # is shared between them; each copy's first atom waits out the reset of the copy before it. A molecule on
+        # the last side that is three rows tall keeps its top rows by the pipeline's helicos for longer with every
+        # extra copy, until their atoms brush past each other, so those puzzles stay at one copy
+        if len(reagent_masterlist) == 4 and reagent_masterlist[3]["Height"] >= 3:
+            products_per_loop = 1
+        self.copies_per_loop = products_per_loop
+        product_atom_queue_list = []
+        for product_atom_list in product_atom_masterlist:
+            product_atom_queue = deque(product_atom_list)
+            for _ in range(products_per_loop - 1):
+                product_atom_queue.append(dict(product_atom_list[0], **{"Last Atom Reset Time": product_atom_list[-1]["Reset Time"]}))
+                product_atom_queue.extend(product_atom_list[1:])
+            product_atom_queue_list.append(product_atom_queue)
+
+        # A schedule holds everything the atoms picked so far have committed the reagents and products to, so the
+        # beam search can try several picks from the same point, each on its own copy
+        def new_schedule():
+            return {"Cycle": 0, "Last Reagent": -1, "Loops": [0, 0, 0, 0], "Positions": [(-1, -1), (-1, -1), (-1, -1), (-1, -1)],
+                    "Past Row Delays": [[], [], [], []], "Past Row Delay Totals": [0, 0, 0, 0], "Current Row Delays": [{}, {}, {}, {}],
+                    "Future Row Delays": [[], [], [], []], "Current Rows": [[], [], [], []], "Delay Arrays": [[], [], [], []],
+                    "Split Atoms": [[], [], [], []], "Whole Atoms": [], "Product Atoms": [],
+                    "Product Queues": [deque(product_atom_queue) for product_atom_queue in product_atom_queue_list],
+                    "Product Cycles": [None for _ in product_atom_masterlist]}
+
+        def copy_schedule(schedule):
+            return {"Cycle": schedule["Cycle"], "Last Reagent": schedule["Last Reagent"], "Loops": list(schedule["Loops"]), "Positions": list(schedule["Positions"]),
+                    "Past Row Delays": [list(row_delays) for row_delays in schedule["Past Row Delays"]],
+                    "Past Row Delay Totals": list(schedule["Past Row Delay Totals"]),
+                    "Current Row Delays": [dict(row_delays) for row_delays in schedule["Current Row Delays"]],
+                    "Future Row Delays": [list(row_delays) for row_delays in schedule["Future Row Delays"]],
+                    "Current Rows": [list(row) for row in schedule["Current Rows"]],
+                    "Delay Arrays": [list(delays) for delays in schedule["Delay Arrays"]],
+                    "Split Atoms": [list(atoms) for atoms in schedule["Split Atoms"]], "Whole Atoms": list(schedule["Whole Atoms"]),
+                    "Product Atoms": list(schedule["Product Atoms"]),
+                    "Product Queues": [deque(product_atom_queue) for product_atom_queue in schedule["Product Queues"]],
+                    "Product Cycles": list(schedule["Product Cycles"])}
+
+        # Two schedules that agree on all of this make the same picks from here on, however they got there
+        def schedule_key(schedule):
+            return (schedule["Cycle"], schedule["Last Reagent"], tuple(schedule["Loops"]), tuple(schedule["Positions"]), tuple(schedule["Past Row Delay Totals"]),
+                    tuple(map(tuple, schedule["Past Row Delays"])), tuple(tuple(sorted(row_delays.items())) for row_delays in schedule["Current Row Delays"]),
+                    tuple(map(tuple, schedule["Future Row Delays"])),
+                    tuple(map(tuple, schedule["Current Rows"])), tuple(map(tuple, schedule["Delay Arrays"])),
+                    tuple(map(len, schedule["Product Queues"])), tuple(schedule["Product Cycles"]))
+
+        def next_pick(schedule):
+            cycle = schedule["Cycle"]
+            product_atom_queue_list = schedule["Product Queues"]
+            product_cycle_list = schedule["Product Cycles"]
+
+            if self.parallel_lanes:
+                pick_list = []
+                for product_num, product_atom_queue in enumerate(product_atom_queue_list):
+                    if not product_atom_queue:
+                        continue
+                    possible_atom_list = find_candidates(schedule, product_atom_queue[0]["Type"])
+                    ready_cycle = min(possible_atom_list, key=lambda x: x[0])[0]
+                    if schedule["Product Atoms"]:
+                        ready_cycle = max(ready_cycle, cycle + pipeline_cycle_gap)
+                    if product_cycle_list[product_num] is not None:
+                        ready_cycle = max(ready_cycle, product_cycle_list[product_num] + product_atom_queue[0]["Last Atom Reset Time"])
+                    pick_list.append((ready_cycle, product_num, possible_atom_list))
+                ready_cycle, product_num, possible_atom_list = min(pick_list, key=lambda x: x[:2])
+                min_cycle_gap = ready_cycle - cycle
+            else:
+                product_num = next(product_num for product_num, product_atom_queue in enumerate(product_atom_queue_list) if product_atom_queue)
+                possible_atom_list = find_candidates(schedule, product_atom_queue_list[product_num][0]["Type"])
+                min_cycle_gap = product_atom_queue_list[product_num][0]["Last Atom Reset Time"]
+
+            return product_num, min_cycle_gap, possible_atom_list
+
+        def schedule_atom(schedule, product_num, min_cycle_gap, chosen_atom):
+            cycle = schedule["Cycle"]
+            loops_list = schedule["Loops"]
+            position_list = schedule["Positions"]
+            past_row_delay_list = schedule["Past Row Delays"]
+            past_row_delay_total = schedule["Past Row Delay Totals"]
+            current_row_delay_dict = schedule["Current Row Delays"]
+            future_row_delay_list = schedule["Future Row Delays"]
+            current_row_list = schedule["Current Rows"]
+            delay_array = schedule["Delay Arrays"]
+
+            product_atom_info = schedule["Product Queues"][product_num].popleft()
+            schedule["Product Atoms"].append(product_atom_info)
 
             value = chosen_atom[0]
             atom = chosen_atom[1]
@@ -454,14 +669,15 @@ def spadebot(puzzle):
             (atom_x, atom_y) = atom["Coordinates"]
             reagent_num = atom["Reagent Num"]
 
-            ConditionalPrint(f" - We have picked the {atom["Type"]} from {atom["Coordinates"]} of reagent {atom["Reagent Num"]}")
-            ConditionalPrint(f"We believe the atom will be ready on cycle {value}")
-
             delay = max(cycle + min_cycle_gap - value, 0)
             value += delay
             cycle = value
+            schedule["Cycle"] = cycle
+            schedule["Product Cycles"][product_num] = cycle
 
-            ConditionalPrint(f"We are adding {delay} cycles to account for the {min_cycle_gap} cycle minimum gap ({value-delay} + {delay} = {cycle})")
+            if log:
+                log({"Stage": "Precomputation", "Event": "Picked", "Type": atom["Type"], "Coordinates": atom["Coordinates"], "Reagent Num": reagent_num,
+                     "Product Num": product_num, "Ready Cycle": value - delay, "Minimum Gap": min_cycle_gap, "Delay": delay, "Cycle": cycle})
 
             decompose_num = loops_list[reagent_num] + (1 - atom_is_upcoming)
             hash_is_new = not current_row_delay_dict[reagent_num].get((reagent_num, atom_y, decompose_num), 0)
@@ -471,18 +687,18 @@ def spadebot(puzzle):
 
             if hash_is_new:
                 past_row_delay_list[reagent_num].append(3)
+                past_row_delay_total[reagent_num] += 3
                 current_row_list[reagent_num] = []
                 delay_array[reagent_num] = []
 
-            ConditionalPrint(" - Now, we need to set up the future atoms")
-            ConditionalPrint(f"Atoms in the same row will wait {(2 * atom_x + 6)} for slowness and {delay} for delay: {(2 * atom_x + 6)} + {delay} = {(2 * atom_x + 6) + delay}: {current_row_delay_dict} -> ", end="")
-
             current_row_delay_dict[reagent_num].setdefault((reagent_num, atom_y, loops_list[reagent_num]), 0)
             current_row_delay_dict[reagent_num][(reagent_num, atom_y, loops_list[reagent_num])] = current_row_delay_dict[reagent_num][(reagent_num, atom_y, loops_list[reagent_num])] + ((2 * atom_x + 6) + delay)
             position_list[reagent_num] = (atom_x, atom_y)
             current_row_list[reagent_num].append(atom_x + 1)
 
-            ConditionalPrint(current_row_delay_dict)
+            if log:
+                log({"Stage": "Precomputation", "Event": "Same Row Delay", "Reagent Num": reagent_num, "Slowness": 2 * atom_x + 6, "Delay": delay,
+                     "Current Row Delays": {str(key): row_delay for key, row_delay in current_row_delay_dict[reagent_num].items()}})
 
             passed_delay = 0
             for element in current_row_list[reagent_num]:
@@ -492,9 +708,12 @@ def spadebot(puzzle):
 
             delay_array[reagent_num].append(delay)
 
-            ConditionalPrint(f"Atoms in other rows will wait {passed_delay} for slowness and {delay} for sync: {sum(delay_array[reagent_num])} + {delay} + {3} = {sum(delay_array[reagent_num]) + delay + 3}: {past_row_delay_list} -> ", end="")
+            past_row_delay_total[reagent_num] -= past_row_delay_list[reagent_num][-1]
             past_row_delay_list[reagent_num][-1] = sum(delay_array[reagent_num]) + passed_delay + 3
-            ConditionalPrint(past_row_delay_list)
+            past_row_delay_total[reagent_num] += past_row_delay_list[reagent_num][-1]
+            if log:
+                log({"Stage": "Precomputation", "Event": "Other Row Delay", "Reagent Num": reagent_num, "Slowness": passed_delay, "Delay": delay,
+                     "Past Row Delays": past_row_delay_list[reagent_num]})
 
             new_atom_dict = {}
             new_atom_dict["Type"] = atom["Type"]
@@ -506,343 +725,775 @@ def spadebot(puzzle):
             new_atom_dict["Cycle"] = value
             new_atom_dict["Delay"] = delay
 
-            split_master_atom_list[reagent_num].append(new_atom_dict)
-            whole_master_atom_list.append(new_atom_dict)
+            schedule["Split Atoms"][reagent_num].append(new_atom_dict)
+            schedule["Whole Atoms"].append(new_atom_dict)
 
-            if last_reagent_num != reagent_num:
+            # With several copies per loop, a reagent stalls for every delay, even between two atoms of its own, or the
+            # next row it pulls down lands on an atom that is still waiting for the feeder. One copy keeps the original rule
+            if products_per_loop > 1 or schedule["Last Reagent"] != reagent_num:
                 future_row_delay_list[reagent_num].append(delay)
             else:
                 future_row_delay_list[reagent_num].append(0)
-            last_reagent_num = reagent_num
+            schedule["Last Reagent"] = reagent_num
+
+        # The greedy pick takes whichever candidate is ready soonest. With a beam width, every candidate is tried from
+        # each of the schedules kept so far, and the next round keeps the ones that are furthest ahead, taking the
+        # fewest loops of reagents apart to get there. Once the time limit runs out, the best of them finishes greedily
+        beam_deadline = None if self.beam_time_limit is None else time.perf_counter() + self.beam_time_limit
+        schedule_list = [new_schedule()]
+        seen_schedule_set = set()
+
+        while any(schedule_list[0]["Product Queues"]):
+
+            if self.beam_width > 1 and (beam_deadline is None or time.perf_counter() < beam_deadline):
+                next_schedule_list = []
+                for schedule in schedule_list:
+                    product_num, min_cycle_gap, possible_atom_list = next_pick(schedule)
+                    for chosen_atom in possible_atom_list:
+                        next_schedule = copy_schedule(schedule)
+                        schedule_atom(next_schedule, product_num, min_cycle_gap, chosen_atom)
+                        next_schedule_key = schedule_key(next_schedule)
+                        if next_schedule_key not in seen_schedule_set:
+                            seen_schedule_set.add(next_schedule_key)
+                            next_schedule_list.append(next_schedule)
+                next_schedule_list.sort(key=lambda schedule: (schedule["Cycle"], sum(schedule["Loops"])))
+                schedule_list = next_schedule_list[:self.beam_width]
+            else:
+                schedule = schedule_list[0]
+                product_num, min_cycle_gap, possible_atom_list = next_pick(schedule)
+                schedule_atom(schedule, product_num, min_cycle_gap, min(possible_atom_list, key=lambda x: x[0]))
+                schedule_list = [schedule]
+
+        schedule = schedule_list[0]
+        whole_master_atom_list = schedule["Whole Atoms"]
+        self.schedule = whole_master_atom_list
+        split_master_atom_list = schedule["Split Atoms"]
+        future_row_delay_list = schedule["Future Row Delays"]
+        scheduled_product_atom_list = schedule["Product Atoms"]
+
+        if log:
+            log({"Stage": "Precomputation", "Event": "Schedule", "Atoms": whole_master_atom_list})
+
+        # ----------------------------------------------------------------------------------------------------
+        # Sequencing: Using the theoretical minimum calculation, choose atoms in order by cycle available
+        # ----------------------------------------------------------------------------------------------------
+
+        self.begin_stage("Sequencing")
+
+        grablist_list = []
+        for reagent in split_master_atom_list:
+            grablist = [atom["Order"] for atom in reagent]
+            grablist.append("X")
+            grablist_list.append(grablist)
+        if log:
+            log({"Stage": "Sequencing", "Event": "Grab Lists", "Grab Lists": grablist_list})
+
+        pulldown_list = []
+        loops_list = []
+        delayarray_list = []
+
+        for reagent_num in range(len(reagent_masterlist)):
+
+            grablist = grablist_list[reagent_num]
+            reagent_height = reagent_masterlist[reagent_num]["Height"]
+            reagent_atom_list = reagent_atom_masterlist[reagent_num]
+
+            pulldown = []
+            loops = 0
+            while len(grablist) != 1:
+                for _ in range(reagent_height):
+                    pulldown.append([])
+                for atom_num, atom in enumerate(reagent_atom_list):
+                    if (atom["Order"] % (reagent_atom_list[-1]["Order"] + 1)) == grablist[0]: #----------------------------------------------------------------- Assumes first is right
+                        grablist.pop(0)
+                        pulldown[loops * reagent_height + int(atom["Coordinates"][1])].append(int(atom["Coordinates"][0]) + 1)
+                loops += 1
+                if len(pulldown) > 100:
+                    raise GrablistError("Inappropriate Grablist")
+
+            delayarray = []
+            for box in pulldown:
+                if len(box) == 0:
+                    delayarray.append(0)
+                else:
+                    output = 0
+                    for element in box:
+                        output += 2 * element + 4
+                    output -= (box[-1] + 3) + (reagent_masterlist[reagent_num]["Width"] + 5 + 2)
+                    output = max(output, 0)
 
-    ConditionalPrint("-" * 100)
-    ConditionalPrint(f"{split_master_atom_list = }")
-    ConditionalPrint(f"{whole_master_atom_list = }")
+                    delayarray.append(output)
 
-    ConditionalPrint("-" * 100)
-    for atom_into in whole_master_atom_list:
-        ConditionalPrint(f"{atom_into = }")
+            pulldown_list.append(pulldown)
+            loops_list.append(loops)
+            delayarray_list.append(delayarray)
 
-    # ----------------------------------------------------------------------------------------------------
-    # Sequencing: Using the theoretical minimum calculation, choose atoms in order by cycle available
-    # ----------------------------------------------------------------------------------------------------
+        # ----------------------------------------------------------------------------------------------------
+        # Programing: Given the procomputed values, program the arms to execute the solution
+        # ----------------------------------------------------------------------------------------------------
 
-    ConditionalPrint("-" * 100)
-    ConditionalPrint(f"{split_master_atom_list = }")
-    ConditionalPrint(f"{reagent_atom_masterlist = }")
-
-    grablist_list = []
-    for reagent in split_master_atom_list:
-        grablist = [atom["Order"] for atom in reagent]
-        grablist.append("X")
-        grablist_list.append(grablist)
-    ConditionalPrint(f"{grablist_list = }")
-    ConditionalPrint("-" * 100)
-
-    pulldown_list = []
-    loops_list = []
-    delayarray_list = []
-
-    for reagent_num in range(len(puzzle.reagents)):
-
-        grablist = grablist_list[reagent_num]
-        reagent_height = reagent_masterlist[reagent_num]["Height"]
-        reagent_atom_list = reagent_atom_masterlist[reagent_num]
-
-        pulldown = []
-        loops = 0
-        while len(grablist) != 1:
-            for _ in range(reagent_height):
-                pulldown.append([])
-            for atom_num, atom in enumerate(reagent_atom_list):
-                if (atom["Order"] % (reagent_atom_list[-1]["Order"] + 1)) == grablist[0]: #----------------------------------------------------------------- Assumes first is right
-                    grablist.pop(0)
-                    pulldown[loops * reagent_height + int(atom["Coordinates"][1])].append(int(atom["Coordinates"][0]) + 1)
-            loops += 1
-            if len(pulldown) > 100:
-                raise Exception("Inappropriate Grablist")
-
-        delayarray = []
-        for box in pulldown:
-            if len(box) == 0:
-                delayarray.append(0)
-            else:
-                output = 0
-                for element in box:
-                    output += 2 * element + 4
-                output -= (box[-1] + 3) + (reagent_masterlist[reagent_num]["Width"] + 5 + 2)
-                output = max(output, 0)
+        self.begin_stage("Programming")
 
-                delayarray.append(output)
+        for reagent_num in range(len(reagent_masterlist)):
 
-        pulldown_list.append(pulldown)
-        loops_list.append(loops)
-        delayarray_list.append(delayarray)
+            self.setcount(0, 1)
 
-    # ----------------------------------------------------------------------------------------------------
-    # Programing: Given the procomputed values, program the arms to execute the solution
-    # ----------------------------------------------------------------------------------------------------
+            reagent_width = reagent_masterlist[reagent_num]["Width"]
+            reagent_height = reagent_masterlist[reagent_num]["Height"]
 
-    for reagent_num in range(len(puzzle.reagents)):
+            toparmlist = toparmlist_list[reagent_num]
+            bottomarmlist = bottomarmlist_list[reagent_num]
+            prodarmlist = prodarmlist_list[reagent_num]
+            wastearmlist = wastearmlist_list[reagent_num]
+            outputarmlist = outputarmlist_list[reagent_num]
 
-        setcount(0, 1)
+            pulldown = pulldown_list[reagent_num]
+            loops = loops_list[reagent_num]
+            delayarray = delayarray_list[reagent_num]
 
-        reagent_width = reagent_masterlist[reagent_num]["Width"]
-        reagent_height = reagent_masterlist[reagent_num]["Height"]
+            for outerloop in range(loops):
 
-        toparmlist = toparmlist_list[reagent_num]
-        bottomarmlist = bottomarmlist_list[reagent_num]
-        prodarmlist = prodarmlist_list[reagent_num]
-        wastearmlist = wastearmlist_list[reagent_num]
-        outputarmlist = outputarmlist_list[reagent_num]
+                self.addinstr(0, 0, prodarmlist, "GRAB", 1)
+                self.addinstr(0, 0, prodarmlist, "TRACK_PLUS", reagent_width)
 
-        pulldown = pulldown_list[reagent_num]
-        loops = loops_list[reagent_num]
-        delayarray = delayarray_list[reagent_num]
+                for innerloop in range(reagent_height):
 
-        for outerloop in range(loops):
+                    cycle = outerloop * reagent_height + innerloop
+                    pulldowns = pulldown[cycle]
+                    delay = delayarray[cycle]
 
-            addinstr(0, 0, prodarmlist, "GRAB", 1)
-            addinstr(0, 0, prodarmlist, "TRACK_PLUS", reagent_width)
+                    if innerloop != 0:
+                        self.addinstr(0, 0, prodarmlist, "GRAB", 1)
 
-            for innerloop in range(reagent_height):
+                    self.addinstr(0, 1, prodarmlist, "TRACK_PLUS", reagent_width + 1)
 
-                cycle = outerloop * reagent_height + innerloop
-                pulldowns = pulldown[cycle]
-                delay = delayarray[cycle]
+                    stall_total = 0
 
-                if innerloop != 0:
-                    addinstr(0, 0, prodarmlist, "GRAB", 1)
+                    if len(pulldowns) != 0:
 
-                addinstr(0, 1, prodarmlist, "TRACK_PLUS", reagent_width + 1)
+                        self.addcount(3, 0)
 
-                stall_total = 0
+                        for value in pulldown[cycle]:
+                            if future_row_delay_list[reagent_num]:
+                                self.addcount(future_row_delay_list[reagent_num][0], False)
+                                stall_total += future_row_delay_list[reagent_num].pop(0)
 
-                if len(pulldowns) != 0:
+                        for armnum, arm in enumerate(bottomarmlist):
+                            if (reagent_width - armnum) in pulldowns:
+                                self.addinstrlist(1, 0, [arm], ["RETRACT", "DROP", "EXTEND"])
 
-                    addcount(3, 0)
+                    self.addinstr(0, 0, prodarmlist, "TRACK_MINUS", reagent_width + 1)
 
-                    for value in pulldown[cycle]:
-                        if future_row_delay_list[reagent_num]:
-                            addcount(future_row_delay_list[reagent_num][0], False)
-                            stall_total += future_row_delay_list[reagent_num].pop(0)
+                    self.addcount(delay + stall_total, 1)
 
-                    for armnum, arm in enumerate(bottomarmlist):
-                        if (reagent_width - armnum) in pulldowns:
-                            addinstrlist(1, 0, [arm], ["RETRACT", "DROP", "EXTEND"])
+                    self.addinstr(0, 0, prodarmlist, "RETRACT", 1)
 
-                addinstr(0, 0, prodarmlist, "TRACK_MINUS", reagent_width + 1)
+                    self.addinstr(0, 1, bottomarmlist, "TRACK_MINUS", 1)
 
-                addcount(delay + stall_total, 1)
+                    for armnum, arm in enumerate(wastearmlist):
 
-                addinstr(0, 0, prodarmlist, "RETRACT", 1)
+                        self.addinstr(1, 0, [arm], "GRAB", 1)
 
-                addinstr(0, 1, bottomarmlist, "TRACK_MINUS", 1)
+                        for j in range(reagent_width - 1):
+                            if armnum == j:
+                                self.addinstrlist(0, 0, [arm], ["TRACK_PLUS", "DROP"])
+                            else:
+                                self.addinstrlist(0, 0, [arm], ["TRACK_PLUS", "x"])
 
-                for armnum, arm in enumerate(wastearmlist):
+                    self.addinstr(0, 0, wastearmlist, "TRACK_MINUS", reagent_width - 1)
 
-                    addinstr(1, 0, [arm], "GRAB", 1)
+                    self.addinstr(1, 0, toparmlist, "DROP", 1)
+                    self.addinstrlist(1, 0, bottomarmlist, ["DROP", "TRACK_PLUS"])
 
-                    for j in range(reagent_width - 1):
-                        if armnum == j:
-                            addinstrlist(0, 0, [arm], ["TRACK_PLUS", "DROP"])
-                        else:
-                            addinstrlist(0, 0, [arm], ["TRACK_PLUS", "x"])
+                    self.addinstr(0, 0, prodarmlist, 'EXTEND', 1)
 
-                addinstr(0, 0, wastearmlist, "TRACK_MINUS", reagent_width - 1)
+                self.addinstr(0, 0, prodarmlist, "TRACK_MINUS", reagent_width)
 
-                addinstr(1, 0, toparmlist, "DROP", 1)
-                addinstrlist(1, 0, bottomarmlist, ["DROP", "TRACK_PLUS"])
+        # ----------------------------------------------------------------------------------------------------
+        # Full Centralization: Take the atoms from the independent reagents and pipeline them with 2Arms
+        # ----------------------------------------------------------------------------------------------------
 
-                addinstr(0, 0, prodarmlist, 'EXTEND', 1)
+        self.begin_stage("Full Centralization")
 
-            addinstr(0, 0, prodarmlist, "TRACK_MINUS", reagent_width)
+        center_helico_list = []
+        center_piston_list = []
+        start_helico_container = []
+        end_helico_container = []
 
-    # ----------------------------------------------------------------------------------------------------
-    # Full Centralization: Take the atoms from the independent reagents and pipeline them with 2Arms
-    # ----------------------------------------------------------------------------------------------------
+        for reagent_num in range(len(reagent_masterlist)):
+            self.addarm("ARM2", index(-3, 0, reagent_num), 1 - indexutility(reagent_num), 2, center_helico_list)
+            self.addarm("PISTON", index(-2, 0, reagent_num), 1 - indexutility(reagent_num), 1, center_piston_list)
+        self.addarm("ARM2", (2, 0), 0, 2, start_helico_container)
+        self.addarm("ARM2", (6, 0), 0, 2, end_helico_container)
 
-    center_helico_list = []
-    center_piston_list = []
-    start_helico_container = []
-    end_helico_container = []
+        for atom_info in whole_master_atom_list:
 
-    for reagent_num in range(len(puzzle.reagents)):
-        addarm("ARM2", index(-3, 0, reagent_num), 1 - indexutility(reagent_num), 2, center_helico_list)
-        addarm("PISTON", index(-2, 0, reagent_num), 1 - indexutility(reagent_num), 1, center_piston_list)
-    addarm("ARM2", (2, 0), 0, 2, start_helico_container)
-    addarm("ARM2", (6, 0), 0, 2, end_helico_container)
+            arm_num = atom_info["Reagent Num"]
+            outputarmlist = outputarmlist_list[arm_num]
 
-    for atom_info in whole_master_atom_list:
+            value = atom_info["Coordinates"][0] + 1
+            cycle = atom_info["Cycle"] - 2 * value - 3
 
-        arm_num = atom_info["Reagent Num"]
-        outputarmlist = outputarmlist_list[arm_num]
 
-        value = atom_info["Coordinates"][0] + 1
-        cycle = atom_info["Cycle"] - 2 * value - 3
+            self.setcount(cycle, True)
 
+            self.addinstr(0, 0, outputarmlist, "TRACK_MINUS", value)
+            self.addinstr(0, 0, outputarmlist, "GRAB", 1)
+            self.addinstr(0, 0, outputarmlist, "TRACK_PLUS", value)
+            self.addinstrlist(0, 0, outputarmlist, ["ROTATE_CW", "DROP", "ROTATE_CCW"])
 
-        setcount(cycle, True)
+        for atom_info in whole_master_atom_list:
+            cycle = atom_info["Cycle"]
+            arm_num = atom_info["Reagent Num"]
 
-        addinstr(0, 0, outputarmlist, "TRACK_MINUS", value)
-        addinstr(0, 0, outputarmlist, "GRAB", 1)
-        addinstr(0, 0, outputarmlist, "TRACK_PLUS", value)
-        addinstrlist(0, 0, outputarmlist, ["ROTATE_CW", "DROP", "ROTATE_CCW"])
+            self.setcount(cycle - 1, False)
+            self.addinstrlist(0, 0, [center_helico_list[arm_num]], ["GRAB", "ROTATE_CW", "ROTATE_CW", "ROTATE_CW", "DROP"])
+            self.setcount(cycle + 3, False)
+            self.addinstrlist(0, 0, [center_piston_list[arm_num]], ["GRAB", "EXTEND", "DROP", "RETRACT"])
+            self.setcount(cycle + 5, False)
+            self.addinstrlist(0, 0, start_helico_container, ["GRAB", "ROTATE_CCW", "ROTATE_CCW", "ROTATE_CCW", "DROP"])
+            self.setcount(cycle + 5 + 4, False)
+            self.addinstrlist(0, 0, end_helico_container, ["GRAB", "ROTATE_CW", "ROTATE_CW", "ROTATE_CW", "DROP"])
 
-    for atom_info in whole_master_atom_list:
-        cycle = atom_info["Cycle"]
-        arm_num = atom_info["Reagent Num"]
+        # ----------------------------------------------------------------------------------------------------
+        # Full Output: Full decentralization from pipeline and molecule construction
+        # ----------------------------------------------------------------------------------------------------
 
-        setcount(cycle - 1, False)
-        addinstrlist(0, 0, [center_helico_list[arm_num]], ["GRAB", "ROTATE_CW", "ROTATE_CW", "ROTATE_CW", "DROP"])
-        setcount(cycle + 3, False)
-        addinstrlist(0, 0, [center_piston_list[arm_num]], ["GRAB", "EXTEND", "DROP", "RETRACT"])
-        setcount(cycle + 5, False)
-        addinstrlist(0, 0, start_helico_container, ["GRAB", "ROTATE_CCW", "ROTATE_CCW", "ROTATE_CCW", "DROP"])
-        setcount(cycle + 5 + 4, False)
-        addinstrlist(0, 0, end_helico_container, ["GRAB", "ROTATE_CW", "ROTATE_CW", "ROTATE_CW", "DROP"])
+        self.begin_stage("Full Output")
 
-    # ----------------------------------------------------------------------------------------------------
-    # Full Output: Full decentralization from pipeline and molecule construction
-    # ----------------------------------------------------------------------------------------------------
+        input_arm_container_masterlist = []
+        end_piston_masterlist = []
+        end_helico_masterlist = []
+        botharmlist_masterlist = []
 
-    input_arm_container_masterlist = []
-    end_piston_masterlist = []
-    end_helico_masterlist = []
-    botharmlist_masterlist = []
+        myoffset = 8
 
-    myoffset = 8
+        for product_num in range(len(puzzle.products)):
 
-    for product_num in range(len(puzzle.products)):
+            end_piston_container = []
+            end_helico_container = []
+            input_arm_container = []
+            botharmlist = []
 
-        end_piston_container = []
-        end_helico_container = []
-        input_arm_container = []
-        botharmlist = []
+            self.addarm("PISTON", index2(10, 0, myoffset, product_num), indexutility2(product_num) + 3, 1, end_piston_container)
+            self.addarm("ARM2", index2(11, 0, myoffset, product_num), indexutility2(product_num), 2, end_helico_container)
+            for i in range(product_masterlist[product_num]["Width"]):
+                self.addarm("PISTON", index2(14 + i, -1, myoffset, product_num), indexutility2(product_num) + 1, 2, botharmlist)
+            for i in range(product_masterlist[product_num]["Width"]):
+                self.addarm("PISTON", index2(14 + i, -2, myoffset, product_num), indexutility2(product_num) + 1, 2, botharmlist)
+            self.addarm("ARM1", index2(16, -3, myoffset, product_num), indexutility2(product_num) + 2, 3, input_arm_container)
 
-        addarm("PISTON", index2(10, 0, myoffset, product_num), indexutility2(product_num) + 3, 1, end_piston_container)
-        addarm("ARM2", index2(11, 0, myoffset, product_num), indexutility2(product_num), 2, end_helico_container)
-        for i in range(product_masterlist[product_num]["Width"]):
-            addarm("PISTON", index2(14 + i, -1, myoffset, product_num), indexutility2(product_num) + 1, 2, botharmlist)
-        for i in range(product_masterlist[product_num]["Width"]):
-            addarm("PISTON", index2(14 + i, -2, myoffset, product_num), indexutility2(product_num) + 1, 2, botharmlist)
-        addarm("ARM1", index2(16, -3, myoffset, product_num), indexutility2(product_num) + 2, 3, input_arm_container)
+            self.addreg("BONDER", index2(13, 0, myoffset, product_num), indexutility2(product_num))
 
-        addreg("BONDER", index2(13, 0, myoffset, product_num), indexutility2(product_num))
+            self.addreg("BONDER", index2(14 + product_masterlist[product_num]["Width"], 0, myoffset, product_num), indexutility2(product_num) + 1)
+            if product_masterlist[product_num]["Width"] > 1:
+                self.addreg("BONDER", index2(14 + 2 * product_masterlist[product_num]["Width"], 0, myoffset, product_num), indexutility2(product_num) + 2)
 
-        addreg("BONDER", index2(14 + product_masterlist[product_num]["Width"], 0, myoffset, product_num), indexutility2(product_num) + 1)
-        if product_masterlist[product_num]["Width"] > 1:
-            addreg("BONDER", index2(14 + 2 * product_masterlist[product_num]["Width"], 0, myoffset, product_num), indexutility2(product_num) + 2)
+            self.addtrack(indexlist2(13, 13 + 3 * product_masterlist[product_num]["Width"] - 1, product_num, -1, 0, myoffset))
+            self.addtrack(indexlist2(13, 13 + 3 * product_masterlist[product_num]["Width"] - 1, product_num, -2, 0, myoffset))
+            self.addtrack(indexlist2(15, 15 + product_masterlist[product_num]["Width"] + 1, product_num, -3, 0, myoffset))
 
-        addtrack(indexlist2(13, 13 + 3 * product_masterlist[product_num]["Width"] - 1, product_num, -1, 0, myoffset))
-        addtrack(indexlist2(13, 13 + 3 * product_masterlist[product_num]["Width"] - 1, product_num, -2, 0, myoffset))
-        addtrack(indexlist2(15, 15 + product_masterlist[product_num]["Width"] + 1, product_num, -3, 0, myoffset))
+            indexlist2(6, 9, product_num, 0, 0, 5)
 
-        indexlist2(6, 9, product_num, 0, 0, 5)
+            self.addelem("OUTPUT_STANDARD", index2(13 + product_masterlist[product_num]["Width"] - product_masterlist[product_num]["X-Offset"], 1 + product_masterlist[product_num]["Y-Offset"], myoffset, product_num), indexutility2(product_num), product_num)
 
-        addelem("OUTPUT_STANDARD", index2(13 + product_masterlist[product_num]["Width"] - product_masterlist[product_num]["X-Offset"], 1 + product_masterlist[product_num]["Y-Offset"], myoffset, product_num), indexutility2(product_num), product_num)
+            input_arm_container_masterlist.append(input_arm_container)
+            botharmlist_masterlist.append(botharmlist)
+            end_piston_masterlist.append(end_piston_container)
+            end_helico_masterlist.append(end_helico_container)
 
-        input_arm_container_masterlist.append(input_arm_container)
-        botharmlist_masterlist.append(botharmlist)
-        end_piston_masterlist.append(end_piston_container)
-        end_helico_masterlist.append(end_helico_container)
+        # Products can be built side by side, so each keeps its own row in progress, and its own count of atoms
+        # placed so it knows which row finishes a product
+        info_so_far_list = [[] for _ in puzzle.products]
+        val_list = [0 for _ in puzzle.products]
+        atom_count_list = [0 for _ in puzzle.products]
+        self.output_cycles = [[] for _ in puzzle.products]
 
-    info_so_far = []
-    val = 0
+        for timing_info, atom_info in zip(whole_master_atom_list, scheduled_product_atom_list):
 
-    product_atom_list = []
-    for atom_list in product_atom_masterlist:
-        for atom_info in atom_list:
-            product_atom_list.append(atom_info)
+            product_num = atom_info["Product Num"]
+            info_so_far = info_so_far_list[product_num]
+            atom_count_list[product_num] += 1
 
-    for timing_info, atom_info in zip(whole_master_atom_list, product_atom_list):
+            if log:
+                log({"Stage": "Full Output", "Event": "Atom", "Product Num": product_num, "Timing": timing_info, "Atom": atom_info})
 
-        product_num = atom_info["Product Num"]
+            input_arm_container = input_arm_container_masterlist[product_num]
+            botharmlist = botharmlist_masterlist[product_num]
+            end_piston_container = end_piston_masterlist[product_num]
+            end_helico_container = end_helico_masterlist[product_num]
 
-        ConditionalPrint(f" - Product #{product_num}")
-        ConditionalPrint(f"{timing_info = }")
-        ConditionalPrint(f"{atom_info = }")
+            info_so_far.append([atom_info["Bonds"], atom_info["Coordinates"][0]])
 
-        input_arm_container = input_arm_container_masterlist[product_num]
-        botharmlist = botharmlist_masterlist[product_num]
-        end_piston_container = end_piston_masterlist[product_num]
-        end_helico_container = end_helico_masterlist[product_num]
+            self.setcount(timing_info["Cycle"] + 12, True)
 
-        info_so_far.append([atom_info["Bonds"], atom_info["Coordinates"][0]])
+            self.addinstrlist(0, 0, end_piston_container, ["EXTEND", "GRAB", "RETRACT", "DROP"])
 
-        setcount(timing_info["Cycle"] + 12, True)
+            self.addcount(-1, True)
 
-        addinstrlist(0, 0, end_piston_container, ["EXTEND", "GRAB", "RETRACT", "DROP"])
+            self.addinstrlist(0, 0, end_helico_container, ["GRAB", "ROTATE_CW", "ROTATE_CW", "ROTATE_CW", "DROP"])
 
-        addcount(-1, True)
+            self.addcount(-1, True)
 
-        addinstrlist(0, 0, end_helico_container, ["GRAB", "ROTATE_CW", "ROTATE_CW", "ROTATE_CW", "DROP"])
+            self.addinstr(0, 0, input_arm_container, "GRAB", 1)
 
-        addcount(-1, True)
-
-        addinstr(0, 0, input_arm_container, "GRAB", 1)
+            if atom_info["Bonds"][0]:
+                self.addinstrlist(0, 0, input_arm_container, ["TRACK_PLUS", "DROP", "TRACK_MINUS"])
+            else:
+                self.addinstr(0, 0, input_arm_container, "TRACK_PLUS", product_masterlist[product_num]["Width"] - atom_info["Coordinates"][0])
 
-        if atom_info["Bonds"][0]:
-            addinstrlist(0, 0, input_arm_container, ["TRACK_PLUS", "DROP", "TRACK_MINUS"])
-        else:
-            addinstr(0, 0, input_arm_container, "TRACK_PLUS", product_masterlist[product_num]["Width"] - atom_info["Coordinates"][0])
+                val_list[product_num] = self.count
 
-            val = count
+                self.addinstr(0, 0, input_arm_container, "DROP", 1)
+                self.addinstr(0, 0, input_arm_container, "TRACK_MINUS", product_masterlist[product_num]["Width"] - atom_info["Coordinates"][0])
 
-            addinstr(0, 0, input_arm_container, "DROP", 1)
-            addinstr(0, 0, input_arm_container, "TRACK_MINUS", product_masterlist[product_num]["Width"] - atom_info["Coordinates"][0])
+            if atom_info["Row End"]:
 
-        if atom_info["Row End"]:
+                self.setcount(val_list[product_num], True)
 
-            setcount(val, True)
+                self.addinstrlist(0, 0, botharmlist, ["GRAB", "EXTEND"])
 
-            addinstrlist(0, 0, botharmlist, ["GRAB", "EXTEND"])
+                droplist = [0 for _ in range(2 * product_masterlist[product_num]["Width"] - 1)]
+                for info in info_so_far:
+                    droplist[info[1]] = info[0][2]
+                for info in info_so_far:
+                    if info[1] != product_masterlist[product_num]["Width"] - 1:
+                        droplist[info[1] + product_masterlist[product_num]["Width"]] = info[0][1]
 
-            droplist = [0 for _ in range(2 * product_masterlist[product_num]["Width"] - 1)]
-            for info in info_so_far:
-                droplist[info[1]] = info[0][2]
-            for info in info_so_far:
-                if info[1] != product_masterlist[product_num]["Width"] - 1:
-                    droplist[info[1] + product_masterlist[product_num]["Width"]] = info[0][1]
+                for value in droplist:
+                    if value:
+                        self.addinstrlist(0, 0, botharmlist, ["TRACK_PLUS", "RETRACT", "EXTEND"])
+                    else:
+                        self.addinstr(0, 0, botharmlist, "TRACK_PLUS", 1)
 
-            for value in droplist:
-                if value:
-                    addinstrlist(0, 0, botharmlist, ["TRACK_PLUS", "RETRACT", "EXTEND"])
-                else:
-                    addinstr(0, 0, botharmlist, "TRACK_PLUS", 1)
+                self.addinstr(0, 0, botharmlist, "TRACK_MINUS", 2 * product_masterlist[product_num]["Width"] - 1)
+                self.addinstrlist(0, 0, botharmlist, ["DROP", "RETRACT"])
+                info_so_far.clear()
 
-            addinstr(0, 0, botharmlist, "TRACK_MINUS", 2 * product_masterlist[product_num]["Width"] - 1)
-            addinstrlist(0, 0, botharmlist, ["DROP", "RETRACT"])
-            info_so_far = []
+                # The finished product is let go on the DROP, and the output takes it that same cycle
+                if atom_count_list[product_num] % len(product_atom_masterlist[product_num]) == 0:
+                    self.output_cycles[product_num].append(self.count - 2)
 
-    return partlist
+        self.begin_stage(None)
 
+        if log:
+            for conflict in self.conflicts:
+                log(dict(conflict, Stage=conflict["Second Stage"], Event="Conflict"))
 
-# ----------------------------------------------------------------------------------------------------
+        return self.partlist
 
-Successes = 0
-with zipfile.ZipFile("24hour-1-test.zip", "r") as puzzle_zip:
-    for name in puzzle_zip.namelist():
-        puzzle_bytes = puzzle_zip.read(name)
-        if len(puzzle_bytes) == 0:
-            continue
-
-        puzzle_num = name[17:20]
-        puzzle = om.Puzzle(puzzle_bytes)
+def spadebot(puzzle):
+    return Spadebot(puzzle).solve()
 
-        solution = om.Solution()
-        solution.puzzle = puzzle.name
-        solution.name = b"SpadeBot"
-        solution.parts = spadehandler(puzzle, puzzle_num)
+def tape_period(parts):
+    indices = [index for part in parts for index, _ in tapes.sorted_tape(part.instructions)]
+    return max(indices) - min(indices) + 1 if indices else 0
 
-        if not solution.parts:
-            continue
 
-        solution_data = om.Sim(puzzle, solution)
+# ----------------------------------------------------------------------------------------------------
+# Batch Driver: Solve and verify a stream of puzzles across a process pool, one worker per core
+# ----------------------------------------------------------------------------------------------------
 
+def init_worker(use_libverify=True, trace_memory=False):
+    # Stage stats only record peak memory while tracemalloc is tracing, so --stage-stats turns it on in every worker
+    if use_libverify:
+        om.Sim.libverify()
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+
+def worker_main(connection, function, initializer):
+    if initializer is not None:
+        initializer()
+    while True:
+        task = connection.recv()
+        if task is None:
+            return
+        args, kwargs = task
+        try:
+            result = function(*args, verifying=lambda: connection.send(("Verifying", None)), **kwargs)
+        except Exception as err:
+            connection.send(("Error", f"{type(err).__name__}: {err}"))
+        else:
+            connection.send(("Result", result))
+
+class WorkerPool:
+    # libverify can't be interrupted, so the time limit is kept here instead of inside om.Sim. Each worker is its own
+    # process with its own pipe, and tells the pool when it starts verifying; one that is still going at the time limit
+    # is killed and replaced, and the others carry on. A task that gets killed or crashes its worker raises from its
+    # future, as om.SimTimeout or RuntimeError
+
+    def __init__(self, workers, function, initializer=None, time_limit=None):
+        import multiprocessing
+        self.context = multiprocessing.get_context()
+        self.function = function
+        self.initializer = initializer
+        self.time_limit = time_limit
+        self.pending = deque()
+        self.slots = [self.start_slot() for _ in range(workers)]
+
+    def start_slot(self):
+        connection, worker_connection = self.context.Pipe()
+        process = self.context.Process(target=worker_main, args=(worker_connection, self.function, self.initializer), daemon=True)
+        process.start()
+        worker_connection.close()
+        return {"Process": process, "Connection": connection, "Task": None, "Deadline": None}
+
+    def submit(self, *args, **kwargs):
+        from concurrent.futures import Future
+        future = Future()
+        self.pending.append((args, kwargs, future))
+        self.dispatch()
+        return future
+
+    def dispatch(self):
+        for slot in self.slots:
+            if slot["Task"] is None and self.pending:
+                slot["Task"] = self.pending.popleft()
+                slot["Connection"].send(slot["Task"][:2])
+
+    def finish_slot(self, slot_num, error=None, result=None):
+        slot = self.slots[slot_num]
+        future = slot["Task"][2]
+        if error is None:
+            slot["Task"] = None
+            slot["Deadline"] = None
+            future.set_result(result)
+            return
+        slot["Process"].kill()
+        slot["Process"].join()
+        slot["Connection"].close()
+        self.slots[slot_num] = self.start_slot()
+        future.set_exception(error)
+
+    def poll(self):
+        from multiprocessing.connection import wait
+        busy_list = [slot["Connection"] for slot in self.slots if slot["Task"] is not None]
+        deadline_list = [slot["Deadline"] for slot in self.slots if slot["Deadline"] is not None]
+        ready_list = wait(busy_list, max(min(deadline_list) - time.monotonic(), 0) if deadline_list else None)
+        for slot_num, slot in enumerate(self.slots):
+            if slot["Task"] is None:
+                continue
+            if slot["Connection"] in ready_list:
+                try:
+                    kind, value = slot["Connection"].recv()
+                except (EOFError, OSError):
+                    # The pipe can close before the process is reaped, so wait a moment for its exit code
+                    slot["Process"].join(1)
+                    self.finish_slot(slot_num, RuntimeError(f"the worker exited with code {slot["Process"].exitcode}"))
+                    continue
+                if kind == "Verifying":
+                    slot["Deadline"] = None if self.time_limit is None else time.monotonic() + self.time_limit
+                elif kind == "Error":
+                    slot["Task"][2].set_exception(RuntimeError(value))
+                    slot["Task"] = None
+                    slot["Deadline"] = None
+                else:
+                    self.finish_slot(slot_num, result=value)
+            elif slot["Deadline"] is not None and time.monotonic() >= slot["Deadline"]:
+                self.finish_slot(slot_num, om.SimTimeout(f"solution did not finish within the time limit of {self.time_limit}s"))
+        self.dispatch()
+
+    def result(self, future):
+        while not future.done():
+            self.poll()
+        return future.result()
+
+    def shutdown(self):
+        for slot in self.slots:
+            if slot["Task"] is None:
+                slot["Connection"].send(None)
+            else:
+                slot["Process"].kill()
+        for slot in self.slots:
+            slot["Process"].join()
+            slot["Connection"].close()
+
+def verify_solution(puzzle_bytes, solution_bytes, cycle_limit=None, time_limit=None):
+    with om.Sim(puzzle_bytes, solution_bytes, cycle_limit=cycle_limit, time_limit=time_limit) as solution_data:
+        metrics = solution_data.metrics(["cost", "cycles", "area"])
+        # The rate and intervals run the machine on past the outputs the puzzle asks for, so a solution that fails
+        # out there still succeeds, just without them
+        for name, metric in (("rate", solution_data.rate), ("output intervals", solution_data.output_intervals)):
+            try:
+                metrics[name] = metric()
+            except om.SimError:
+                metrics[name] = None
+        return metrics
+
+def solve_member(member, cycle_limit=None, time_limit=None, use_presim=False, use_libverify=True, compress_tapes=False, stage_stats=False, parallel_lanes=False, parallel_disassembly=None, products_per_loop=1,
+                 beam_width=1, beam_time_limit=None, verifying=None):
+    puzzle_num, puzzle_bytes = member
+    puzzle = om.Puzzle(puzzle_bytes)
+
+    result = {"Puzzle Num": puzzle_num, "Status": "Failed", "Message": None}
+
+    reason = check_puzzle(puzzle)
+    if reason is not None:
+        result["Message"] = reason
+        return result
+
+    solution = om.Solution()
+    solution.puzzle = puzzle.name
+    solution.name = b"SpadeBot"
+    solver = Spadebot(puzzle, stats={} if stage_stats else None, parallel_lanes=parallel_lanes, parallel_disassembly=parallel_disassembly,
+                      products_per_loop=products_per_loop, beam_width=beam_width, beam_time_limit=beam_time_limit)
+    try:
+        solution.parts = solver.solve()
+        if (parallel_disassembly is not None or products_per_loop > 1 or beam_width > 1) and solution.parts:
+            # Extra disassembly sides cost parts, extra products lengthen the loop, and the beam search only ranks
+            # schedules by how far along they are, so all of them are only kept when the loop comes out shorter for
+            # each product it builds
+            single_solver = Spadebot(puzzle, stats={} if stage_stats else None, parallel_lanes=parallel_lanes)
+            single_parts = single_solver.solve()
+            if single_parts and tape_period(single_parts) * solver.copies_per_loop <= tape_period(solution.parts):
+                solver = single_solver
+                solution.parts = single_parts
+    except Exception as err:
+        # One puzzle the solver can't handle is reported on its own, instead of taking the rest of the sweep down with it
+        result["Message"] = f"Spadebot raised {type(err).__name__}: {err}"
+        return result
+    if stage_stats:
+        result["Stage Stats"] = solver.stats
+
+    if not solution.parts:
+        result["Message"] = "No parts were generated"
+        return result
+
+    if solver.conflicts:
+        conflict = solver.conflicts[0]
+        result["Status"] = "Unverified"
+        result["Message"] = f"part {conflict["Part Num"]} is double-booked on cycle {conflict["Cycle"]} by {conflict["First Stage"]} and {conflict["Second Stage"]}"
+        return result
+
+    original_instructions = None
+    if compress_tapes:
+        original_instructions = [part.instructions for part in solution.parts]
+        tapes.compress_parts(puzzle, solution.parts)
+
+    solution_bytes = solution.to_bytes()
+    result["Solution"] = bytes(solution_bytes)
+
+    # The pre-simulator stands in for libverify when asked. Next to libverify, a layout it turns away is only flagged,
+    # since some of its checks are heuristics, and libverify still gives the verdict
+    if use_presim:
+        try:
+            presim_cycles = presim.check(puzzle, solution.parts)
+        except presim.PresimError as err:
+            if not use_libverify:
+                result["Status"] = "Unverified"
+                result["Message"] = err.message
+                return result
+            result["Presim Message"] = err.message
+        except NotImplementedError as err:
+            if not use_libverify:
+                result["Message"] = str(err)
+                return result
+        else:
+            if not use_libverify:
+                result["Status"] = "Presimulated"
+                result["Cycles"] = presim_cycles
+                return result
+
+    # The batch driver's workers are timed from here, and killed if libverify runs past the time limit
+    if verifying is not None:
+        verifying()
+    try:
+        try:
+            metrics = verify_solution(puzzle_bytes, solution_bytes, cycle_limit, time_limit)
+        except om.SimError as err:
+            if original_instructions is None or isinstance(err, om.SimTimeout):
+                raise
+            # libverify is the final word on what REPEAT and RESET mean, so fall back to the tapes as Spadebot wrote them
+            for part, instructions in zip(solution.parts, original_instructions):
+                part.instructions = instructions
+            solution_bytes = solution.to_bytes()
+            result["Solution"] = bytes(solution_bytes)
+            if verifying is not None:
+                verifying()
+            metrics = verify_solution(puzzle_bytes, solution_bytes, cycle_limit, time_limit)
+        result["Cost"] = metrics["cost"]
+        result["Cycles"] = metrics["cycles"]
+        result["Area"] = metrics["area"]
+        # Rates and intervals are kept as text so that infinite rates and repeating intervals survive the cache
+        result["Rate"] = None if metrics["rate"] is None else str(metrics["rate"])
+        result["Output Intervals"] = None if metrics["output intervals"] is None else str(metrics["output intervals"])
+        result["Status"] = "Succeeded"
+    except om.SimTimeout as err:
+        result["Status"] = "Timed Out"
+        result["Message"] = err.message
+    except om.SimError as err:
+        result["Status"] = "Unverified"
+        result["Message"] = err.message
+    return result
+
+def print_result(result):
+    puzzle_num = result["Puzzle Num"]
+    if result["Status"] == "Succeeded":
+        print(f"✅ - Puzzle #{puzzle_num} Succeeded! Cost: {result["Cost"]}, Cycles: {result["Cycles"]}, Area: {result["Area"]}, Rate: {result["Rate"] or "missing"}, Output Intervals: {result["Output Intervals"] or "missing"}")
+    elif result["Status"] == "Unverified":
+        print(f"❓ - Puzzle #{puzzle_num} Failed: Elements are in order, go fix it bozo")
+    elif result["Status"] == "Presimulated":
+        print(f"☑️ - Puzzle #{puzzle_num} passed the pre-simulator in {result["Cycles"]} cycles")
+    elif result["Status"] == "Timed Out":
+        print(f"⏱️ - Puzzle #{puzzle_num} timed out: {result["Message"]}")
+    elif result["Status"] == "Worker Failed":
+        print(f"💥 - Puzzle #{puzzle_num} lost its worker: {result["Message"]}")
+    else:
+        print(f"❌ - Puzzle #{puzzle_num} failed: {result["Message"]}")
+    if "Presim Message" in result:
+        print(f"   The pre-simulator flagged puzzle #{puzzle_num}: {result["Presim Message"]}")
+
+STAGE_BUCKETS = [0.0001, 0.001, 0.01, 0.1]
+STAGE_BUCKET_LABELS = ["<0.1ms", "<1ms", "<10ms", "<100ms", ">=100ms"]
+
+def add_stage_stats(histogram, stats):
+    for stage, record in stats.items():
+        entry = histogram.setdefault(stage, {"Times": [], "Instructions": 0, "Parts": 0, "Peak Memory": None})
+        entry["Times"].append(record["Time"])
+        entry["Instructions"] += record["Instructions"]
+        entry["Parts"] += record["Parts"]
+        if "Peak Memory" in record:
+            entry["Peak Memory"] = max(entry["Peak Memory"] or 0, record["Peak Memory"])
+
+def print_stage_histogram(histogram):
+    total = sum(sum(entry["Times"]) for entry in histogram.values()) or 1
+    print(f"{"Stage":<20} {"Total":>10} {"Share":>6} {"Mean":>9} {"Max":>9} " + " ".join(f"{label:>7}" for label in STAGE_BUCKET_LABELS)
+          + f" {"Instructions":>12} {"Parts":>7} {"Peak Memory":>11}")
+    for stage, entry in histogram.items():
+        times = entry["Times"]
+        buckets = [0] * len(STAGE_BUCKET_LABELS)
+        for stage_time in times:
+            buckets[bisect.bisect_right(STAGE_BUCKETS, stage_time)] += 1
+        peak_memory = "-" if entry["Peak Memory"] is None else f"{entry["Peak Memory"] / 1024:.0f} KB"
+        print(f"{stage:<20} {sum(times) * 1000:>8.1f}ms {sum(times) / total:>6.1%} {sum(times) / len(times) * 1000:>7.3f}ms {max(times) * 1000:>7.3f}ms "
+              + " ".join(f"{count:>7}" for count in buckets) + f" {entry["Instructions"]:>12} {entry["Parts"]:>7} {peak_memory:>11}")
+
+def run_batch(source="24hour-1-test.zip", workers=None, cache=None, read_ahead=4, cycle_limit=None, time_limit=None, use_presim=False, use_libverify=True, compress_tapes=False, stage_stats=False, parallel_lanes=False, parallel_disassembly=None, products_per_loop=1, beam_width=1, beam_time_limit=None):
+    from concurrent.futures import Future
+    from functools import partial
+    if isinstance(source, str):
+        import puzzlesource
+        source = puzzlesource.open_source(source)
+    workers = workers or os.cpu_count() or 1
+
+    # At most workers * read_ahead puzzles are held in memory at once, and results are reported in source order
+    pool = None
+    in_flight = deque()
+    results = []
+    histogram = {}
+
+    def finish(puzzle_num, puzzle_bytes, future):
         try:
-            print(f"✅ - Puzzle #{puzzle_num} Succeeded! Cost: {solution_data.metric("cost")}, Cycles: {solution_data.metric("cycles")}, Area: {solution_data.metric("area")}")
-            Successes += 1
-        except:
-            print(f"❓ - Puzzle #{puzzle_num} Failed: Elements are in order, go fix it bozo")
-print(f"Final Tally: {Successes}/1000")
\ No newline at end of file
+            result = future.result() if pool is None else pool.result(future)
+        except om.SimTimeout as err:
+            result = {"Puzzle Num": puzzle_num, "Status": "Timed Out", "Message": err.message}
+        except RuntimeError as err:
+            # A worker that crashed or was killed says nothing about the puzzle, so the result is never cached
+            result = {"Puzzle Num": puzzle_num, "Status": "Worker Failed", "Message": str(err)}
+        # Stage stats describe this run of the solver, so they are aggregated but never cached
+        if "Stage Stats" in result:
+            add_stage_stats(histogram, result.pop("Stage Stats"))
+        if cache is not None and puzzle_bytes is not None:
+            cache.put(puzzle_bytes, result)
+        result.pop("Solution", None)
+        print_result(result)
+        results.append(result)
+
+    start = time.perf_counter()
+    try:
+        for puzzle_num, puzzle_bytes in source:
+            cached = cache.get(puzzle_bytes) if cache is not None else None
+            if cached is not None:
+                # Puzzles that are already cached for this version of the solver skip the pool entirely
+                cached["Puzzle Num"] = puzzle_num
+                future = Future()
+                future.set_result(cached)
+                in_flight.append((puzzle_num, None, future))
+            else:
+                if pool is None:
+                    # Load libverify up front so a missing library is reported once, not once per worker
+                    if use_libverify:
+                        om.Sim.libverify()
+                    pool = WorkerPool(workers, solve_member, partial(init_worker, use_libverify, stage_stats), time_limit)
+                in_flight.append((puzzle_num, puzzle_bytes, pool.submit((puzzle_num, puzzle_bytes), cycle_limit, None, use_presim, use_libverify, compress_tapes, stage_stats, parallel_lanes, parallel_disassembly, products_per_loop, beam_width, beam_time_limit)))
+            while len(in_flight) >= workers * read_ahead:
+                finish(*in_flight.popleft())
+        while in_flight:
+            finish(*in_flight.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - start
+
+    successes = sum(result["Status"] == "Succeeded" for result in results)
+    timeouts = sum(result["Status"] == "Timed Out" for result in results)
+    presimulated = sum(result["Status"] == "Presimulated" for result in results)
+    print(f"Final Tally: {successes}/{len(results)}" + (f" ({timeouts} timed out)" if timeouts else "")
+          + (f" ({presimulated} passed the pre-simulator only)" if presimulated else ""))
+    print(f"Throughput: {len(results)} puzzles in {elapsed:.2f}s on {workers} workers ({len(results) / elapsed if elapsed else 0:.1f} puzzles/sec)")
+    if cache is not None:
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses")
+    if histogram:
+        print(f"Solver stages over {len(next(iter(histogram.values()))["Times"])} fresh solves:")
+        print_stage_histogram(histogram)
+    return results
+
+def cache_fingerprint(use_presim=False, use_libverify=True, compress_tapes=False, parallel_lanes=False, parallel_disassembly=None, products_per_loop=1, beam_width=1, beam_time_limit=None):
+    # Cached results are only shared between runs of the same source files with the same options
+    import resultcache
+    solver_fingerprint = resultcache.fingerprint([__file__, om.__file__, presim.__file__, tapes.__file__])
+    if not use_libverify:
+        solver_fingerprint += ":presim-only"
+    elif use_presim:
+        solver_fingerprint += ":presim"
+    if compress_tapes:
+        solver_fingerprint += ":compress-tapes"
+    if parallel_lanes:
+        solver_fingerprint += ":parallel-lanes"
+    if parallel_disassembly is not None:
+        solver_fingerprint += f":parallel-disassembly-{parallel_disassembly}"
+    if products_per_loop != 1:
+        solver_fingerprint += f":products-per-loop-{products_per_loop}"
+    if beam_width > 1:
+        solver_fingerprint += f":beam-{beam_width}" + (f"-{beam_time_limit}s" if beam_time_limit is not None else "")
+    return solver_fingerprint
+
+def main(argv=None):
+    import argparse
+    import resultcache
+    parser = argparse.ArgumentParser(description="Solve and verify every puzzle in a zip, tarball, or directory with Spadebot")
+    parser.add_argument("path", nargs="?", default="24hour-1-test.zip", help="zip, tarball, or directory of .puzzle files, or - for framed stdin")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--read-ahead", type=int, default=4, help="puzzles queued per worker")
+    parser.add_argument("--cycle-limit", type=int, default=None, help="give up verifying a solution after this many cycles")
+    parser.add_argument("--time-limit", type=float, default=None, help="give up verifying a solution after this many seconds")
+    parser.add_argument("--presim", action="store_true", help="also check layouts with the pure-Python pre-simulator, and flag the ones it turns away (libverify still decides)")
+    parser.add_argument("--presim-only", action="store_true", help="check solutions with the pre-simulator alone, without libverify")
+    parser.add_argument("--compress-tapes", action="store_true", help="fold periodic instruction tapes into REPEAT and RESET")
+    parser.add_argument("--parallel-lanes", action="store_true", help="interleave the atoms of different products instead of building them one after another")
+    parser.add_argument("--parallel-disassembly", type=int, nargs="?", const=3, default=None, metavar="MIN_HEIGHT",
+                        help="give unused sides of the centre to extra copies of reagents at least MIN_HEIGHT rows tall (default 3), trading cost for cycles")
+    parser.add_argument("--products-per-loop", type=int, default=1, metavar="N",
+                        help="build N of each product per loop of the tapes, for a better steady-state rate (cycles per output)")
+    parser.add_argument("--beam-width", type=int, default=1, metavar="N",
+                        help="keep the N best partial schedules when choosing which reagent atom feeds each product atom (default 1, greedy)")
+    parser.add_argument("--beam-time-limit", type=float, default=None, metavar="SECONDS",
+                        help="finish the beam search greedily after this many seconds per puzzle")
+    parser.add_argument("--stage-stats", action="store_true", help="time each solver stage and print a per-stage histogram (set PYTHONTRACEMALLOC=1 to record peak memory too)")
+    parser.add_argument("--cache", default=".spadebot-cache.sqlite", help="where to keep cached solutions and metrics")
+    parser.add_argument("--cache-size", type=int, default=256, help="cache size limit in MB")
+    parser.add_argument("--no-cache", action="store_true", help="solve and verify every puzzle from scratch")
+    args = parser.parse_args(argv)
+    use_presim = args.presim or args.presim_only
+    use_libverify = not args.presim_only
+
+    if args.no_cache:
+        run_batch(args.path, args.workers, None, args.read_ahead, args.cycle_limit, args.time_limit, use_presim, use_libverify, args.compress_tapes, args.stage_stats, args.parallel_lanes, args.parallel_disassembly, args.products_per_loop, args.beam_width, args.beam_time_limit)
+    else:
+        solver_fingerprint = cache_fingerprint(use_presim, use_libverify, args.compress_tapes, args.parallel_lanes, args.parallel_disassembly, args.products_per_loop, args.beam_width, args.beam_time_limit)
+        with resultcache.ResultCache(args.cache, solver_fingerprint, args.cache_size * 1024 * 1024) as cache:
+            run_batch(args.path, args.workers, cache, args.read_ahead, args.cycle_limit, args.time_limit, use_presim, use_libverify, args.compress_tapes, args.stage_stats, args.parallel_lanes, args.parallel_disassembly, args.products_per_loop, args.beam_width, args.beam_time_limit)
+
+if __name__ == "__main__":
+    main()
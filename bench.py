@@ -0,0 +1,178 @@
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import om
+import Spadebot
+
+# ----------------------------------------------------------------------------------------------------
+# Synthetic Puzzles: Rectangular reagents and products that Spadebot is able to solve
+# ----------------------------------------------------------------------------------------------------
+
+BASE_CASE = {"Reagents": 1, "Reagent Width": 2, "Reagent Height": 2, "Products": 1,
+             "Product Width": 2, "Product Height": 2, "Bond Density": 0.5}
+
+SWEEPS = {"Reagents": [1, 2, 3, 4],
+          "Reagent Width": [1, 2, 4, 6],
+          "Reagent Height": [1, 2, 3, 5],
+          "Product Width": [1, 2, 4, 6],
+          "Product Height": [1, 2, 3, 4],
+          "Bond Density": [0.0, 0.5, 1.0]}
+
+ELEMENTS = [om.Atom.SALT, om.Atom.AIR, om.Atom.EARTH, om.Atom.FIRE, om.Atom.WATER]
+
+def synthetic_molecule(rng, width, height, types, bond_density):
+    atoms = {}
+    for y in range(height):
+        for x in range(width):
+            atoms[(x, y)] = om.Atom(rng.choice(types), (x, y))
+    bonds = []
+    for (x, y) in atoms:
+        for dx, dy in ((1, 0), (0, 1), (-1, 1)):
+            if (x + dx, y + dy) in atoms and rng.random() < bond_density:
+                bonds.append(om.Bond(om.Bond.NORMAL, ((x, y), (x + dx, y + dy))))
+    return om.Molecule(atoms=list(atoms.values()), bonds=bonds)
+
+def synthetic_puzzle(case, seed=0):
+    rng = random.Random(json.dumps(case, sort_keys=True) + str(seed))
+    reagents = [synthetic_molecule(rng, case["Reagent Width"], case["Reagent Height"], ELEMENTS, 1.0)
+                for _ in range(case["Reagents"])]
+    reagent_types = sorted({atom.type for reagent in reagents for atom in reagent.atoms})
+    products = [synthetic_molecule(rng, case["Product Width"], case["Product Height"], reagent_types, case["Bond Density"])
+                for _ in range(case["Products"])]
+    puzzle = om.Puzzle(name=b"BENCH", reagents=reagents, products=products)
+    return bytes(puzzle.to_bytes())
+
+def bench_cases():
+    cases = [dict(BASE_CASE)]
+    for key, values in SWEEPS.items():
+        for value in values:
+            case = dict(BASE_CASE)
+            case[key] = value
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+# ----------------------------------------------------------------------------------------------------
+# Stub Verifier: Stands in for om.Sim when libverify can't be loaded, so the other stages still get timed
+# ----------------------------------------------------------------------------------------------------
+
+class StubSim:
+    def __init__(self, puzzle, solution):
+        self.puzzle = bytes(puzzle)
+        self.solution = bytes(solution)
+    def metric(self, metric):
+        return 0
+    def metrics(self, metrics):
+        return {metric: 0 for metric in metrics}
+    def close(self):
+        pass
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def load_verifier(use_stub):
+    if use_stub:
+        return StubSim
+    try:
+        om.Sim.libverify()
+    except (RuntimeError, OSError, AttributeError):
+        print("libverify is unavailable, timing the verify stage with a stub verifier", file=sys.stderr)
+        return StubSim
+    return om.Sim
+
+# ----------------------------------------------------------------------------------------------------
+# Timing: Each stage is timed on its own, repeated, and reported as the best and median run
+# ----------------------------------------------------------------------------------------------------
+
+def time_stage(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, {"Best": min(times), "Median": statistics.median(times), "Runs": repeat}
+
+def bench_case(case, verifier, repeat, seed=0):
+    puzzle_bytes = synthetic_puzzle(case, seed)
+    record = {"Case": case, "Verifier": verifier.__name__, "Stages": {}}
+
+    puzzle, record["Stages"]["Parse"] = time_stage(lambda: om.Puzzle(puzzle_bytes), repeat)
+    parts, record["Stages"]["Solve"] = time_stage(lambda: Spadebot.spadehandler(puzzle, "bench"), repeat)
+    if not parts:
+        record["Error"] = "Spadebot produced no parts"
+        return record
+
+    solution = om.Solution(puzzle=puzzle.name, name=b"SpadeBot", parts=parts)
+    solution_bytes, record["Stages"]["Encode"] = time_stage(solution.to_bytes, repeat)
+
+    def verify():
+        with verifier(puzzle_bytes, solution_bytes) as sim:
+            return sim.metrics(["cost", "cycles", "area"])
+    try:
+        record["Metrics"], record["Stages"]["Verify"] = time_stage(verify, repeat)
+    except om.SimError as err:
+        record["Error"] = err.message
+
+    record["Parts"] = len(parts)
+    record["Instructions"] = sum(len(part.instructions) for part in parts)
+    record["Solution Bytes"] = len(solution_bytes)
+    return record
+
+# ----------------------------------------------------------------------------------------------------
+# Startup: Cold imports in a fresh interpreter each run, as a worker process pays for them
+# ----------------------------------------------------------------------------------------------------
+
+STARTUP_MODULES = ["om", "tapes", "presim", "Spadebot"]
+
+def time_import(module):
+    # -X importtime reports each import's cumulative cost in microseconds, without the interpreter's own startup
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True, check=True)
+    for line in reversed(process.stderr.splitlines()):
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1e6
+    raise RuntimeError(f"no import time reported for {module}")
+
+def bench_startup(repeat):
+    records = []
+    for module in STARTUP_MODULES:
+        times = [time_import(module) for _ in range(repeat)]
+        modules = subprocess.run([sys.executable, "-c", f"import sys; import {module}; print(len(sys.modules))"],
+                                 capture_output=True, text=True, check=True).stdout.strip()
+        records.append({"Startup": module, "Best": min(times), "Median": statistics.median(times), "Runs": repeat,
+                        "Modules Loaded": int(modules)})
+    return records
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time Spadebot's solve, encode, parse and verify stages on synthetic puzzles")
+    parser.add_argument("--output", default="bench_output.txt", help="where to write one JSON record per case")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic puzzles")
+    parser.add_argument("--stub", action="store_true", help="always use the stub verifier")
+    parser.add_argument("--startup", action="store_true", help="time cold imports of the solver's modules instead")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        with open(args.output, "w") as output:
+            for record in bench_startup(args.repeat):
+                output.write(json.dumps(record) + "\n")
+                print(f"import {record["Startup"]}: {record["Best"] * 1000:.2f}ms best, {record["Median"] * 1000:.2f}ms median, {record["Modules Loaded"]} modules loaded")
+        return
+
+    verifier = load_verifier(args.stub)
+    with open(args.output, "w") as output:
+        for case in bench_cases():
+            record = bench_case(case, verifier, args.repeat, args.seed)
+            output.write(json.dumps(record) + "\n")
+            stages = ", ".join(f"{stage}: {timing["Best"] * 1000:.2f}ms" for stage, timing in record["Stages"].items())
+            print(f"{json.dumps(case)} -> {stages}")
+
+if __name__ == "__main__":
+    main()
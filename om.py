@@ -1,5 +1,16 @@
 # CHANGELOG
 #
+#  2026-10-18 (spadebot): keep a timed-out sim's buffers alive until libverify is done reading them
+#  2026-10-18 (spadebot): drop the encoded puzzle cache, which slowed down decoding and copied lists assigned to puzzles and molecules
+#  2026-10-18 (spadebot): remove om.SimPool, which could close sims its callers were still using and had nothing to reuse between them
+#  2026-10-18 (spadebot): import ctypes, fractions, and re only when om.Sim or om.OutputIntervals need them
+#  2026-10-18 (spadebot): add cycle and wall-clock limits to om.Sim, raised as om.SimTimeout
+#  2026-10-18 (spadebot): add om.Sim.metrics() for reading several metrics at once, and declare libverify argtypes/restypes once
+#  2026-10-18 (spadebot): add om.InstructionList for compact instruction storage, and __slots__ on om.Instruction, om.Atom, om.Bond, and om.Part
+#  2026-10-18 (spadebot): cache encoded puzzles until they are modified, and pass buffers to om.Sim without copying them
+#  2026-10-18 (spadebot): encode with cached struct.Struct objects and pack each part's instructions in one preallocated block
+#  2026-10-18 (spadebot): decode files by offset with cached struct.Struct objects, and accept bytearray, memoryview, and mmap input
+#  2026-10-18 (spadebot): release libverify verifiers with om.Sim.close(), `with`, or garbage collection, and add om.SimPool
 #  2024-09-22 (panic): prompt to download libverify.so/libverify.dll when appropriate
 #  2024-07-06 (panic): add tutorial video link
 #  2024-06-06 (panic): properly convert from memoryview to bytes when decoding strings
@@ -69,6 +80,7 @@
 #
 #  puzzle = om.Puzzle(b'...')
 #     creates a puzzle from bytes in puzzle file format
+#     a bytearray, memoryview, or mmap.mmap is accepted too, and is read in place without being copied
 #
 #  data = puzzle.to_bytes()
 #     encodes a puzzle as a byte array in puzzle file format and returns it
@@ -243,6 +255,7 @@
 #
 #  sol = om.Solution(b'...')
 #     creates a solution from bytes in solution file format
+#     a bytearray, memoryview, or mmap.mmap is accepted too, and is read in place without being copied
 #
 #  data = sol.to_bytes()
 #     encodes a solution as a byte array in solution file format and returns it
@@ -288,7 +301,7 @@
 #  part.length = 2  (for arms)
 #  part.rotation = 4
 #  part.which_reagent_or_product = 0  (for inputs and outputs)
-#  part.instructions = [om.Instruction(0, b'g'), om.Instruction(1, b'r'), om.Instruction(2, b'G'), om.Instruction(3, b'R')]
+#  part.instructions = [om.Instruction(0, b'g'), om.Instruction(1, b'r'), om.Instruction(2, b'G'), om.Instruction(3, b'R')]  (or an om.InstructionList)
 #  part.track_hexes = [(0, 0), (1, 0)]  (for parts named b'track')
 #  part.arm_number = 0  (for arms)
 #  part.conduit_id = 100  (for parts named b'pipe')
@@ -332,6 +345,8 @@
 #  print(inst.index, inst.instruction)
 #     prints the index and the encoding byte
 #
+#  om.Instruction uses __slots__, so it only has the index and instruction attributes
+#
 #  here is the full list of instruction constants:
 #     om.Instruction.ROTATE_CW
 #     om.Instruction.ROTATE_CCW
@@ -347,12 +362,30 @@
 #     om.Instruction.RESET
 #     om.Instruction.NOOP
 
+# === om.InstructionList ===
+#  om.InstructionList is a compact alternative to a list of om.Instruction objects
+#  it stores the indices in an array('i') and the encoding bytes in a bytearray
+#
+#  part.instructions = om.InstructionList()
+#     gives a part compact instruction storage
+#
+#  part.instructions.add(0, om.Instruction.GRAB)
+#     adds an instruction without creating an om.Instruction object
+#
+#  part.instructions.append(om.Instruction(1, om.Instruction.DROP))
+#     om.InstructionList also supports len(), iteration, indexing, slicing, insert(), pop(), del, and sort()
+#     note that the om.Instruction objects it returns are copies -- assign them back with part.instructions[i] = inst
+#
+#  print(part.instructions.indices, part.instructions.opcodes)
+#     accesses the underlying columns directly
+
 # === om.Sim ===
 #  om.Sim is a convenient wrapper around omsim's libverify
 #
 #  sim = om.Sim('/path/to/file.puzzle', '/path/to/file.solution')
 #     creates a new sim by reading the puzzle and solution from files
 #     requires either libverify.so or libverify.dll to be in the library search path (otherwise raises RuntimeError)
+#     libverify (and ctypes) are only loaded when the first sim is created, so importing om stays cheap
 #     other errors are raised as om.SimError
 #
 #  sim = om.Sim(b'...', b'...')
@@ -363,11 +396,28 @@
 #
 #  sim = om.Sim('/path/to/file.puzzle', om.Solution(...))
 #     these forms can be mixed and matched
+#     bytes-like puzzles and solutions (bytes, bytearray, memoryview, mmap.mmap) are passed to libverify without copying them
+#     om.Puzzle and om.Solution objects are encoded each time a sim is created, so pass the file bytes instead when you already have them
+#
+#  sim = om.Sim('/path/to/file.puzzle', '/path/to/file.solution', cycle_limit=20000, time_limit=5.0)
+#     stops simulating after 20000 cycles or 5 seconds of wall-clock time, whichever comes first, and raises om.SimTimeout
+#     the wall-clock budget covers every measurement made with the sim, starting from when it is created
+#     a sim that runs out of time is closed, and its verifier is released once libverify returns
+#     libverify can't be interrupted, so until then it keeps a helper thread busy -- to get the CPU back straight away,
+#     verify in a process that can be killed instead (Spadebot's batch driver kills and replaces workers that run over)
+#
+#  sim = om.Sim.from_buffers(puzzle_bytes, solution_bytes)
+#     creates a sim that reads the puzzle and solution buffers in place instead of making its own copy
+#     the buffers must not change while the sim is open
 #
 #  result = sim.metric('cycles')
 #     measures a metric (as listed on http://events.critelli.technology/static/metrics.html)
 #     collisions and other errors are raised as om.SimError
 #
+#  results = sim.metrics(['cost', 'cycles', 'area'])
+#     measures several metrics at once and returns them as a dict, e.g. {'cost': 150, 'cycles': 80, 'area': 12}
+#     the error check happens once after all of the metrics, so if any of them fails the whole call raises om.SimError
+#
 #  result = sim.approximate_metric('cycles')
 #     like sim.metric(), but supports "approximate" metrics like "per repetition^2 area"
 #
@@ -382,6 +432,14 @@
 #  intervals = sim.output_intervals()
 #     measures the intervals between output drops (aka lexicographic cycles)
 #     returns the intervals as an om.OutputIntervals object which can be compared with other such objects
+#
+#  sim.close()
+#     releases the verifier held by the sim -- this also happens when the sim is garbage collected
+#     any further calls on the sim raise ValueError
+#
+#  with om.Sim('/path/to/file.puzzle', '/path/to/file.solution') as sim:
+#     cycles = sim.metric('cycles')
+#     the verifier is released at the end of the with block
 
 # === om.SimError ===
 #  om.SimError tracks the message, cycle, and location of a collision or error reported by om.Sim
@@ -392,54 +450,115 @@
 #  except om.SimError as err:
 #     print(err.message, err.cycle, err.location[0], err.location[1])
 
+# === om.SimTimeout ===
+#  om.SimTimeout is the om.SimError raised when a sim hits its cycle_limit or time_limit
+#
+#  try:
+#     result = sim.metric('cycles')
+#  except om.SimTimeout as err:
+#     print('too slow:', err.message)
+#  except om.SimError as err:
+#     print('collision:', err.message)
+
 # SPECIAL THANKS TO
 #
 #   F43nd1r, for documentating the OM puzzle and solution formats at <https://github.com/F43nd1r/omsp/blob/master/Formats.md>
 
-import ctypes
-from fractions import Fraction
-import re
+from array import array
+import mmap
 import struct
+import sys
+import threading
+import time
 
 class Decoder:
+    structs = {}
+    @classmethod
+    def compiled(cls, struct_format):
+        compiled = cls.structs.get(struct_format)
+        if compiled is None:
+            compiled = cls.structs[struct_format] = struct.Struct(struct_format)
+        return compiled
     def __init__(self, initial_bytes):
-        self.bytes = memoryview(initial_bytes)
+        self.bytes = memoryview(initial_bytes).cast('B')
+        self.offset = 0
     def read_struct_format(self, struct_format):
-        n = struct.calcsize(struct_format)
-        if n > len(self.bytes):
+        compiled = Decoder.compiled(struct_format)
+        offset = self.offset
+        if offset + compiled.size > len(self.bytes):
             raise ValueError('not enough bytes left in file to parse value')
-        result = struct.unpack_from(struct_format, self.bytes)
-        self.bytes = self.bytes[n:]
-        return result
+        self.offset = offset + compiled.size
+        return compiled.unpack_from(self.bytes, offset)
+    def read_struct_array(self, struct_format, count):
+        compiled = Decoder.compiled(struct_format)
+        offset = self.offset
+        end = offset + compiled.size * count
+        if end > len(self.bytes):
+            raise ValueError('not enough bytes left in file to parse value')
+        self.offset = end
+        return compiled.iter_unpack(self.bytes[offset:end])
     def read_string(self):
         n = 0
         shift = 0
         while True:
-            byte, = self.read_struct_format('<B')
+            if self.offset >= len(self.bytes):
+                raise ValueError('not enough bytes left in file to parse value')
+            byte = self.bytes[self.offset]
+            self.offset += 1
             n |= (byte & 0x7f) << shift
             shift += 7
             if byte & 0x80 == 0:
                 break
-        if n > len(self.bytes):
+        if self.offset + n > len(self.bytes):
             raise ValueError('not enough bytes left in file to parse value')
-        result = bytes(self.bytes[:n])
-        self.bytes = self.bytes[n:]
+        result = bytes(self.bytes[self.offset:self.offset + n])
+        self.offset += n
         return result
 class Encoder:
     def __init__(self):
         self.bytes = bytearray()
     def write_struct_format(self, struct_format, *values):
+        self.bytes += Decoder.compiled(struct_format).pack(*values)
+    def write_struct_array(self, struct_format, rows):
+        compiled = Decoder.compiled(struct_format)
+        offset = len(self.bytes)
+        self.bytes.extend(bytes(compiled.size * len(rows)))
+        for row in rows:
+            compiled.pack_into(self.bytes, offset, *row)
+            offset += compiled.size
+    def write_instructions(self, instructions):
+        # each instruction is a little-endian int32 index followed by one opcode byte, so the whole
+        # block can be laid out as five interleaved byte columns instead of packing one at a time
+        n = len(instructions)
+        if isinstance(instructions, InstructionList):
+            indices, opcodes = instructions.indices, instructions.opcodes
+        else:
+            opcodes = b''.join([instruction.instruction for instruction in instructions])
+            try:
+                indices = array('i', [instruction.index for instruction in instructions])
+            except (OverflowError, TypeError):
+                indices = None
+        if indices is None or indices.itemsize != 4 or len(opcodes) != n:
+            self.write_struct_array('<ic', [(instruction.index, instruction.instruction) for instruction in instructions])
+            return
+        if sys.byteorder != 'little':
+            indices = array('i', indices)
+            indices.byteswap()
+        index_bytes = indices.tobytes()
         offset = len(self.bytes)
-        self.bytes.extend(bytes(struct.calcsize(struct_format)))
-        struct.pack_into(struct_format, self.bytes, offset, *values)
+        end = offset + 5 * n
+        self.bytes.extend(bytes(5 * n))
+        for k in range(4):
+            self.bytes[offset + k:end:5] = index_bytes[k::4]
+        self.bytes[offset + 4:end:5] = opcodes
     def write_string(self, string):
         n = len(string)
         while True:
             if n < 0x80:
-                self.write_struct_format('<B', n)
+                self.bytes.append(n)
                 break
             else:
-                self.write_struct_format('<B', 0x80 | (n & 0x7f))
+                self.bytes.append(0x80 | (n & 0x7f))
                 n >>= 7
         self.bytes.extend(string)
 
@@ -478,12 +597,12 @@ class Puzzle:
         if isinstance(file, str):
             with open(file, 'rb') as f:
                 decoder = Decoder(f.read())
-        elif isinstance(file, bytes):
+        elif isinstance(file, (bytes, bytearray, memoryview, mmap.mmap)):
             decoder = Decoder(file)
         elif isinstance(file, Puzzle):
             decoder = Decoder(file.to_bytes())
         elif file is not None:
-            raise ValueError('Puzzle() may only take a filename, bytes, or another Puzzle as a positional parameter')
+            raise ValueError('Puzzle() may only take a filename, a bytes-like object, or another Puzzle as a positional parameter')
         if decoder is None:
             return
         if decoder.read_struct_format('<I') != (3,):
@@ -529,20 +648,14 @@ class Molecule:
         if decoder is None:
             return
         natoms, = decoder.read_struct_format('<I')
-        for i in range(natoms):
-            t, u, v = decoder.read_struct_format('<Bbb')
-            self.atoms.append(Atom(t, (u, v)))
+        self.atoms.extend(Atom(t, (u, v)) for t, u, v in decoder.read_struct_array('<Bbb', natoms))
         nbonds, = decoder.read_struct_format('<I')
-        for i in range(nbonds):
-            t, u0, v0, u1, v1 = decoder.read_struct_format('<Bbbbb')
-            self.bonds.append(Bond(t, ((u0, v0), (u1, v1))))
+        self.bonds.extend(Bond(t, ((u0, v0), (u1, v1))) for t, u0, v0, u1, v1 in decoder.read_struct_array('<Bbbbb', nbonds))
     def encode(self, encoder):
         encoder.write_struct_format('<I', len(self.atoms))
-        for atom in self.atoms:
-            encoder.write_struct_format('<Bbb', atom.type, atom.position[0], atom.position[1])
+        encoder.write_struct_array('<Bbb', [(atom.type, atom.position[0], atom.position[1]) for atom in self.atoms])
         encoder.write_struct_format('<I', len(self.bonds))
-        for bond in self.bonds:
-            encoder.write_struct_format('<Bbbbb', bond.type, bond.positions[0][0], bond.positions[0][1], bond.positions[1][0], bond.positions[1][1])
+        encoder.write_struct_array('<Bbbbb', [(bond.type, bond.positions[0][0], bond.positions[0][1], bond.positions[1][0], bond.positions[1][1]) for bond in self.bonds])
 class Atom:
     SALT = 1
     AIR = 2
@@ -560,6 +673,7 @@ class Atom:
     MORS = 14
     REPETITION_PLACEHOLDER = 15
     QUINTESSENCE = 16
+    __slots__ = ('type', 'position')
     def __init__(self, type, position):
         self.type = type
         self.position = position
@@ -569,6 +683,7 @@ class Bond:
     TRIPLEX_BLACK = 1<<2
     TRIPLEX_YELLOW = 1<<3
     TRIPLEX = TRIPLEX_RED | TRIPLEX_BLACK | TRIPLEX_YELLOW
+    __slots__ = ('type', 'positions')
     def __init__(self, type, positions):
         self.type = type
         self.positions = positions
@@ -617,12 +732,10 @@ class Conduit:
         u0, v0, u1, v1, nhexes = decoder.read_struct_format('<bbbbI')
         self.starting_position_a = (u0, v0)
         self.starting_position_b = (u1, v1)
-        for i in range(nhexes):
-            self.hexes.append(decoder.read_struct_format('<bb'))
+        self.hexes.extend(decoder.read_struct_array('<bb', nhexes))
     def encode(self, encoder):
         encoder.write_struct_format('<bbbbI', self.starting_position_a[0], self.starting_position_a[1], self.starting_position_b[0], self.starting_position_b[1], len(self.hexes))
-        for h in self.hexes:
-            encoder.write_struct_format('<bb', *h)
+        encoder.write_struct_array('<bb', self.hexes)
 class Vial:
     def __init__(self, position, vial_count, flip_vertically):
         self.position = position
@@ -642,12 +755,12 @@ class Solution:
         if isinstance(file, str):
             with open(file, 'rb') as f:
                 decoder = Decoder(f.read())
-        elif isinstance(file, bytes):
+        elif isinstance(file, (bytes, bytearray, memoryview, mmap.mmap)):
             decoder = Decoder(file)
         elif isinstance(file, Solution):
             decoder = Decoder(file.to_bytes())
         elif file is not None:
-            raise ValueError('Solution() may only take a filename, bytes, or another Solution as a positional parameter')
+            raise ValueError('Solution() may only take a filename, a bytes-like object, or another Solution as a positional parameter')
         if decoder is None:
             return
         if decoder.read_struct_format('<I') != (7,):
@@ -708,13 +821,14 @@ class Part:
     OUTPUT_STANDARD = b'out-std'
     OUTPUT_REPEATING = b'out-rep'
     CONDUIT = b'pipe'
+    __slots__ = ('name', 'position', 'length', 'rotation', 'which_reagent_or_product', 'instructions', 'track_hexes', 'arm_number', 'conduit_id', 'conduit_hexes')
     def __init__(self, *, decoder=None, name=b'', position=(0, 0), length=0, rotation=0, which_reagent_or_product=0, instructions=None, track_hexes=None, arm_number=0, conduit_id=0, conduit_hexes=None):
         self.name = name
         self.position = position
         self.length = length
         self.rotation = rotation
         self.which_reagent_or_product = which_reagent_or_product
-        self.instructions = instructions or []
+        self.instructions = [] if instructions is None else instructions
         self.track_hexes = track_hexes or []
         self.arm_number = arm_number
         self.conduit_id = conduit_id
@@ -726,31 +840,25 @@ class Part:
             raise ValueError('unknown part version number in solution file')
         self.position = decoder.read_struct_format('<ii')
         self.length, self.rotation, self.which_reagent_or_product, ninstrs = decoder.read_struct_format('<IiII')
-        for i in range(ninstrs):
-            self.instructions.append(Instruction(*decoder.read_struct_format('<ic')))
+        self.instructions.extend(Instruction(index, instruction) for index, instruction in decoder.read_struct_array('<ic', ninstrs))
         if self.name == b'track':
             ntrack, = decoder.read_struct_format('<I')
-            for i in range(ntrack):
-                self.track_hexes.append(decoder.read_struct_format('<ii'))
+            self.track_hexes.extend(decoder.read_struct_array('<ii', ntrack))
         self.arm_number, = decoder.read_struct_format('<I')
         if self.name == b'pipe':
             self.conduit_id, npipe = decoder.read_struct_format('<II')
-            for i in range(npipe):
-                self.conduit_hexes.append(decoder.read_struct_format('<ii'))
+            self.conduit_hexes.extend(decoder.read_struct_array('<ii', npipe))
     def encode(self, encoder):
         encoder.write_string(self.name)
         encoder.write_struct_format('<BiiIiII', 1, self.position[0], self.position[1], self.length, self.rotation, self.which_reagent_or_product, len(self.instructions))
-        for instruction in self.instructions:
-            encoder.write_struct_format('<ic', instruction.index, instruction.instruction)
+        encoder.write_instructions(self.instructions)
         if self.name == b'track':
             encoder.write_struct_format('<I', len(self.track_hexes))
-            for track_hex in self.track_hexes:
-                encoder.write_struct_format('<ii', track_hex[0], track_hex[1])
+            encoder.write_struct_array('<ii', self.track_hexes)
         encoder.write_struct_format('<I', self.arm_number)
         if self.name == b'pipe':
             encoder.write_struct_format('<II', self.conduit_id, len(self.conduit_hexes))
-            for conduit_hex in self.conduit_hexes:
-                encoder.write_struct_format('<ii', conduit_hex[0], conduit_hex[1])
+            encoder.write_struct_array('<ii', self.conduit_hexes)
 class Instruction:
     ROTATE_CW = b'R'
     ROTATE_CCW = b'r'
@@ -765,15 +873,80 @@ class Instruction:
     REPEAT = b'C'
     RESET = b'X'
     NOOP = b'O'
+    __slots__ = ('index', 'instruction')
     def __init__(self, index, instruction):
         self.index = index
         self.instruction = instruction
+    def __repr__(self):
+        return f'Instruction({self.index}, {self.instruction})'
+class InstructionList:
+    # column layout: instruction i is Instruction(indices[i], opcodes[i:i+1])
+    OPCODES = [bytes((opcode,)) for opcode in range(256)]
+    __slots__ = ('indices', 'opcodes')
+    def __init__(self, instructions=()):
+        self.indices = array('i')
+        self.opcodes = bytearray()
+        self.extend(instructions)
+    def add(self, index, instruction):
+        if len(instruction) != 1:
+            raise ValueError('instruction must be a single byte')
+        self.indices.append(index)
+        self.opcodes += instruction
+    def append(self, instruction):
+        self.add(instruction.index, instruction.instruction)
+    def extend(self, instructions):
+        if isinstance(instructions, InstructionList):
+            self.indices.extend(instructions.indices)
+            self.opcodes += instructions.opcodes
+            return
+        for instruction in instructions:
+            self.add(instruction.index, instruction.instruction)
+    def insert(self, i, instruction):
+        if len(instruction.instruction) != 1:
+            raise ValueError('instruction must be a single byte')
+        self.indices.insert(i, instruction.index)
+        self.opcodes.insert(i, instruction.instruction[0])
+    def pop(self, i=-1):
+        instruction = self[i]
+        del self[i]
+        return instruction
+    def clear(self):
+        del self.indices[:]
+        del self.opcodes[:]
+    def sort(self, *, key=None, reverse=False):
+        instructions = sorted(self, key=key, reverse=reverse)
+        self.clear()
+        self.extend(instructions)
+    def __len__(self):
+        return len(self.indices)
+    def __iter__(self):
+        opcodes = InstructionList.OPCODES
+        for index, opcode in zip(self.indices, self.opcodes):
+            yield Instruction(index, opcodes[opcode])
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            result = InstructionList()
+            result.indices = self.indices[i]
+            result.opcodes = self.opcodes[i]
+            return result
+        return Instruction(self.indices[i], InstructionList.OPCODES[self.opcodes[i]])
+    def __setitem__(self, i, instruction):
+        if len(instruction.instruction) != 1:
+            raise ValueError('instruction must be a single byte')
+        self.indices[i] = instruction.index
+        self.opcodes[i] = instruction.instruction[0]
+    def __delitem__(self, i):
+        del self.indices[i]
+        del self.opcodes[i]
+    def __repr__(self):
+        return f'InstructionList({list(self)})'
 
 class Sim:
     lv = None
     @classmethod
     def libverify(cls):
         if cls.lv is None:
+            import ctypes
             while cls.lv is None:
                 import platform
                 download_url = None
@@ -806,18 +979,61 @@ class Sim:
                         else:
                             raise RuntimeError(f'unable to load {libverify} -- to use om.Sim, download <https://github.com/ianh/omsim>, use `make` to build the library, and place it in the search path or working directory')
             cls.lv.verifier_create_from_bytes.restype = ctypes.c_void_p
-            cls.lv.verifier_error.restype = ctypes.c_char_p
-            cls.lv.verifier_evaluate_approximate_metric.restype = ctypes.c_double
+            if hasattr(cls.lv, 'verifier_create_from_bytes_without_copying'):
+                cls.lv.verifier_create_from_bytes_without_copying.restype = ctypes.c_void_p
+            for name, argtypes, restype in Sim.signatures(ctypes):
+                if not hasattr(cls.lv, name):
+                    continue
+                function = getattr(cls.lv, name)
+                function.argtypes = argtypes
+                function.restype = restype
         return cls.lv
-    def __init__(self, puzzle, solution):
+    @staticmethod
+    def signatures(ctypes):
+        return [
+            ('verifier_destroy', [ctypes.c_void_p], None),
+            ('verifier_error', [ctypes.c_void_p], ctypes.c_char_p),
+            ('verifier_error_cycle', [ctypes.c_void_p], ctypes.c_int),
+            ('verifier_error_location_u', [ctypes.c_void_p], ctypes.c_int),
+            ('verifier_error_location_v', [ctypes.c_void_p], ctypes.c_int),
+            ('verifier_error_clear', [ctypes.c_void_p], None),
+            ('verifier_evaluate_metric', [ctypes.c_void_p, ctypes.c_char_p], ctypes.c_int),
+            ('verifier_evaluate_approximate_metric', [ctypes.c_void_p, ctypes.c_char_p], ctypes.c_double),
+            ('verifier_number_of_output_intervals', [ctypes.c_void_p], ctypes.c_int),
+            ('verifier_output_interval', [ctypes.c_void_p, ctypes.c_int], ctypes.c_int),
+            ('verifier_output_intervals_repeat_after', [ctypes.c_void_p], ctypes.c_int),
+            ('verifier_set_cycle_limit', [ctypes.c_void_p, ctypes.c_int], None),
+        ]
+    metric_names = {}
+    @staticmethod
+    def metric_name(metric):
+        name = Sim.metric_names.get(metric)
+        if name is None:
+            name = Sim.metric_names[metric] = metric.encode('utf-8')
+        return name
+    @staticmethod
+    def pointer(buffer):
+        import ctypes
+        if isinstance(buffer, bytes):
+            return ctypes.c_char_p(buffer)
+        try:
+            return (ctypes.c_char * memoryview(buffer).nbytes).from_buffer(buffer)
+        except (TypeError, ValueError):
+            return ctypes.c_char_p(bytes(buffer))
+    @classmethod
+    def from_buffers(cls, puzzle_buffer, solution_buffer):
+        return cls(puzzle_buffer, solution_buffer, copy=False)
+    def __init__(self, puzzle, solution, *, copy=True, cycle_limit=None, time_limit=None):
+        self.verifier = None
+        self.buffers = None
+        self.cycle_limit = cycle_limit
+        self.deadline = None if time_limit is None else time.monotonic() + time_limit
         puzzle_bytes = puzzle
         if isinstance(puzzle_bytes, str):
             with open(puzzle_bytes, 'rb') as f:
                 puzzle_bytes = f.read()
         elif isinstance(puzzle_bytes, Puzzle):
-            encoder = Encoder()
-            puzzle_bytes.encode(encoder)
-            puzzle_bytes = encoder.bytes
+            puzzle_bytes = puzzle_bytes.to_bytes()
         solution_bytes = solution
         if isinstance(solution_bytes, str):
             with open(solution_bytes, 'rb') as f:
@@ -826,27 +1042,116 @@ class Sim:
             encoder = Encoder()
             solution_bytes.encode(encoder)
             solution_bytes = encoder.bytes
-        self.verifier = ctypes.c_void_p(Sim.libverify().verifier_create_from_bytes(
-            ctypes.c_char_p(bytes(puzzle_bytes)), ctypes.c_int(len(puzzle_bytes)),
-            ctypes.c_char_p(bytes(solution_bytes)), ctypes.c_int(len(solution_bytes))
+        puzzle_pointer = Sim.pointer(puzzle_bytes)
+        solution_pointer = Sim.pointer(solution_bytes)
+        import ctypes
+        create = Sim.libverify().verifier_create_from_bytes
+        if not copy:
+            # libverify keeps pointing into these buffers, so they have to outlive the verifier
+            self.buffers = (puzzle_bytes, solution_bytes, puzzle_pointer, solution_pointer)
+            if hasattr(Sim.libverify(), 'verifier_create_from_bytes_without_copying'):
+                create = Sim.libverify().verifier_create_from_bytes_without_copying
+        self.verifier = ctypes.c_void_p(create(
+            puzzle_pointer, ctypes.c_int(memoryview(puzzle_bytes).nbytes),
+            solution_pointer, ctypes.c_int(memoryview(solution_bytes).nbytes)
         ))
         if Sim.libverify().verifier_error(self.verifier):
-            raise SimError(Sim.libverify(), self.verifier)
+            err = SimError(Sim.libverify(), self.verifier)
+            self.close()
+            raise err
+        if cycle_limit is not None and hasattr(Sim.lv, 'verifier_set_cycle_limit'):
+            Sim.lv.verifier_set_cycle_limit(self.verifier, cycle_limit)
+    def close(self):
+        if self.verifier is not None:
+            if Sim.lv is not None:
+                Sim.lv.verifier_destroy(self.verifier)
+            self.verifier = None
+        self.buffers = None
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    def __del__(self):
+        self.close()
+    def check_open(self):
+        if self.verifier is None:
+            raise ValueError('om.Sim has been closed')
+    def run(self, evaluate):
+        self.check_open()
+        try:
+            if self.deadline is None:
+                return evaluate(self.verifier)
+            return self.run_until_deadline(evaluate)
+        except SimTimeout:
+            raise
+        except SimError as err:
+            if self.cycle_limit is not None and (err.cycle >= self.cycle_limit or 'cycle limit' in err.message):
+                raise SimTimeout(f'solution did not finish within the cycle limit of {self.cycle_limit}', err.cycle, err.location) from err
+            raise
+    def run_until_deadline(self, evaluate):
+        # libverify can't be interrupted, so it runs on a helper thread (ctypes releases the GIL) while
+        # this thread waits for the deadline -- if time runs out, the helper keeps running until libverify
+        # returns and then destroys the verifier, so callers that can't spare the CPU should use a process
+        # the helper holds its own reference to the buffers too, since a verifier made without copying reads
+        # straight out of them and an abandoned one is still reading after this sim has let them go
+        verifier = self.verifier
+        buffers = self.buffers
+        lock = threading.Lock()
+        outcome = {}
+        def target():
+            nonlocal buffers
+            try:
+                outcome['result'] = evaluate(verifier)
+            except BaseException as err:
+                outcome['error'] = err
+            with lock:
+                outcome['done'] = True
+                if outcome.get('abandoned') and Sim.lv is not None:
+                    Sim.lv.verifier_destroy(verifier)
+            buffers = None
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(max(self.deadline - time.monotonic(), 0))
+        with lock:
+            if not outcome.get('done'):
+                outcome['abandoned'] = True
+                self.verifier = None
+                self.buffers = None
+                raise SimTimeout('solution did not finish within the time limit')
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
     def metric(self, metric):
-        result = Sim.libverify().verifier_evaluate_metric(self.verifier, ctypes.c_char_p(metric.encode('utf-8')))
-        if Sim.libverify().verifier_error(self.verifier):
-            raise SimError(Sim.libverify(), self.verifier)
-        return result
+        name = Sim.metric_name(metric)
+        def evaluate(verifier):
+            result = Sim.lv.verifier_evaluate_metric(verifier, name)
+            if Sim.lv.verifier_error(verifier):
+                raise SimError(Sim.lv, verifier)
+            return result
+        return self.run(evaluate)
+    def metrics(self, metrics):
+        names = [(metric, Sim.metric_name(metric)) for metric in metrics]
+        def evaluate(verifier):
+            function = Sim.lv.verifier_evaluate_metric
+            results = {metric: function(verifier, name) for metric, name in names}
+            if Sim.lv.verifier_error(verifier):
+                raise SimError(Sim.lv, verifier)
+            return results
+        return self.run(evaluate)
     def approximate_metric(self, metric):
-        result = Sim.libverify().verifier_evaluate_approximate_metric(self.verifier, ctypes.c_char_p(metric.encode('utf-8')))
-        if Sim.libverify().verifier_error(self.verifier):
-            raise SimError(Sim.libverify(), self.verifier)
-        return result
+        name = Sim.metric_name(metric)
+        def evaluate(verifier):
+            result = Sim.lv.verifier_evaluate_approximate_metric(verifier, name)
+            if Sim.lv.verifier_error(verifier):
+                raise SimError(Sim.lv, verifier)
+            return result
+        return self.run(evaluate)
     def rate(self):
         cycles = self.metric('per repetition cycles')
         outputs = self.metric('per repetition outputs')
         if outputs == 0:
             return float('inf')
+        from fractions import Fraction
         return Fraction(cycles, outputs)
     def area_at_infinity(self):
         outputs = self.metric('per repetition outputs')
@@ -861,12 +1166,14 @@ class Sim:
             if outputs == 0:
                 return (float('inf'), float('inf'))
             else:
+                from fractions import Fraction
                 return (1, Fraction(a1, outputs))
         return (0, self.metric('steady state area'))
     def output_intervals(self):
-        return OutputIntervals.from_verifier(Sim.libverify(), self.verifier)
+        return self.run(lambda verifier: OutputIntervals.from_verifier(Sim.lv, verifier))
 class OutputIntervals:
     def __init__(self, pattern=''):
+        import re
         m = re.fullmatch(r"(\d+(?: \d+)*)|(?:(\d+(?: \d+)*) )?(?:\[(\d+(?: \d+)*)\])?", pattern)
         if m is None:
             raise ValueError('invalid syntax for output intervals')
@@ -900,7 +1207,7 @@ class OutputIntervals:
             intervals.repeats_after = n
         intervals.intervals = []
         for i in range(n):
-            intervals.intervals.append(libverify.verifier_output_interval(verifier, ctypes.c_int(i)))
+            intervals.intervals.append(libverify.verifier_output_interval(verifier, i))
         if libverify.verifier_error(verifier):
             raise SimError(libverify, verifier)
         return intervals
@@ -954,3 +1261,9 @@ class SimError(Exception):
         self.location = (libverify.verifier_error_location_u(verifier), libverify.verifier_error_location_v(verifier))
         libverify.verifier_error_clear(verifier)
         super().__init__(self.message, self.cycle, self.location)
+class SimTimeout(SimError):
+    def __init__(self, message, cycle=-1, location=(-1, -1)):
+        self.message = message
+        self.cycle = cycle
+        self.location = location
+        Exception.__init__(self, self.message, self.cycle, self.location)
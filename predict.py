@@ -0,0 +1,173 @@
+import om
+import presim
+import tapes
+
+# ----------------------------------------------------------------------------------------------------
+# Predictor: Estimate a layout's metrics from its parts and schedule, without simulating it
+# ----------------------------------------------------------------------------------------------------
+#
+# Cost is exact, since it only depends on which parts are placed. Cycles come from the cycles on which a
+# solve lets go of each finished product: every tape loops on the longest one, so each product comes out
+# at the same offsets in every loop, and the last required output is a sum. Area only counts footprints:
+# glyphs, tracks, inputs, outputs, and every hex an arm's base or grippers stop on along its tape, so it
+# leaves out hexes that held molecules sweep through. Tapes are read as Spadebot wrote them, before any
+# REPEAT or RESET folding.
+
+PART_COSTS = {om.Part.ARM1: 20, om.Part.ARM2: 30, om.Part.ARM3: 30, om.Part.ARM6: 30, om.Part.PISTON: 40,
+              om.Part.BERLO: 30, om.Part.BONDER: 10, om.Part.UNBONDER: 10, om.Part.TRIPLEX: 20,
+              om.Part.MULTIBONDER: 30, om.Part.CALCIFICATION: 10, om.Part.DISPERSION: 20, om.Part.DISPOSAL: 0,
+              om.Part.DUPLICATION: 20, om.Part.ANIMISMUS: 20, om.Part.EQUILIBRIUM: 0, om.Part.PROJECTION: 20,
+              om.Part.PURIFICATION: 20, om.Part.UNIFICATION: 20}
+
+TRACK_COST = 5
+
+METRICS = ["cost", "cycles", "area"]
+
+def cost(parts):
+    total = 0
+    for part in parts:
+        if part.name == om.Part.TRACK:
+            total += TRACK_COST * len(part.track_hexes)
+        else:
+            total += PART_COSTS.get(part.name, 0)
+    return total
+
+def cycles(puzzle, parts, output_cycles):
+    indices = [index for part in parts for index, _ in tapes.sorted_tape(part.instructions)]
+    if not indices or not all(output_cycles):
+        return float("inf")
+    first = min(indices)
+    period = max(indices) - first + 1
+    last_output = presim.OUTPUTS_PER_SCALE * puzzle.output_scale - 1
+    finished = 0
+    for release_list in output_cycles:
+        release_list = sorted(release - first for release in release_list)
+        finished = max(finished, release_list[last_output % len(release_list)] + (last_output // len(release_list)) * period)
+    return finished + 1
+
+def arm_hexes(part, tracks):
+    base = tuple(part.position)
+    rotation = part.rotation
+    length = part.length
+    track, track_index = tracks.get(base, (None, None))
+    grippers = presim.GRIPPERS[part.name]
+
+    def reach():
+        yield base
+        for gripper in grippers:
+            du, dv = presim.DIRECTIONS[(rotation + gripper) % 6]
+            yield (base[0] + length * du, base[1] + length * dv)
+
+    hexes = set(reach())
+    instructions = part.instructions
+    if any(opcode in (tapes.REPEAT, tapes.RESET) for _, opcode in tapes.sorted_tape(instructions)):
+        instructions = tapes.expand(instructions)
+    for _, opcode in tapes.sorted_tape(instructions):
+        if opcode not in tapes.MOVES:
+            continue
+        axis, step = tapes.MOVES[opcode]
+        if axis == 0:
+            if track is None:
+                continue
+            track_index = min(max(track_index + step, 0), len(track) - 1)
+            base = track[track_index]
+        elif axis == 1:
+            rotation += step
+        else:
+            length += step
+        hexes.update(reach())
+    return hexes
+
+def area(puzzle, parts):
+    hexes = set()
+    tracks = {}
+    for part in parts:
+        if part.name == om.Part.TRACK:
+            track = [(part.position[0] + u, part.position[1] + v) for u, v in part.track_hexes]
+            hexes.update(track)
+            for track_index, hex in enumerate(track):
+                tracks[hex] = (track, track_index)
+    for part in parts:
+        if part.name in presim.GRIPPERS:
+            hexes.update(arm_hexes(part, tracks))
+        elif part.name in presim.GLYPH_HEXES:
+            hexes.update(presim.place(hex, part.position, part.rotation) for hex in presim.GLYPH_HEXES[part.name])
+        elif part.name in (om.Part.INPUT, om.Part.OUTPUT_STANDARD):
+            molecule = (puzzle.reagents if part.name == om.Part.INPUT else puzzle.products)[part.which_reagent_or_product]
+            hexes.update(presim.place(atom.position, part.position, part.rotation) for atom in molecule.atoms)
+    return len(hexes)
+
+def predict(puzzle, parts, output_cycles):
+    return {"cost": cost(parts), "cycles": cycles(puzzle, parts, output_cycles), "area": area(puzzle, parts)}
+
+# ----------------------------------------------------------------------------------------------------
+# Calibration: Predict and verify every puzzle in a corpus, and report how far apart the two are
+# ----------------------------------------------------------------------------------------------------
+
+def calibrate(source, use_libverify=True, solver_options=None):
+    import Spadebot
+    import puzzlesource
+    rows = []
+    failures = 0
+    for puzzle_num, puzzle_bytes in puzzlesource.open_source(source):
+        puzzle = om.Puzzle(puzzle_bytes)
+        if Spadebot.check_puzzle(puzzle) is not None:
+            continue
+        solver = Spadebot.Spadebot(puzzle, **(solver_options or {}))
+        parts = solver.solve()
+        if not parts or solver.conflicts:
+            failures += 1
+            continue
+        predicted = predict(puzzle, parts, solver.output_cycles)
+        try:
+            if use_libverify:
+                solution = om.Solution()
+                solution.puzzle = puzzle.name
+                solution.name = b"SpadeBot"
+                solution.parts = parts
+                measured = Spadebot.verify_solution(puzzle_bytes, solution.to_bytes())
+            else:
+                measured = {"cycles": presim.check(puzzle, parts)}
+        except (om.SimError, NotImplementedError):
+            failures += 1
+            continue
+        rows.append({"Puzzle Num": puzzle_num, "Predicted": predicted, "Measured": {metric: measured[metric] for metric in METRICS if metric in measured}})
+    return rows, failures
+
+def print_calibration(rows, failures):
+    import statistics
+    print(f"Calibrated on {len(rows)} puzzles ({failures} could not be verified)")
+    print(f"{"Metric":<8} {"Puzzles":>8} {"Exact":>7} {"Mean Error":>11} {"Mean |Error|":>13} {"Max |Error|":>12} {"Mean Ratio":>11} {"Rank Corr":>10}")
+    for metric in METRICS:
+        pairs = [(row["Predicted"][metric], row["Measured"][metric]) for row in rows if metric in row["Measured"]]
+        if not pairs:
+            continue
+        errors = [predicted - measured for predicted, measured in pairs]
+        ratios = [predicted / measured for predicted, measured in pairs if measured]
+        try:
+            rank_correlation = f"{statistics.correlation(*zip(*pairs), method="ranked"):.3f}"
+        except statistics.StatisticsError:
+            rank_correlation = "-"
+        print(f"{metric:<8} {len(pairs):>8} {sum(error == 0 for error in errors):>7} {statistics.fmean(errors):>11.2f} "
+              f"{statistics.fmean(map(abs, errors)):>13.2f} {max(map(abs, errors)):>12} {statistics.fmean(ratios) if ratios else 0:>11.3f} {rank_correlation:>10}")
+
+def main(argv=None):
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Compare predicted cost, cycles, and area with verified metrics across a corpus")
+    parser.add_argument("path", nargs="?", default="24hour-1-test.zip", help="zip, tarball, or directory of .puzzle files")
+    parser.add_argument("--presim", action="store_true", help="check predicted cycles against the pre-simulator instead of libverify")
+    parser.add_argument("--parallel-lanes", action="store_true", help="solve with parallel lanes")
+    parser.add_argument("--products-per-loop", type=int, default=1, metavar="N", help="solve with N of each product per loop")
+    parser.add_argument("--output", default=None, help="also write one JSON record per puzzle to this file")
+    args = parser.parse_args(argv)
+
+    rows, failures = calibrate(args.path, not args.presim, {"parallel_lanes": args.parallel_lanes, "products_per_loop": args.products_per_loop})
+    print_calibration(rows, failures)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            for row in rows:
+                output_file.write(json.dumps(row) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import om
+import tapes
+
+# ----------------------------------------------------------------------------------------------------
+# Pre-Simulator: Walk the instruction tapes cycle by cycle and reject colliding layouts before libverify
+# ----------------------------------------------------------------------------------------------------
+#
+# Only footprints are modelled: atoms and arm bases sit in a spatial hash keyed by hex, and every cycle is
+# checked once all of its arms have moved. Two atoms on one hex, an atom on an arm base, a molecule pulled
+# two ways at once, or a product molecule with the wrong atoms on an output fail on the cycle they happen.
+# Atoms sweeping through each other partway through a rotation are not caught, so a clean run still needs
+# libverify for the final word. The footprints are also only an approximation of the game's rules, so a
+# layout rejected here can still be one libverify accepts: next to libverify a rejection is only a flag.
+
+DIRECTIONS = [(1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1), (1, -1)]
+
+GRIPPERS = {om.Part.ARM1: (0,), om.Part.ARM2: (0, 3), om.Part.ARM3: (0, 2, 4), om.Part.ARM6: (0, 1, 2, 3, 4, 5),
+            om.Part.PISTON: (0,)}
+
+GLYPH_HEXES = {om.Part.BONDER: ((0, 0), (1, 0)), om.Part.UNBONDER: ((0, 0), (1, 0))}
+
+PASSIVE_PARTS = {om.Part.TRACK, om.Part.EQUILIBRIUM, om.Part.INPUT, om.Part.OUTPUT_STANDARD}
+
+OUTPUTS_PER_SCALE = 6
+
+class PresimError(om.SimError):
+    def __init__(self, message, cycle=-1, location=(-1, -1)):
+        self.message = message
+        self.cycle = cycle
+        self.location = location
+        Exception.__init__(self, self.message, self.cycle, self.location)
+
+def rotate(hex, turns):
+    u, v = hex
+    for _ in range(turns % 6):
+        u, v = -v, u + v
+    return (u, v)
+
+def place(hex, position, rotation):
+    u, v = rotate(hex, rotation)
+    return (u + position[0], v + position[1])
+
+def transform(hex, center, turns, delta):
+    u, v = rotate((hex[0] - center[0], hex[1] - center[1]), turns)
+    return (u + center[0] + delta[0], v + center[1] + delta[1])
+
+class Arm:
+    __slots__ = ('number', 'base', 'rotation', 'length', 'grippers', 'is_piston', 'track', 'track_index', 'held')
+
+    def __init__(self, number, part, tracks):
+        self.number = number
+        self.base = tuple(part.position)
+        self.rotation = part.rotation
+        self.length = part.length
+        self.grippers = GRIPPERS[part.name]
+        self.is_piston = part.name == om.Part.PISTON
+        self.track, self.track_index = tracks.get(self.base, (None, None))
+        self.held = None
+
+    def tip(self, gripper):
+        du, dv = DIRECTIONS[(self.rotation + gripper) % 6]
+        return (self.base[0] + self.length * du, self.base[1] + self.length * dv)
+
+class Presim:
+
+    # ----------------------------------------------------------------------------------------------------
+    # Layout: Arms, tracks, glyphs, inputs, and outputs, placed once from the part list
+    # ----------------------------------------------------------------------------------------------------
+
+    def __init__(self, puzzle, parts):
+        self.puzzle = puzzle
+        self.arms = []
+        self.glyphs = []
+        self.inputs = []
+        self.outputs = []
+        self.required = OUTPUTS_PER_SCALE * puzzle.output_scale
+
+        tracks = {}
+        for part in parts:
+            if part.name == om.Part.TRACK:
+                track = [(part.position[0] + u, part.position[1] + v) for u, v in part.track_hexes]
+                loops = len(track) > 2 and (track[0][0] - track[-1][0], track[0][1] - track[-1][1]) in DIRECTIONS
+                for track_index, hex in enumerate(track):
+                    tracks[hex] = ((track, loops), track_index)
+
+        arm_tapes = []
+        for part in parts:
+            if part.name in GRIPPERS:
+                arm = Arm(len(self.arms), part, tracks)
+                self.arms.append(arm)
+                arm_tapes.append((arm, self.expand_tape(part.instructions)))
+            elif part.name in GLYPH_HEXES:
+                hexes = [place(hex, part.position, part.rotation) for hex in GLYPH_HEXES[part.name]]
+                self.glyphs.append((part.name == om.Part.BONDER, hexes[0], hexes[1]))
+            elif part.name == om.Part.INPUT:
+                self.inputs.append(self.place_molecule(puzzle.reagents[part.which_reagent_or_product], part))
+            elif part.name == om.Part.OUTPUT_STANDARD:
+                atoms, bonds = self.place_molecule(puzzle.products[part.which_reagent_or_product], part)
+                bond_set = {frozenset(bond) for bond in bonds}
+                self.outputs.append([part.which_reagent_or_product, dict(atoms), bond_set, 0])
+            elif part.name not in PASSIVE_PARTS:
+                raise NotImplementedError(f"the pre-simulator can't model {part.name.decode()} parts")
+
+        # Tapes are laid out from the earliest instruction on any arm, and all of them loop on the longest one
+        indices = [instruction.index for arm, instructions in arm_tapes for instruction in instructions]
+        first = min(indices, default=0)
+        self.period = max(indices, default=0) - first + 1
+        self.schedule = [[] for _ in range(self.period)]
+        for arm, instructions in arm_tapes:
+            booked = set()
+            for instruction in instructions:
+                if instruction.index in booked:
+                    raise PresimError(f"arm {arm.number} has two instructions on the same cycle", instruction.index - first, arm.base)
+                booked.add(instruction.index)
+                if instruction.instruction != om.Instruction.NOOP:
+                    self.schedule[instruction.index - first].append((arm, instruction.instruction))
+
+        self.position = {}
+        self.type = {}
+        self.bonds = {}
+        self.occupied = {}
+        self.bases = {arm.base: arm for arm in self.arms}
+        self.next_atom = 0
+
+    def expand_tape(self, instructions):
+        if not any(instruction.instruction in (om.Instruction.REPEAT, om.Instruction.RESET) for instruction in instructions):
+            return instructions
+        try:
+            return tapes.expand(instructions)
+        except ValueError as err:
+            raise PresimError(str(err))
+
+    def place_molecule(self, molecule, part):
+        atoms = [(place(atom.position, part.position, part.rotation), atom.type) for atom in molecule.atoms]
+        bonds = [tuple(place(position, part.position, part.rotation) for position in bond.positions) for bond in molecule.bonds]
+        return atoms, bonds
+
+    # ----------------------------------------------------------------------------------------------------
+    # Molecules: Atoms are numbered, and molecules are found by walking bonds whenever they are needed
+    # ----------------------------------------------------------------------------------------------------
+
+    def molecule(self, atom):
+        found = {atom}
+        stack = [atom]
+        while stack:
+            for neighbour in self.bonds[stack.pop()]:
+                if neighbour not in found:
+                    found.add(neighbour)
+                    stack.append(neighbour)
+        return found
+
+    def held_atoms(self):
+        return {atom for arm in self.arms if arm.held for atom in arm.held if atom is not None}
+
+    def remove_atom(self, atom):
+        del self.occupied[self.position.pop(atom)]
+        del self.type[atom]
+        for neighbour in self.bonds.pop(atom):
+            self.bonds[neighbour].discard(atom)
+
+    # ----------------------------------------------------------------------------------------------------
+    # Cycle Phases: Inputs spawn, arms grab and drop, glyphs fire, outputs consume, then arms move
+    # ----------------------------------------------------------------------------------------------------
+
+    def spawn_inputs(self):
+        for atoms, bonds in self.inputs:
+            if any(hex in self.occupied for hex, _ in atoms):
+                continue
+            for hex, atom_type in atoms:
+                self.position[self.next_atom] = hex
+                self.type[self.next_atom] = atom_type
+                self.bonds[self.next_atom] = set()
+                self.occupied[hex] = self.next_atom
+                self.next_atom += 1
+            for hex1, hex2 in bonds:
+                atom1, atom2 = self.occupied[hex1], self.occupied[hex2]
+                self.bonds[atom1].add(atom2)
+                self.bonds[atom2].add(atom1)
+
+    def apply_glyphs(self):
+        for is_bonder, hex1, hex2 in self.glyphs:
+            atom1 = self.occupied.get(hex1)
+            atom2 = self.occupied.get(hex2)
+            if atom1 is None or atom2 is None:
+                continue
+            if is_bonder:
+                self.bonds[atom1].add(atom2)
+                self.bonds[atom2].add(atom1)
+            else:
+                self.bonds[atom1].discard(atom2)
+                self.bonds[atom2].discard(atom1)
+
+    def consume_outputs(self, cycle):
+        held = None
+        for output in self.outputs:
+            product_num, atom_types, bond_set, _ = output
+            atoms = [self.occupied.get(hex) for hex in atom_types]
+            if None in atoms:
+                continue
+            # A product can be several molecules, so everything bonded to the footprint has to be on it
+            molecule = set()
+            for atom in atoms:
+                if atom not in molecule:
+                    molecule |= self.molecule(atom)
+            if len(molecule) != len(atoms):
+                continue
+            if held is None:
+                held = self.held_atoms()
+            if not held.isdisjoint(molecule):
+                continue
+            for hex, atom in zip(atom_types, atoms):
+                if self.type[atom] != atom_types[hex]:
+                    raise PresimError(f"product {product_num} was assembled with the wrong atom on its output", cycle, hex)
+            bonds = {frozenset((self.position[atom], self.position[neighbour])) for atom in atoms for neighbour in self.bonds[atom]}
+            if bonds != bond_set:
+                continue
+            for atom in atoms:
+                self.remove_atom(atom)
+            output[3] += 1
+
+    def move_arms(self, movers, cycle):
+        # Work out where every held molecule ends up before touching the spatial hash, so that arms moving
+        # the same molecule together are fine and arms moving it differently are caught
+        moved = {}
+        moved_bases = {}
+        molecules = {}
+        for arm, opcode in movers:
+            center, turns, delta = arm.base, 0, (0, 0)
+            if opcode == om.Instruction.ROTATE_CW or opcode == om.Instruction.ROTATE_CCW:
+                turns = -1 if opcode == om.Instruction.ROTATE_CW else 1
+                arm.rotation += turns
+            elif opcode == om.Instruction.EXTEND or opcode == om.Instruction.RETRACT:
+                if not arm.is_piston:
+                    raise PresimError(f"arm {arm.number} can't extend or retract", cycle, arm.base)
+                step = 1 if opcode == om.Instruction.EXTEND else -1
+                if not 1 <= arm.length + step <= 3:
+                    raise PresimError(f"piston {arm.number} can't reach length {arm.length + step}", cycle, arm.base)
+                du, dv = DIRECTIONS[arm.rotation % 6]
+                delta = (step * du, step * dv)
+                arm.length += step
+            elif opcode == om.Instruction.TRACK_PLUS or opcode == om.Instruction.TRACK_MINUS:
+                if arm.track is None:
+                    raise PresimError(f"arm {arm.number} isn't on a track", cycle, arm.base)
+                track, loops = arm.track
+                track_index = arm.track_index + (1 if opcode == om.Instruction.TRACK_PLUS else -1)
+                if loops:
+                    track_index %= len(track)
+                elif not 0 <= track_index < len(track):
+                    raise PresimError(f"arm {arm.number} ran off the end of its track", cycle, arm.base)
+                new_base = track[track_index]
+                delta = (new_base[0] - arm.base[0], new_base[1] - arm.base[1])
+                moved_bases[arm] = new_base
+                arm.track_index = track_index
+            elif opcode == om.Instruction.PIVOT_CW or opcode == om.Instruction.PIVOT_CCW:
+                turns = -1 if opcode == om.Instruction.PIVOT_CW else 1
+            else:
+                raise PresimError(f"arm {arm.number} has an unknown instruction {opcode!r}", cycle, arm.base)
+
+            if not arm.held:
+                continue
+            for gripper, held_atom in zip(arm.grippers, arm.held):
+                if held_atom is None:
+                    continue
+                if held_atom not in molecules:
+                    molecule = self.molecule(held_atom)
+                    for atom in molecule:
+                        molecules[atom] = molecule
+                pivot = arm.tip(gripper) if opcode in (om.Instruction.PIVOT_CW, om.Instruction.PIVOT_CCW) else center
+                for atom in molecules[held_atom]:
+                    hex = transform(self.position[atom], pivot, turns, delta)
+                    if moved.setdefault(atom, hex) != hex:
+                        raise PresimError("a molecule is being moved in two directions at once", cycle, self.position[atom])
+
+        if moved:
+            moving_arms = {arm for arm, _ in movers}
+            for arm in self.arms:
+                if arm.held and arm not in moving_arms:
+                    for atom in arm.held:
+                        if atom in moved:
+                            raise PresimError(f"arm {arm.number} is holding a molecule that another arm is moving", cycle, self.position[atom])
+
+        for arm, new_base in moved_bases.items():
+            if self.bases.get(arm.base) is arm:
+                del self.bases[arm.base]
+        for arm, new_base in moved_bases.items():
+            arm.base = new_base
+            self.bases[new_base] = arm
+
+        for atom in moved:
+            del self.occupied[self.position[atom]]
+        for atom, hex in moved.items():
+            if hex in self.occupied:
+                raise PresimError("atoms collided", cycle, hex)
+            if hex in self.bases:
+                raise PresimError(f"an atom collided with the base of arm {self.bases[hex].number}", cycle, hex)
+            self.occupied[hex] = atom
+            self.position[atom] = hex
+        for arm, new_base in moved_bases.items():
+            if new_base in self.occupied:
+                raise PresimError(f"the base of arm {arm.number} collided with an atom", cycle, new_base)
+
+    def step(self, cycle):
+        self.spawn_inputs()
+        movers = []
+        for arm, opcode in self.schedule[cycle % self.period]:
+            if opcode == om.Instruction.GRAB:
+                if not arm.held:
+                    arm.held = [self.occupied.get(arm.tip(gripper)) for gripper in arm.grippers]
+            elif opcode == om.Instruction.DROP:
+                arm.held = None
+            else:
+                movers.append((arm, opcode))
+        self.apply_glyphs()
+        self.consume_outputs(cycle)
+        if movers:
+            self.move_arms(movers, cycle)
+
+    # ----------------------------------------------------------------------------------------------------
+    # Running: Step until every output is complete, failing on the first conflict or when time runs out
+    # ----------------------------------------------------------------------------------------------------
+
+    def run(self, max_cycles=None):
+        if max_cycles is None:
+            max_cycles = self.period * (self.required + 4)
+        for cycle in range(max_cycles):
+            self.step(cycle)
+            if all(output[3] >= self.required for output in self.outputs):
+                return cycle + 1
+        counts = ", ".join(f"{output[3]}/{self.required}" for output in self.outputs)
+        raise PresimError(f"outputs were not completed within {max_cycles} cycles ({counts})", max_cycles)
+
+def check(puzzle, parts, max_cycles=None):
+    return Presim(puzzle, parts).run(max_cycles)
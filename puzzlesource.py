@@ -0,0 +1,84 @@
+import os
+import re
+import struct
+import sys
+import tarfile
+import zipfile
+
+# ----------------------------------------------------------------------------------------------------
+# Puzzle Sources: Lazily yield (id, bytes) pairs from zips, tarballs, directories, or framed stdin
+# ----------------------------------------------------------------------------------------------------
+
+def puzzle_id(name):
+    # Use the last number in the file name when there is one (e.g. "puzzle-042.puzzle" -> "042"), otherwise the stem
+    stem = os.path.splitext(os.path.basename(name))[0]
+    numbers = re.findall(r"\d+", stem)
+    return numbers[-1] if numbers else stem
+
+def iter_zip(path):
+    with zipfile.ZipFile(path, "r") as puzzle_zip:
+        for info in puzzle_zip.infolist():
+            if info.is_dir() or info.file_size == 0:
+                continue
+            yield puzzle_id(info.filename), puzzle_zip.read(info)
+
+def iter_tar(path):
+    # Stream mode reads members in archive order without building the full member index first
+    with tarfile.open(path, "r|*") as puzzle_tar:
+        for info in puzzle_tar:
+            if not info.isfile() or info.size == 0:
+                continue
+            yield puzzle_id(info.name), puzzle_tar.extractfile(info).read()
+
+def iter_directory(path, suffix=".puzzle"):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(suffix):
+                continue
+            with open(os.path.join(root, name), "rb") as f:
+                puzzle_bytes = f.read()
+            if len(puzzle_bytes) == 0:
+                continue
+            yield puzzle_id(name), puzzle_bytes
+
+def read_frame(stream, what):
+    header = stream.read(4)
+    if len(header) == 0:
+        return None
+    if len(header) != 4:
+        raise ValueError(f"truncated {what} length in framed input")
+    n, = struct.unpack("<I", header)
+    data = stream.read(n)
+    if len(data) != n:
+        raise ValueError(f"truncated {what} in framed input")
+    return data
+
+def iter_frames(stream):
+    # Each frame is a little-endian uint32 length and a name, then a little-endian uint32 length and the puzzle bytes
+    while True:
+        name = read_frame(stream, "name")
+        if name is None:
+            return
+        puzzle_bytes = read_frame(stream, "puzzle")
+        if puzzle_bytes is None:
+            raise ValueError("framed input ended between a name and its puzzle")
+        if len(puzzle_bytes) == 0:
+            continue
+        yield name.decode("utf-8"), puzzle_bytes
+
+def write_frame(stream, name, puzzle_bytes):
+    name = name.encode("utf-8")
+    stream.write(struct.pack("<I", len(name)) + name + struct.pack("<I", len(puzzle_bytes)))
+    stream.write(puzzle_bytes)
+
+def open_source(path):
+    if path == "-":
+        return iter_frames(sys.stdin.buffer)
+    if os.path.isdir(path):
+        return iter_directory(path)
+    if zipfile.is_zipfile(path):
+        return iter_zip(path)
+    if tarfile.is_tarfile(path):
+        return iter_tar(path)
+    raise ValueError(f"{path} is not a zip, tarball, directory, or - for framed stdin")
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# ----------------------------------------------------------------------------------------------------
+# Result Cache: Solver output and verifier metrics, keyed on the puzzle bytes and the solver's source
+# ----------------------------------------------------------------------------------------------------
+
+# A timeout says more about the limits of the run that hit it than about the puzzle, and a worker that crashed or was
+# killed says nothing about it at all, so neither is kept for later runs
+UNCACHED_STATUSES = ("Timed Out", "Worker Failed")
+
+def fingerprint(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+# Results are committed, and the size limit enforced, every few puts or seconds during a sweep, so a sweep that is killed
+# keeps what it had solved and the cache never runs far over its limit
+class ResultCache:
+    def __init__(self, path=".spadebot-cache.sqlite", solver_fingerprint="", max_bytes=256 * 1024 * 1024, flush_every=100, flush_interval=5.0):
+        self.solver_fingerprint = solver_fingerprint
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT, solution BLOB, size INTEGER, last_used REAL)")
+
+    def key(self, puzzle_bytes):
+        return hashlib.sha256(self.solver_fingerprint.encode() + b"\0" + bytes(puzzle_bytes)).hexdigest()
+
+    def get(self, puzzle_bytes):
+        key = self.key(puzzle_bytes)
+        row = self.connection.execute("SELECT result, solution FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        result = json.loads(row[0])
+        result["Solution"] = row[1]
+        return result
+
+    def put(self, puzzle_bytes, result):
+        if result.get("Status") in UNCACHED_STATUSES:
+            return
+        stored = {name: value for name, value in result.items() if name not in ("Solution", "Puzzle Num")}
+        encoded = json.dumps(stored)
+        solution = result.get("Solution")
+        size = len(encoded) + (len(solution) if solution else 0)
+        self.connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                                (self.key(puzzle_bytes), encoded, solution, size, time.time()))
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def evict(self):
+        total, = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self.connection.execute("SELECT key, size FROM results ORDER BY last_used").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def flush(self):
+        self.evict()
+        self.connection.commit()
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,175 @@
+import om
+
+# ----------------------------------------------------------------------------------------------------
+# Tape Compression: Fold instruction tapes into REPEAT and RESET, and expand them back out again
+# ----------------------------------------------------------------------------------------------------
+#
+# A RESET drops whatever the arm holds and then undoes its track, rotation, and extension changes one
+# cycle at a time. A REPEAT replays its section, gaps included, where a section starts at the arm's first
+# instruction or at the first instruction after a RESET. compress() only writes the shapes that don't
+# depend on finer points of the game's rules: a RESET with a single kind of movement to undo, and at most
+# one REPEAT between RESETs, starting on the cycle its section does. It also only keeps a compressed tape
+# if expand() gives back exactly the original.
+
+GRAB = om.Instruction.GRAB[0]
+DROP = om.Instruction.DROP[0]
+REPEAT = om.Instruction.REPEAT[0]
+RESET = om.Instruction.RESET[0]
+
+MOVES = {om.Instruction.TRACK_PLUS[0]: (0, 1), om.Instruction.TRACK_MINUS[0]: (0, -1),
+         om.Instruction.ROTATE_CCW[0]: (1, 1), om.Instruction.ROTATE_CW[0]: (1, -1),
+         om.Instruction.EXTEND[0]: (2, 1), om.Instruction.RETRACT[0]: (2, -1)}
+
+UNDO = [(om.Instruction.TRACK_MINUS[0], om.Instruction.TRACK_PLUS[0]),
+        (om.Instruction.ROTATE_CW[0], om.Instruction.ROTATE_CCW[0]),
+        (om.Instruction.RETRACT[0], om.Instruction.EXTEND[0])]
+
+ARMS = {om.Part.ARM1, om.Part.ARM2, om.Part.ARM3, om.Part.ARM6, om.Part.PISTON}
+
+def sorted_tape(instructions):
+    if isinstance(instructions, om.InstructionList):
+        return sorted(zip(instructions.indices, instructions.opcodes))
+    return sorted((instruction.index, instruction.instruction[0]) for instruction in instructions)
+
+def to_instructions(tape):
+    instructions = om.InstructionList()
+    for index, opcode in tape:
+        instructions.indices.append(index)
+        instructions.opcodes.append(opcode)
+    return instructions
+
+def step(state, opcode):
+    if opcode == GRAB:
+        state[3] = True
+    elif opcode == DROP:
+        state[3] = False
+    elif opcode in MOVES:
+        axis, sign = MOVES[opcode]
+        state[axis] += sign
+
+def reset_moves(state):
+    moves = [DROP] if state[3] else []
+    for axis, (undo_positive, undo_negative) in enumerate(UNDO):
+        moves += [undo_positive if state[axis] > 0 else undo_negative] * abs(state[axis])
+    return moves
+
+def expand(instructions):
+    tape = []
+    state = [0, 0, 0, False]
+    section = 0
+    next_free = None
+    for index, opcode in sorted_tape(instructions):
+        if next_free is not None and index < next_free:
+            raise ValueError(f"instruction on cycle {index} overlaps the expansion of a repeat or reset")
+        if opcode == REPEAT:
+            block = tape[section:]
+            if not block:
+                raise ValueError(f"repeat on cycle {index} has nothing to repeat")
+            shift = index - block[0][0]
+            steps = [(block_index + shift, block_opcode) for block_index, block_opcode in block]
+            next_free = index + shift
+        elif opcode == RESET:
+            steps = [(index + offset, move) for offset, move in enumerate(reset_moves(state))]
+            next_free = index + max(len(steps), 1)
+        else:
+            steps = [(index, opcode)]
+            next_free = index + 1
+        for step_index, step_opcode in steps:
+            step(state, step_opcode)
+            tape.append((step_index, step_opcode))
+        if opcode == RESET:
+            section = len(tape)
+    return to_instructions(tape)
+
+def fold(tape, first_index, allow_repeat, allow_reset):
+    # Resets return the arm to where the solution placed it, which only matches the original moves if every
+    # loop of the tape starts there too
+    state = [0, 0, 0, False]
+    states = []
+    for _, opcode in tape:
+        states.append(list(state))
+        step(state, opcode)
+    allow_reset = allow_reset and state == [0, 0, 0, False]
+
+    # Resets go wherever the arm is empty-handed, not rotated, and about to undo exactly one kind of movement
+    resets = []
+    position = 0
+    while allow_reset and position < len(tape):
+        track, rotation, extension, grabbing = states[position]
+        moves = reset_moves(states[position])
+        index = tape[position][0]
+        if (not grabbing and rotation == 0 and (track == 0) != (extension == 0)
+                and tape[position:position + len(moves)] == [(index + offset, move) for offset, move in enumerate(moves)]):
+            resets.append((position, len(moves)))
+            position += len(moves)
+        else:
+            position += 1
+
+    # Each section between resets gets at most one repeat, placed where it saves the most instructions
+    sections = []
+    start = 0
+    for position, length in resets:
+        sections.append((start, position))
+        start = position + length
+    sections.append((start, len(tape)))
+
+    compressed = []
+    for section_num, (start, end) in enumerate(sections):
+        if section_num > 0:
+            position, length = resets[section_num - 1]
+            compressed.append((tape[position][0], RESET))
+            section_starts_on_time = start < len(tape) and tape[start][0] == tape[position][0] + length
+        else:
+            section_starts_on_time = first_index is None or tape[0][0] == first_index
+        best = None
+        if allow_repeat and section_starts_on_time and end - start >= 4:
+            block_start = tape[start][0]
+            for repeat in range(start + 1, end):
+                count = repeat - start
+                if count < 2 or (best is not None and count <= best[1]):
+                    continue
+                shift = tape[repeat][0] - block_start
+                if repeat + count > end:
+                    continue
+                if repeat + count < len(tape) and tape[repeat + count][0] < block_start + 2 * shift:
+                    continue
+                if all(tape[repeat + offset] == (tape[start + offset][0] + shift, tape[start + offset][1]) for offset in range(count)):
+                    best = (repeat, count)
+        if best is None:
+            compressed.extend(tape[start:end])
+        else:
+            repeat, count = best
+            compressed.extend(tape[start:repeat])
+            compressed.append((tape[repeat][0], REPEAT))
+            compressed.extend(tape[repeat + count:end])
+
+    return compressed
+
+def compress(instructions, first_index=None, allow_repeat=True, allow_reset=True):
+    tape = sorted_tape(instructions)
+    if not tape or any(opcode in (REPEAT, RESET) for _, opcode in tape):
+        return to_instructions(tape)
+
+    # A reset can split a block that would otherwise have been repeated, so try with and without them
+    best = tape
+    for use_reset in ((False, True) if allow_reset else (False,)):
+        compressed = fold(tape, first_index, allow_repeat, use_reset)
+        if len(compressed) < len(best) and sorted_tape(expand(to_instructions(compressed))) == tape:
+            best = compressed
+    return to_instructions(best)
+
+def compress_parts(puzzle, parts):
+    # Shrinks every arm's tape in place, and returns how many instructions were saved across all of them
+    arms = [part for part in parts if part.name in ARMS and len(part.instructions)]
+    if not arms:
+        return 0
+    first_index = min(min(sorted_tape(part.instructions))[0] for part in arms)
+    allow_repeat = bool(puzzle.parts_available & om.Puzzle.REPEAT)
+    allow_reset = bool(puzzle.parts_available & om.Puzzle.RESET)
+    saved = 0
+    for part in arms:
+        compressed = compress(part.instructions, first_index, allow_repeat, allow_reset)
+        if len(compressed) < len(part.instructions):
+            saved += len(part.instructions) - len(compressed)
+            part.instructions = compressed
+    return saved
@@ -0,0 +1,219 @@
+import gc
+import mmap
+import struct
+import tempfile
+import threading
+import time
+import unittest
+import weakref
+
+import om
+
+def mapped(data):
+    # an mmap of a temporary file holding data, closed by the caller
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        f.flush()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def sample_puzzle():
+    reagent = om.Molecule(atoms=[om.Atom(om.Atom.FIRE, (0, 0)), om.Atom(om.Atom.WATER, (1, 0))],
+                          bonds=[om.Bond(om.Bond.NORMAL, ((0, 0), (1, 0)))])
+    product = om.Molecule(atoms=[om.Atom(om.Atom.WATER, (0, 0)), om.Atom(om.Atom.FIRE, (0, 1))],
+                          bonds=[om.Bond(om.Bond.NORMAL, ((0, 0), (0, 1)))])
+    return om.Puzzle(name=b'SAMPLE', reagents=[reagent], products=[product], output_scale=2)
+
+class PuzzleTest(unittest.TestCase):
+
+    def test_round_trip_is_byte_identical(self):
+        puzzle_bytes = bytes(sample_puzzle().to_bytes())
+        for buffer in (puzzle_bytes, bytearray(puzzle_bytes), memoryview(puzzle_bytes)):
+            self.assertEqual(bytes(om.Puzzle(buffer).to_bytes()), puzzle_bytes)
+
+    def test_mmaps_are_decoded_in_place(self):
+        puzzle_bytes = bytes(sample_puzzle().to_bytes())
+        mapping = mapped(puzzle_bytes)
+        puzzle = om.Puzzle(mapping)
+        mapping.close()
+        self.assertEqual(bytes(puzzle.to_bytes()), puzzle_bytes)
+        self.assertEqual(puzzle.products[0].atoms[1].position, (0, 1))
+
+    def test_truncated_files_are_rejected(self):
+        puzzle_bytes = bytes(sample_puzzle().to_bytes())
+        for end in (2, len(puzzle_bytes) - 1):
+            with self.assertRaisesRegex(ValueError, "not enough bytes"):
+                om.Puzzle(memoryview(puzzle_bytes)[:end])
+
+    def test_changes_after_decoding_are_encoded(self):
+        puzzle = om.Puzzle(bytes(sample_puzzle().to_bytes()))
+        other = om.Puzzle(bytes(sample_puzzle().to_bytes()))
+        puzzle.reagents[0].atoms[0].type = om.Atom.SALT
+        self.assertEqual(om.Puzzle(puzzle.to_bytes()).reagents[0].atoms[0].type, om.Atom.SALT)
+        self.assertEqual(om.Puzzle(other.to_bytes()).reagents[0].atoms[0].type, om.Atom.FIRE)
+
+    def test_assigned_lists_are_shared_with_the_caller(self):
+        puzzle = om.Puzzle()
+        reagents = []
+        puzzle.reagents = reagents
+        reagents.append(om.Molecule())
+        self.assertIs(puzzle.reagents, reagents)
+        atoms = [om.Atom(om.Atom.FIRE, (0, 0))]
+        molecule = om.Molecule(atoms=atoms)
+        atoms.append(om.Atom(om.Atom.WATER, (1, 0)))
+        self.assertEqual(len(molecule.atoms), 2)
+
+def reference_bytes(solution):
+    # one struct.pack per field, the way om encoded solutions before instructions were packed in blocks
+    def string(value):
+        out = bytearray()
+        n = len(value)
+        while n >= 0x80:
+            out.append(0x80 | (n & 0x7f))
+            n >>= 7
+        out.append(n)
+        return out + value
+    out = struct.pack('<I', 7) + string(solution.puzzle) + string(solution.name)
+    out += struct.pack('<IIIIIIIII', 4, 0, solution.cycles, 1, solution.cost, 2, solution.area, 3, solution.instructions) if solution.solved else struct.pack('<I', 0)
+    out += struct.pack('<I', len(solution.parts))
+    for part in solution.parts:
+        out += string(part.name)
+        out += struct.pack('<BiiIiII', 1, part.position[0], part.position[1], part.length, part.rotation, part.which_reagent_or_product, len(part.instructions))
+        for instruction in part.instructions:
+            out += struct.pack('<ic', instruction.index, instruction.instruction)
+        if part.name == b'track':
+            out += struct.pack('<I', len(part.track_hexes))
+            for track_hex in part.track_hexes:
+                out += struct.pack('<ii', track_hex[0], track_hex[1])
+        out += struct.pack('<I', part.arm_number)
+        if part.name == b'pipe':
+            out += struct.pack('<II', part.conduit_id, len(part.conduit_hexes))
+            for conduit_hex in part.conduit_hexes:
+                out += struct.pack('<ii', conduit_hex[0], conduit_hex[1])
+    return bytes(out)
+
+class SolutionTest(unittest.TestCase):
+
+    def test_encoding_matches_the_reference_encoder(self):
+        packed = om.InstructionList()
+        for index, opcode in [(0, om.Instruction.GRAB), (3, om.Instruction.ROTATE_CW), (-2, om.Instruction.DROP), (70000, om.Instruction.RESET)]:
+            packed.add(index, opcode)
+        solution = om.Solution(puzzle=b'SAMPLE', name=b'x' * 200, parts=[
+            om.Part(name=om.Part.ARM2, position=(-3, 4), length=2, rotation=-1, instructions=packed, arm_number=1),
+            om.Part(name=om.Part.PISTON, position=(1, 1), instructions=[om.Instruction(5, om.Instruction.EXTEND), om.Instruction(1, om.Instruction.GRAB)]),
+            om.Part(name=om.Part.TRACK, position=(0, 0), track_hexes=[(0, 0), (1, 0), (1, -1)]),
+            om.Part(name=om.Part.CONDUIT, conduit_id=100, conduit_hexes=[(0, 0), (-1, 2)]),
+            om.Part(name=om.Part.INPUT, position=(2, -2), which_reagent_or_product=1)])
+        for solved in (False, True):
+            solution.solved, solution.cycles, solution.cost, solution.area, solution.instructions = solved, 80, 150, 12, 7
+            expected = reference_bytes(solution)
+            self.assertEqual(bytes(solution.to_bytes()), expected)
+            self.assertEqual(bytes(om.Solution(expected).to_bytes()), expected)
+            mapping = mapped(expected)
+            decoded = om.Solution(mapping)
+            mapping.close()
+            self.assertEqual(bytes(decoded.to_bytes()), expected)
+            self.assertEqual(decoded.parts[2].track_hexes, [(0, 0), (1, 0), (1, -1)])
+
+class Buffer(bytearray):
+    pass
+
+class StubLibverify:
+    # stands in for libverify: metrics are read from values, metrics named in errors fail with (message, cycle, location),
+    # and metrics named in blocking wait for release
+    def __init__(self, values=None, errors=None, blocking=()):
+        self.values = values or {}
+        self.errors = errors or {}
+        self.blocking = blocking
+        self.release = threading.Event()
+        self.error = None
+        self.evaluated = []
+        self.cycle_limits = []
+        self.destroyed = []
+        self.checks = []
+        self.checked = None
+    def verifier_create_from_bytes(self, *args):
+        return 1
+    verifier_create_from_bytes_without_copying = verifier_create_from_bytes
+    def verifier_set_cycle_limit(self, verifier, cycle_limit):
+        self.cycle_limits.append(cycle_limit)
+    def verifier_destroy(self, verifier):
+        self.destroyed.append(verifier.value)
+    def verifier_error(self, verifier):
+        return self.error and self.error[0].encode()
+    def verifier_error_cycle(self, verifier):
+        return self.error[1]
+    def verifier_error_location_u(self, verifier):
+        return self.error[2][0]
+    def verifier_error_location_v(self, verifier):
+        return self.error[2][1]
+    def verifier_error_clear(self, verifier):
+        self.error = None
+    def verifier_evaluate_metric(self, verifier, name):
+        name = name.decode()
+        self.evaluated.append(name)
+        if name in self.blocking:
+            self.release.wait(10)
+            gc.collect()
+            self.checked = [check() for check in self.checks]
+        if name in self.errors and self.error is None:
+            self.error = self.errors[name]
+        return self.values.get(name, 0)
+
+def wait_for(condition):
+    deadline = time.monotonic() + 10
+    while not condition() and time.monotonic() < deadline:
+        gc.collect()
+        time.sleep(0.01)
+    return condition()
+
+class SimTest(unittest.TestCase):
+
+    def stub(self, **kwargs):
+        self.addCleanup(setattr, om.Sim, 'lv', om.Sim.lv)
+        om.Sim.lv = StubLibverify(**kwargs)
+        return om.Sim.lv
+
+    def test_metrics_come_back_as_a_dict(self):
+        stub = self.stub(values={'cost': 150, 'cycles': 80, 'area': 12})
+        with om.Sim(b'puzzle', b'solution') as sim:
+            self.assertEqual(sim.metrics(['cost', 'cycles', 'area']), {'cost': 150, 'cycles': 80, 'area': 12})
+        self.assertEqual(stub.evaluated, ['cost', 'cycles', 'area'])
+
+    def test_metric_errors_are_raised_after_every_metric_is_read(self):
+        stub = self.stub(values={'cost': 150}, errors={'cycles': ('atoms collided', 7, (2, -1))})
+        with om.Sim(b'puzzle', b'solution') as sim:
+            with self.assertRaises(om.SimError) as caught:
+                sim.metrics(['cost', 'cycles', 'area'])
+            self.assertNotIsInstance(caught.exception, om.SimTimeout)
+            self.assertEqual((caught.exception.message, caught.exception.cycle, caught.exception.location), ('atoms collided', 7, (2, -1)))
+            self.assertEqual(stub.evaluated, ['cost', 'cycles', 'area'])
+            self.assertIsNone(stub.error)
+            self.assertEqual(sim.metrics(['cost']), {'cost': 150})
+
+    def test_errors_past_the_cycle_limit_are_timeouts(self):
+        stub = self.stub(errors={'cycles': ('solution did not complete within cycle limit', 500, (-1, -1))})
+        with om.Sim(b'puzzle', b'solution', cycle_limit=500) as sim:
+            with self.assertRaisesRegex(om.SimTimeout, 'cycle limit of 500'):
+                sim.metrics(['cost', 'cycles'])
+        self.assertEqual(stub.cycle_limits, [500])
+
+    def test_timed_out_sims_keep_their_buffers_until_libverify_is_done(self):
+        stub = self.stub(blocking={'cycles'})
+        puzzle_buffer, solution_buffer = Buffer(b'puzzle'), Buffer(b'solution')
+        puzzle_ref, solution_ref = weakref.ref(puzzle_buffer), weakref.ref(solution_buffer)
+        stub.checks = [lambda: puzzle_ref() is not None, lambda: solution_ref() is not None]
+        sim = om.Sim(puzzle_buffer, solution_buffer, copy=False, time_limit=0.1)
+        del puzzle_buffer, solution_buffer
+        with self.assertRaises(om.SimTimeout):
+            sim.metric('cycles')
+        sim.close()
+        del sim
+        gc.collect()
+        self.assertEqual(stub.destroyed, [])
+        stub.release.set()
+        self.assertTrue(wait_for(lambda: stub.destroyed == [1]))
+        self.assertEqual(stub.checked, [True, True])
+        self.assertTrue(wait_for(lambda: puzzle_ref() is None and solution_ref() is None))
+
+if __name__ == '__main__':
+    unittest.main()
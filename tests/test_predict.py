@@ -0,0 +1,77 @@
+import unittest
+
+import Spadebot
+import om
+import predict
+import presim
+
+I = om.Instruction
+
+def tape(instructions):
+    out = om.InstructionList()
+    for index, instruction in enumerate(instructions):
+        out.add(index, instruction)
+    return out
+
+def salt_puzzle(products=1):
+    reagent = om.Molecule(atoms=[om.Atom(om.Atom.SALT, (0, 0))])
+    product = om.Molecule(atoms=[om.Atom(om.Atom.SALT, (0, 0))])
+    return om.Puzzle(name=b'SALT', reagents=[reagent], products=[product] * products)
+
+def swing_parts():
+    # the arm takes salt from the input on its left and swings it round to the output on its right
+    swing = tape([I.GRAB, I.ROTATE_CW, I.ROTATE_CW, I.ROTATE_CW, I.DROP, I.ROTATE_CCW, I.ROTATE_CCW, I.ROTATE_CCW])
+    return [om.Part(name=om.Part.INPUT, position=(0, 0), which_reagent_or_product=0),
+            om.Part(name=om.Part.ARM1, position=(1, 0), length=1, rotation=3, instructions=swing),
+            om.Part(name=om.Part.OUTPUT_STANDARD, position=(2, 0), which_reagent_or_product=0)]
+
+def slide_parts():
+    # the arm rides a three-hex track out and back, pointing up the whole way
+    slide = tape([I.TRACK_PLUS, I.TRACK_PLUS, I.TRACK_MINUS, I.TRACK_MINUS])
+    return [om.Part(name=om.Part.TRACK, position=(1, 0), track_hexes=[(0, 0), (1, 0), (2, 0)]),
+            om.Part(name=om.Part.ARM1, position=(1, 0), length=1, rotation=1, instructions=slide)]
+
+class CostTest(unittest.TestCase):
+
+    def test_parts_and_track_hexes_are_counted(self):
+        parts = [om.Part(name=om.Part.ARM1), om.Part(name=om.Part.PISTON), om.Part(name=om.Part.BONDER),
+                 om.Part(name=om.Part.TRACK, track_hexes=[(0, 0), (1, 0), (2, 0), (3, 0)]),
+                 om.Part(name=om.Part.INPUT), om.Part(name=om.Part.OUTPUT_STANDARD)]
+        # 20 + 40 + 10 for the arm, piston and bonder, 5 for each of the four track hexes, nothing for inputs and outputs
+        self.assertEqual(predict.cost(parts), 90)
+
+class CyclesTest(unittest.TestCase):
+
+    def test_hand_built_layouts_match_presim(self):
+        puzzle = salt_puzzle()
+        parts = swing_parts()
+        self.assertEqual(predict.cycles(puzzle, parts, [[4]]), presim.check(puzzle, parts))
+
+    def test_solved_puzzles_match_presim(self):
+        puzzle = salt_puzzle()
+        solver = Spadebot.Spadebot(puzzle)
+        parts = solver.solve()
+        self.assertEqual(predict.cycles(puzzle, parts, solver.output_cycles), presim.check(puzzle, parts))
+
+    def test_products_that_never_come_out_take_forever(self):
+        self.assertEqual(predict.cycles(salt_puzzle(2), swing_parts(), [[4], []]), float("inf"))
+        self.assertEqual(predict.cycles(salt_puzzle(), [], [[4]]), float("inf"))
+
+class AreaTest(unittest.TestCase):
+
+    def test_swept_hexes_are_counted_once(self):
+        # the arm's base and the four hexes its gripper stops on, two of which are the input and the output
+        self.assertEqual(predict.area(salt_puzzle(), swing_parts()), 5)
+
+    def test_arms_follow_their_track(self):
+        # three track hexes, and the gripper one hex above each of them
+        self.assertEqual(predict.area(salt_puzzle(), slide_parts()), 6)
+
+class PredictTest(unittest.TestCase):
+
+    def test_predict_gathers_every_metric(self):
+        puzzle = salt_puzzle()
+        self.assertEqual(predict.predict(puzzle, swing_parts(), [[4]]), {"cost": 20, "cycles": 45, "area": 5})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import om
+import presim
+
+I = om.Instruction
+
+def salt_puzzle():
+    reagent = om.Molecule(atoms=[om.Atom(om.Atom.SALT, (0, 0))])
+    product = om.Molecule(atoms=[om.Atom(om.Atom.SALT, (0, 0))])
+    return om.Puzzle(name=b'SALT', reagents=[reagent], products=[product])
+
+def swing_parts(extra_parts=()):
+    # the arm takes salt from the input on its left, swings it round to the output on its right, and swings back
+    tape = om.InstructionList()
+    for index, instruction in enumerate([I.GRAB, I.ROTATE_CW, I.ROTATE_CW, I.ROTATE_CW, I.DROP, I.ROTATE_CCW, I.ROTATE_CCW, I.ROTATE_CCW]):
+        tape.add(index, instruction)
+    return [om.Part(name=om.Part.INPUT, position=(0, 0), which_reagent_or_product=0),
+            om.Part(name=om.Part.ARM1, position=(1, 0), length=1, rotation=3, instructions=tape),
+            om.Part(name=om.Part.OUTPUT_STANDARD, position=(2, 0), which_reagent_or_product=0)] + list(extra_parts)
+
+class PresimTest(unittest.TestCase):
+
+    def test_clean_layouts_pass(self):
+        # six outputs at one every eight cycles, the last dropped and taken on cycle 44
+        self.assertEqual(presim.check(salt_puzzle(), swing_parts()), 45)
+
+    def test_collisions_are_caught(self):
+        # a second input sits on the first hex the swing passes through
+        blocker = om.Part(name=om.Part.INPUT, position=(0, 1), which_reagent_or_product=0)
+        with self.assertRaises(presim.PresimError) as caught:
+            presim.check(salt_puzzle(), swing_parts([blocker]))
+        self.assertEqual((caught.exception.message, caught.exception.cycle, caught.exception.location), ("atoms collided", 1, (0, 1)))
+
+    def test_two_instructions_on_one_cycle_are_caught(self):
+        parts = swing_parts()
+        parts[1].instructions.add(0, I.ROTATE_CCW)
+        with self.assertRaisesRegex(presim.PresimError, "two instructions on the same cycle"):
+            presim.check(salt_puzzle(), parts)
+
+if __name__ == "__main__":
+    unittest.main()
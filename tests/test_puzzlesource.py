@@ -0,0 +1,114 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+import om
+import puzzlesource
+
+def sample_puzzle_bytes():
+    reagent = om.Molecule(atoms=[om.Atom(om.Atom.SALT, (0, 0))])
+    return bytes(om.Puzzle(name=b'SALT', reagents=[reagent], products=[reagent]).to_bytes())
+
+NAMES = ["puzzle-007.puzzle", "puzzle-012.puzzle", "extra/puzzle-020.puzzle"]
+
+class PuzzleIdTest(unittest.TestCase):
+
+    def test_the_last_number_is_the_id(self):
+        self.assertEqual(puzzlesource.puzzle_id("batch-3/puzzle-042.puzzle"), "042")
+        self.assertEqual(puzzlesource.puzzle_id("v2-run-17.puzzle"), "17")
+
+    def test_names_without_numbers_keep_their_stem(self):
+        self.assertEqual(puzzlesource.puzzle_id("some/dir/stabilized-water.puzzle"), "stabilized-water")
+
+class SourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.puzzle_bytes = sample_puzzle_bytes()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.expected = [("007", self.puzzle_bytes), ("012", self.puzzle_bytes), ("020", self.puzzle_bytes)]
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write_zip(self):
+        with zipfile.ZipFile(self.path("puzzles.zip"), "w") as puzzle_zip:
+            for name in NAMES:
+                puzzle_zip.writestr(name, self.puzzle_bytes)
+            puzzle_zip.writestr("empty.puzzle", b"")
+        return self.path("puzzles.zip")
+
+    def write_tar(self, name="puzzles.tar.gz", mode="w:gz"):
+        with tarfile.open(self.path(name), mode) as puzzle_tar:
+            for member in NAMES:
+                info = tarfile.TarInfo(member)
+                info.size = len(self.puzzle_bytes)
+                puzzle_tar.addfile(info, io.BytesIO(self.puzzle_bytes))
+            directory = tarfile.TarInfo("extra")
+            directory.type = tarfile.DIRTYPE
+            puzzle_tar.addfile(directory)
+        return self.path(name)
+
+    def write_directory(self):
+        root = self.path("puzzles")
+        for name in NAMES + ["notes.txt", "empty.puzzle"]:
+            os.makedirs(os.path.dirname(os.path.join(root, name)), exist_ok=True)
+            with open(os.path.join(root, name), "wb") as f:
+                f.write(b"" if name == "empty.puzzle" else self.puzzle_bytes)
+        return root
+
+    def write_frames(self):
+        with open(self.path("puzzles.frames"), "wb") as stream:
+            for puzzle_num, puzzle_bytes in self.expected:
+                puzzlesource.write_frame(stream, puzzle_num, puzzle_bytes)
+            puzzlesource.write_frame(stream, "empty", b"")
+        return self.path("puzzles.frames")
+
+    def test_zips_are_read(self):
+        self.assertEqual(list(puzzlesource.iter_zip(self.write_zip())), self.expected)
+
+    def test_tarballs_are_read(self):
+        self.assertEqual(list(puzzlesource.iter_tar(self.write_tar())), self.expected)
+        self.assertEqual(list(puzzlesource.iter_tar(self.write_tar("puzzles.tar", "w"))), self.expected)
+
+    def test_tarballs_are_streamed(self):
+        # the first member comes out before the cut in the second member's data is reached
+        path = self.write_tar("puzzles.tar", "w")
+        with open(path, "r+b") as f:
+            f.truncate(1536 + len(self.puzzle_bytes) // 2)
+        puzzles = puzzlesource.iter_tar(path)
+        self.assertEqual(next(puzzles), self.expected[0])
+        with self.assertRaises(tarfile.ReadError):
+            list(puzzles)
+
+    def test_directories_are_walked_in_order(self):
+        self.assertEqual(list(puzzlesource.iter_directory(self.write_directory())), self.expected)
+
+    def test_frames_are_read(self):
+        with open(self.write_frames(), "rb") as stream:
+            self.assertEqual(list(puzzlesource.iter_frames(stream)), self.expected)
+
+    def test_truncated_frames_are_rejected(self):
+        stream = io.BytesIO()
+        puzzlesource.write_frame(stream, "007", self.puzzle_bytes)
+        framed = stream.getvalue()
+        for end, message in [(2, "truncated name length"), (len(framed) - 1, "truncated puzzle"), (4 + len("007"), "between a name and its puzzle")]:
+            with self.assertRaisesRegex(ValueError, message):
+                list(puzzlesource.iter_frames(io.BytesIO(framed[:end])))
+
+    def test_every_source_gives_the_same_puzzles(self):
+        for path in (self.write_zip(), self.write_tar(), self.write_directory()):
+            puzzles = list(puzzlesource.open_source(path))
+            self.assertEqual(puzzles, self.expected)
+            self.assertEqual(om.Puzzle(puzzles[0][1]).name, b'SALT')
+
+    def test_unknown_files_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "is not a zip, tarball, directory"):
+            puzzlesource.open_source(self.write_frames())
+
+if __name__ == "__main__":
+    unittest.main()
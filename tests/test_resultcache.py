@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import Spadebot
+import resultcache
+
+PUZZLE_BYTES = b"puzzle bytes"
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.sqlite")
+
+    def open(self, solver_fingerprint="solver", **kwargs):
+        cache = resultcache.ResultCache(self.path, solver_fingerprint, **kwargs)
+        self.addCleanup(cache.connection.close)
+        return cache
+
+    def test_results_round_trip(self):
+        with self.open() as cache:
+            cache.put(PUZZLE_BYTES, {"Puzzle Num": 3, "Status": "Succeeded", "Cycles": 80, "Solution": b"solution bytes"})
+        cached = self.open().get(PUZZLE_BYTES)
+        self.assertEqual(cached, {"Status": "Succeeded", "Cycles": 80, "Solution": b"solution bytes"})
+
+    def test_timed_out_results_are_not_cached(self):
+        with self.open() as cache:
+            cache.put(PUZZLE_BYTES, {"Puzzle Num": 3, "Status": "Timed Out", "Message": "solution did not finish within the cycle limit of 10"})
+        self.assertIsNone(self.open().get(PUZZLE_BYTES))
+
+    def test_lost_workers_are_not_cached(self):
+        with self.open() as cache:
+            cache.put(PUZZLE_BYTES, {"Puzzle Num": 3, "Status": "Worker Failed", "Message": "the worker exited with code -9"})
+        self.assertIsNone(self.open().get(PUZZLE_BYTES))
+
+    def test_results_are_keyed_by_fingerprint(self):
+        with self.open("one") as cache:
+            cache.put(PUZZLE_BYTES, {"Status": "Succeeded"})
+        self.assertIsNone(self.open("two").get(PUZZLE_BYTES))
+        self.assertIsNotNone(self.open("one").get(PUZZLE_BYTES))
+
+    def test_results_are_committed_during_a_sweep(self):
+        cache = self.open(flush_every=2)
+        for puzzle_num in range(4):
+            cache.put(b"puzzle %d" % puzzle_num, {"Status": "Succeeded", "Cycles": puzzle_num})
+        reader = self.open()
+        self.assertEqual([reader.get(b"puzzle %d" % puzzle_num)["Cycles"] for puzzle_num in range(4)], [0, 1, 2, 3])
+
+    def test_size_limit_holds_during_a_sweep(self):
+        cache = self.open(max_bytes=2000, flush_every=5)
+        reader = self.open()
+        for puzzle_num in range(50):
+            cache.put(b"puzzle %d" % puzzle_num, {"Status": "Succeeded", "Solution": bytes(100)})
+            if cache.unflushed == 0:
+                total, = reader.connection.execute("SELECT SUM(size) FROM results").fetchone()
+                self.assertLessEqual(total, 2000)
+        self.assertIsNotNone(reader.get(b"puzzle 49"))
+        self.assertIsNone(reader.get(b"puzzle 0"))
+
+    def test_every_option_changes_the_fingerprint(self):
+        fingerprints = [Spadebot.cache_fingerprint(),
+                        Spadebot.cache_fingerprint(use_presim=True),
+                        Spadebot.cache_fingerprint(use_presim=True, use_libverify=False),
+                        Spadebot.cache_fingerprint(compress_tapes=True),
+                        Spadebot.cache_fingerprint(parallel_lanes=True),
+                        Spadebot.cache_fingerprint(parallel_disassembly=3),
+                        Spadebot.cache_fingerprint(products_per_loop=2),
+                        Spadebot.cache_fingerprint(beam_width=4),
+                        Spadebot.cache_fingerprint(beam_width=4, beam_time_limit=1.0)]
+        self.assertEqual(len(set(fingerprints)), len(fingerprints))
+        self.assertEqual(Spadebot.cache_fingerprint(), Spadebot.cache_fingerprint())
+
+if __name__ == "__main__":
+    unittest.main()
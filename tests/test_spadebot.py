@@ -0,0 +1,183 @@
+import functools
+import os
+import time
+import unittest
+
+import Spadebot
+import om
+import presim
+
+def nap(seconds, verifying):
+    verifying()
+    time.sleep(seconds)
+    return seconds
+
+def fail(message, verifying):
+    raise ValueError(message)
+
+def crash(code, verifying):
+    os._exit(code)
+
+def tracing(verifying):
+    import tracemalloc
+    return tracemalloc.is_tracing()
+
+def molecule(cells, bonds=None):
+    atoms = [om.Atom(atom_type, position) for position, atom_type in cells.items()]
+    if bonds is None:
+        bonds = [((x, y), (x + dx, y + dy)) for x, y in cells for dx, dy in ((1, 0), (0, 1), (-1, 1)) if (x + dx, y + dy) in cells]
+    return om.Molecule(atoms=atoms, bonds=[om.Bond(om.Bond.NORMAL, positions) for positions in bonds])
+
+def tall_reagent_puzzle():
+    # each loop of the three-row reagent gives one fire, and the product takes six of them
+    reagent = molecule({(0, 0): om.Atom.FIRE, (0, 1): om.Atom.SALT, (0, 2): om.Atom.SALT})
+    product = molecule({(x, y): om.Atom.FIRE for x in range(3) for y in range(2)})
+    return om.Puzzle(name=b'TALL', reagents=[reagent], products=[product])
+
+def same_reagent_delay_puzzle():
+    # the second product's atoms come off the same reagent back to back, with delays between them
+    reagent = molecule({(0, 0): om.Atom.SALT, (1, 0): om.Atom.SALT})
+    pair = molecule({(0, 0): om.Atom.SALT, (1, 0): om.Atom.SALT}, bonds=[])
+    block = molecule({(x, y): om.Atom.SALT for x in range(3) for y in range(2)}, bonds=[((1, 1), (2, 1))])
+    return om.Puzzle(name=b'DELAYS', reagents=[reagent], products=[pair, block])
+
+def two_product_puzzle():
+    # both products take the reagent's two atoms, laid out differently
+    reagent = molecule({(0, 0): om.Atom.GOLD, (1, 0): om.Atom.WATER})
+    across = molecule({(0, 0): om.Atom.WATER, (1, 0): om.Atom.GOLD}, bonds=[])
+    up = molecule({(0, 0): om.Atom.GOLD, (0, 1): om.Atom.WATER}, bonds=[])
+    return om.Puzzle(name=b'LANES', reagents=[reagent], products=[across, up])
+
+def three_row_puzzle():
+    # only the bottom row of the reagent is used, so each copy of it on another side saves a whole loop of the feeder
+    reagent = molecule({(0, 0): om.Atom.SILVER, (0, 1): om.Atom.FIRE, (0, 2): om.Atom.FIRE})
+    product = molecule({(0, 0): om.Atom.SILVER, (1, 0): om.Atom.SILVER, (2, 0): om.Atom.SILVER}, bonds=[((1, 0), (2, 0))])
+    return om.Puzzle(name=b'ROWS', reagents=[reagent], products=[product])
+
+def chain_puzzle():
+    # the beam finds an order of the two reagents' atoms that a greedy pick misses
+    chain = molecule({(0, 0): om.Atom.SILVER, (1, 0): om.Atom.SILVER, (2, 0): om.Atom.GOLD})
+    pair = molecule({(0, 0): om.Atom.GOLD, (0, 1): om.Atom.SILVER})
+    product = molecule({(0, 0): om.Atom.GOLD, (1, 0): om.Atom.SILVER, (2, 0): om.Atom.GOLD})
+    return om.Puzzle(name=b'CHAIN', reagents=[chain, pair], products=[product])
+
+def solution_bytes(puzzle, parts):
+    return bytes(om.Solution(puzzle=puzzle.name, name=b"SpadeBot", parts=parts).to_bytes())
+
+class WorkerPoolTest(unittest.TestCase):
+
+    def test_workers_past_the_time_limit_are_replaced(self):
+        pool = Spadebot.WorkerPool(1, nap, time_limit=0.5)
+        self.addCleanup(pool.shutdown)
+        first_process = pool.slots[0]["Process"]
+        slow = pool.submit(60)
+        quick = pool.submit(0)
+        start = time.monotonic()
+        with self.assertRaises(om.SimTimeout):
+            pool.result(slow)
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertFalse(first_process.is_alive())
+        self.assertEqual(pool.result(quick), 0)
+
+    def test_exceptions_come_back_through_the_future(self):
+        pool = Spadebot.WorkerPool(1, fail)
+        self.addCleanup(pool.shutdown)
+        process = pool.slots[0]["Process"]
+        for message in ("bad puzzle", "another bad puzzle"):
+            with self.assertRaisesRegex(RuntimeError, f"ValueError: {message}"):
+                pool.result(pool.submit(message))
+        self.assertIs(pool.slots[0]["Process"], process)
+
+    def test_crashed_workers_are_replaced(self):
+        pool = Spadebot.WorkerPool(1, crash)
+        self.addCleanup(pool.shutdown)
+        process = pool.slots[0]["Process"]
+        with self.assertRaisesRegex(RuntimeError, "exited with code 3"):
+            pool.result(pool.submit(3))
+        self.assertIsNot(pool.slots[0]["Process"], process)
+
+    def test_stage_stats_trace_memory_in_every_worker(self):
+        for trace_memory in (False, True):
+            pool = Spadebot.WorkerPool(1, tracing, functools.partial(Spadebot.init_worker, False, trace_memory))
+            self.addCleanup(pool.shutdown)
+            self.assertEqual(pool.result(pool.submit()), trace_memory)
+
+class ProductsPerLoopTest(unittest.TestCase):
+
+    def test_copies_that_overflow_the_grablist_are_clamped(self):
+        puzzle = tall_reagent_puzzle()
+        with self.assertRaises(Spadebot.GrablistError):
+            Spadebot.Spadebot(puzzle, products_per_loop=6).solve_loop(6)
+        solver = Spadebot.Spadebot(puzzle, products_per_loop=6)
+        parts = solver.solve()
+        self.assertEqual(solver.copies_per_loop, 1)
+        self.assertEqual(solution_bytes(puzzle, parts), solution_bytes(puzzle, Spadebot.Spadebot(puzzle).solve()))
+
+    def test_copies_that_fit_are_built(self):
+        solver = Spadebot.Spadebot(tall_reagent_puzzle(), products_per_loop=2)
+        solver.solve()
+        self.assertEqual(solver.copies_per_loop, 2)
+
+    def test_copies_stall_for_delays_between_atoms_of_one_reagent(self):
+        puzzle = same_reagent_delay_puzzle()
+        for products_per_loop in (2, 3):
+            solver = Spadebot.Spadebot(puzzle, products_per_loop=products_per_loop)
+            parts = solver.solve()
+            self.assertEqual(solver.copies_per_loop, products_per_loop)
+            presim.check(puzzle, parts)
+
+    def test_clamped_puzzles_are_still_solved(self):
+        member = (0, bytes(tall_reagent_puzzle().to_bytes()))
+        result = Spadebot.solve_member(member, use_presim=True, use_libverify=False, products_per_loop=6)
+        self.assertEqual(result["Status"], "Presimulated")
+
+class SolverModeTest(unittest.TestCase):
+
+    def solve_in_mode(self, puzzle, **options):
+        # The mode's layout has to be valid, beat the usual one, and be what the batch driver keeps
+        parts = Spadebot.Spadebot(puzzle, **options).solve()
+        single_parts = Spadebot.Spadebot(puzzle).solve()
+        presim.check(puzzle, parts)
+        self.assertLess(Spadebot.tape_period(parts), Spadebot.tape_period(single_parts))
+        result = Spadebot.solve_member((0, bytes(puzzle.to_bytes())), use_presim=True, use_libverify=False, **options)
+        self.assertEqual(result["Status"], "Presimulated")
+        self.assertEqual(result["Solution"], solution_bytes(puzzle, parts))
+        return parts, single_parts
+
+    def test_parallel_lanes(self):
+        self.solve_in_mode(two_product_puzzle(), parallel_lanes=True)
+
+    def test_parallel_disassembly(self):
+        parts, single_parts = self.solve_in_mode(three_row_puzzle(), parallel_disassembly=3)
+        inputs = [part for part in parts if part.name == om.Part.INPUT]
+        self.assertGreater(len(inputs), len([part for part in single_parts if part.name == om.Part.INPUT]))
+        self.assertEqual({part.which_reagent_or_product for part in inputs}, {0})
+
+    def test_beam_search(self):
+        self.solve_in_mode(chain_puzzle(), beam_width=4)
+
+class BookingTest(unittest.TestCase):
+
+    def test_double_booked_cycles_are_recorded(self):
+        solver = Spadebot.Spadebot(tall_reagent_puzzle())
+        solver.addreg("BONDER", (0, 0))
+        arms = []
+        solver.addarm("ARM1", (2, 0), 0, 1, arms)
+        solver.addarm("PISTON", (4, 0), 0, 1, arms)
+        solver.stage = "Grabbing"
+        solver.setcount(5, True)
+        solver.addinstr(True, False, arms, "GRAB", 2)
+        solver.stage = "Dropping"
+        solver.addinstrlist(True, False, arms[1:], ["x", "x", "DROP"])
+        self.assertEqual(solver.conflicts, [])
+        solver.addinstr(True, False, arms[:1], "DROP", 1)
+        self.assertEqual(solver.conflicts, [{"Part Num": solver.partlist.index(arms[0]), "Cycle": 5,
+                                             "First Stage": "Grabbing", "Second Stage": "Dropping"}])
+
+    def test_solves_book_every_cycle_once(self):
+        solver = Spadebot.Spadebot(tall_reagent_puzzle())
+        solver.solve()
+        self.assertEqual(solver.conflicts, [])
+
+if __name__ == "__main__":
+    unittest.main()
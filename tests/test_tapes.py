@@ -0,0 +1,69 @@
+import unittest
+
+import om
+import tapes
+
+I = om.Instruction
+
+def tape(instructions, start=0):
+    out = om.InstructionList()
+    for offset, instruction in enumerate(instructions):
+        if instruction is not None:
+            out.add(start + offset, instruction)
+    return out
+
+def opcodes(instructions):
+    return [opcode for _, opcode in tapes.sorted_tape(instructions)]
+
+SWING = [I.GRAB, I.ROTATE_CW, I.DROP, I.ROTATE_CCW] * 3
+SLIDE = [I.GRAB, I.TRACK_PLUS, I.TRACK_PLUS, I.TRACK_PLUS, I.DROP, I.TRACK_MINUS, I.TRACK_MINUS, I.TRACK_MINUS]
+
+class CompressTest(unittest.TestCase):
+
+    def assertRoundTrips(self, original, compressed):
+        self.assertEqual(tapes.sorted_tape(tapes.expand(compressed)), tapes.sorted_tape(original))
+
+    def test_repeated_loops_fold_into_a_repeat(self):
+        original = tape(SWING, start=5)
+        compressed = tapes.compress(original, first_index=5)
+        self.assertIn(tapes.REPEAT, opcodes(compressed))
+        self.assertLess(len(compressed), len(original))
+        self.assertRoundTrips(original, compressed)
+
+    def test_returning_moves_fold_into_a_reset(self):
+        original = tape(SLIDE)
+        compressed = tapes.compress(original)
+        self.assertEqual(opcodes(compressed), [I.GRAB[0], I.TRACK_PLUS[0], I.TRACK_PLUS[0], I.TRACK_PLUS[0], I.DROP[0], tapes.RESET])
+        self.assertRoundTrips(original, compressed)
+
+    def test_disallowed_instructions_are_not_written(self):
+        self.assertEqual(tapes.sorted_tape(tapes.compress(tape(SWING), allow_repeat=False)), tapes.sorted_tape(tape(SWING)))
+        self.assertEqual(tapes.sorted_tape(tapes.compress(tape(SLIDE), allow_reset=False)), tapes.sorted_tape(tape(SLIDE)))
+
+    def test_a_repeat_that_starts_late_is_not_written(self):
+        original = tape(SWING, start=5)
+        self.assertEqual(tapes.sorted_tape(tapes.compress(original, first_index=0)), tapes.sorted_tape(original))
+
+    def test_compress_parts_follows_the_puzzle(self):
+        for parts_available, expected in [(om.Puzzle.REPEAT | om.Puzzle.RESET, 9), (0, 12)]:
+            puzzle = om.Puzzle()
+            puzzle.parts_available = parts_available
+            parts = [om.Part(name=om.Part.ARM1, instructions=tape(SWING)), om.Part(name=om.Part.INPUT)]
+            self.assertEqual(tapes.compress_parts(puzzle, parts), 12 - expected)
+            self.assertEqual(len(parts[0].instructions), expected)
+
+class ExpandTest(unittest.TestCase):
+
+    def test_repeat_then_reset(self):
+        written = tape([I.GRAB, I.EXTEND, I.DROP, I.REPEAT, None, None, I.RESET])
+        self.assertEqual(opcodes(tapes.expand(written)),
+                         [I.GRAB[0], I.EXTEND[0], I.DROP[0], I.GRAB[0], I.EXTEND[0], I.DROP[0], I.RETRACT[0], I.RETRACT[0]])
+
+    def test_overlapping_expansions_are_rejected(self):
+        with self.assertRaises(ValueError):
+            tapes.expand(tape([I.GRAB, I.EXTEND, I.REPEAT, I.DROP]))
+        with self.assertRaises(ValueError):
+            tapes.expand(tape([I.REPEAT]))
+
+if __name__ == "__main__":
+    unittest.main()